@@ -1,18 +1,30 @@
-import maya.cmds as mc
-import maya.mel as mm
-import maya._OpenMaya as om
-import maya.api.OpenMaya as om2
-
 import importlib as imp
+import os, sys, time
 
 from .utils import toolbox as tb
-from .ui import *
 
-imp.reload(ui)
+try:
+    import maya.cmds as mc
+    import maya.mel as mm
+    import maya._OpenMaya as om
+    import maya.api.OpenMaya as om2
+except ImportError:
+    # HEADLESS: NO MAYA NOR UI, ONLY THE TOOLBOX IS AVAILABLE
+    mc = None
+
+# MAYAPY RUNS HEADLESS BUILDS, SEE batch.py, THE UI IS ONLY LOADED IN INTERACTIVE MAYA
+BATCH = os.path.basename(sys.executable).lower().startswith("mayapy")
+
+if mc and not BATCH:
+    from .ui import *
+    imp.reload(ui)
 imp.reload(tb)
 
 
 def start():
+    # STARTUP PHASES ARE TIMED FROM HERE, SEE Workshop.startupPhases
+    startTime = time.perf_counter()
+    
     # # CHECK IF SESSION EXISTS
     # if not tb.geppettoExists():
     #     tb.createBaseStructure()
@@ -20,6 +32,6 @@ def start():
         
     # OPEN UI
     workshop = Workshop()
-    workshop.start()
+    workshop.start(startTime)
     
     return
@@ -0,0 +1,306 @@
+"""
+Headless Geppetto builds, without any Qt.
+
+Build one session in a Maya standalone session: open it, create the guides of the modules that have none,
+build the puppet of every blueprint and publish the rig to the session publish_path.
+With a publish cache, sessions whose content was already published are not built, the cached rig is reused.
+
+    mayapy Geppetto/batch.py build character.gpt --report character.json --cache /farm/geppetto_cache
+
+Build many sessions, each one in its own mayapy process, N at a time, and collect a summary report
+with the timing, exit status and log of every job:
+
+    python Geppetto/batch.py run sessions/*.gpt --workers 8 --logs logs --report summary.json
+"""
+import argparse, concurrent.futures, importlib, json, os, shutil, subprocess, sys, tempfile, time, traceback
+
+if __name__ in ("__main__", "__mp_main__") and not __package__:
+    # RUN AS A SCRIPT OR AS THE MAIN MODULE OF A COMPUTE PROCESS, IMPORT GEPPETTO AS A PACKAGE FOR ITS RELATIVE IMPORTS
+    _ROOT = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, os.path.dirname(_ROOT))
+    __package__ = os.path.basename(_ROOT)
+    importlib.import_module(__package__)
+
+from .utils import toolbox as tb
+from .utils import cache as publishCache
+from .utils import guides, puppet
+from .utils.scene import cmds as mc
+
+
+# COMPUTE PROCESSES OF EACH BUILD JOB, JOBS ALREADY RUN ONE PER CORE
+JOB_WORKERS = 1
+
+
+'''       '''
+''' BUILD '''
+'''       '''
+
+def _log(text):
+    print(f"[geppetto] {text}", flush=True)
+
+
+def buildSession(path, publish=True, fast=True, cache=None, workers=None):
+    """
+    Open a session file and build it in the current scene
+
+    Args:
+        path (str): session file
+        publish (bool, optional): publish the built rig. Defaults to True.
+        fast (bool, optional): build without undo, see toolbox.buildContext. Defaults to True.
+        cache (PublishCache, optional): reuse the rig published from the same content instead of building,
+            store the published rig otherwise. Defaults to None.
+        workers (int, optional): instruction compute processes, see puppet.getPool. Defaults to the number of cores.
+
+    Returns:
+        dict: {"session", "hash", "cache": "hit", "miss" or None, "guides": {module: count},
+               "blueprints": {name: {"built", "skipped"}}, "publish": published path or None,
+               "times": {phase: seconds}}
+    """
+    report = {"session": os.path.abspath(path), "hash": None, "cache": None, "guides": {}, "blueprints": {},
+              "publish": None, "times": {}}
+    start = time.perf_counter()
+    phase = start
+
+    def done(name):
+        nonlocal phase
+        now = time.perf_counter()
+        report["times"][name] = now - phase
+        _log(f"{name}: {(now - phase) * 1000:.1f} ms")
+        phase = now
+
+    mc.file(new=True, force=True)
+    tb.openSession(path)
+    done("open")
+
+    # SAME CONTENT ALREADY PUBLISHED, NOTHING TO BUILD
+    if publish and cache is not None:
+        report["hash"] = tb.sessionHash()
+        hit = cache.fetch(report["hash"], tb.publishPath())
+        report["cache"] = "hit" if hit else "miss"
+        done("cache")
+        if hit:
+            report["publish"] = tb.publishPath()
+            _log(f"published {report['publish']} from cache")
+            report["times"]["total"] = time.perf_counter() - start
+            return report
+
+    # SAVED GUIDES ARE KEPT, TEMPLATES ONLY FILL MODULES WITHOUT ANY
+    modules = []
+    for module in tb.getModules():
+        tb.loadModule(module)
+        if not mc.listRelatives(f"{tb.getGeppetto()}|modules|{module}"):
+            modules.append(module)
+    with tb.buildContext("Build guides", fast=fast):
+        stats = guides.buildGuides(modules)
+    report["guides"] = {module: entry["guides"] for module, entry in stats["modules"].items()}
+    done("guides")
+
+    for blueprint in tb.getBlueprints():
+        with tb.buildContext("Build puppet", fast=fast):
+            stats = puppet.buildPuppet(blueprint, workers=workers)
+        report["blueprints"][blueprint] = {"built": len(stats["built"]), "skipped": len(stats["skipped"])}
+        _log(f"{blueprint}: {len(stats['built'])} instructions built, {len(stats['skipped'])} up to date")
+    done("puppet")
+
+    if publish:
+        report["publish"] = tb.publish()
+        if cache is not None:
+            cache.put(report["hash"], report["publish"])
+        _log(f"published {report['publish']}")
+        done("publish")
+
+    report["times"]["total"] = time.perf_counter() - start
+
+    return report
+
+
+def _build(args):
+    """
+    Worker entry point, runs in mayapy
+
+    Returns:
+        int: exit status, 0 on success
+    """
+    import maya.standalone
+    maya.standalone.initialize(name="python")
+
+    status = 0
+    report = {"session": os.path.abspath(args.session)}
+    cache = publishCache.PublishCache(args.cache, int(args.cache_size * 1024 ** 3)) if args.cache else None
+    try:
+        report = buildSession(args.session, publish=not args.no_publish, fast=not args.undo, cache=cache,
+                              workers=JOB_WORKERS)
+    except Exception:
+        traceback.print_exc()
+        report["error"] = traceback.format_exc(limit=1).strip().splitlines()[-1]
+        status = 1
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    maya.standalone.uninitialize()
+
+    return status
+
+
+'''      '''
+''' JOBS '''
+'''      '''
+
+def findMayapy():
+    """
+    Returns:
+        str: mayapy executable, the current interpreter if it is one,
+            then the one of $MAYA_LOCATION, then the first one in the PATH. None if there is none.
+    """
+    if os.path.basename(sys.executable).lower().startswith("mayapy"):
+        return sys.executable
+    if os.environ.get("MAYA_LOCATION"):
+        path = shutil.which("mayapy", path=os.path.join(os.environ["MAYA_LOCATION"], "bin"))
+        if path:
+            return path
+
+    return shutil.which("mayapy")
+
+
+def runJob(session, directory, mayapy, timeout=None, publish=True, cache=None, cacheSize=None):
+    """
+    Build a session in a new mayapy process
+
+    Args:
+        session (str): session file
+        directory (str): directory receiving the job log and report, named after the session
+        mayapy (str): mayapy executable
+        timeout (float, optional): seconds after which the job is killed. Defaults to None.
+        publish (bool, optional): publish the built rig. Defaults to True.
+        cache (str, optional): publish cache directory. Defaults to None.
+        cacheSize (float, optional): publish cache size limit in GB. Defaults to the cache default.
+
+    Returns:
+        dict: {"session", "status": "ok", "failed" or "timeout", "exitCode", "time", "log", "report"},
+            "report" being the worker buildSession report, with an "error" if it failed
+    """
+    name = os.path.join(directory, os.path.splitext(os.path.basename(session))[0])
+    job = {"session": os.path.abspath(session), "status": "ok", "exitCode": None, "time": 0.0,
+           "log": f"{name}.log", "report": None}
+    command = [mayapy, os.path.abspath(__file__), "build", job["session"], "--report", f"{name}.json"]
+    if not publish:
+        command.append("--no-publish")
+    if cache:
+        command += ["--cache", cache]
+    if cacheSize:
+        command += ["--cache-size", str(cacheSize)]
+
+    start = time.perf_counter()
+    with open(job["log"], "w") as log:
+        try:
+            job["exitCode"] = subprocess.run(command, stdout=log, stderr=subprocess.STDOUT, timeout=timeout).returncode
+            if job["exitCode"]:
+                job["status"] = "failed"
+        except subprocess.TimeoutExpired:
+            job["status"] = "timeout"
+    job["time"] = time.perf_counter() - start
+
+    if os.path.exists(f"{name}.json"):
+        with open(f"{name}.json") as f:
+            job["report"] = json.load(f)
+
+    return job
+
+
+def runJobs(sessions, workers=None, mayapy=None, logs=None, timeout=None, publish=True, cache=None, cacheSize=None):
+    """
+    Build sessions on parallel mayapy processes, each session in its own process
+
+    Args:
+        sessions (list): session files
+        workers (int, optional): processes running at once. Defaults to the number of cores.
+        mayapy (str, optional): mayapy executable. Defaults to findMayapy().
+        logs (str, optional): directory receiving job logs and reports. Defaults to a new temporary directory.
+        timeout (float, optional): seconds after which a job is killed. Defaults to None.
+        publish (bool, optional): publish the built rigs. Defaults to True.
+        cache (str, optional): publish cache directory shared by every job. Defaults to None.
+        cacheSize (float, optional): publish cache size limit in GB. Defaults to the cache default.
+
+    Returns:
+        dict: {"jobs": [runJob results, in sessions order], "ok": count, "failed": count,
+               "cache": {"hits", "misses"}, "time": seconds, "workers": count, "logs": directory}
+    """
+    mayapy = mayapy or findMayapy()
+    if not mayapy:
+        raise RuntimeError("mayapy not found, set MAYA_LOCATION or give its path")
+    logs = logs or tempfile.mkdtemp(prefix="geppetto_batch_")
+    workers = workers or os.cpu_count()
+
+    # SESSIONS WITH THE SAME FILE NAME GET THEIR OWN LOGS
+    directories = []
+    for i, session in enumerate(sessions):
+        directory = os.path.join(logs, f"{i:04d}")
+        os.makedirs(directory, exist_ok=True)
+        directories.append(directory)
+
+    start = time.perf_counter()
+    jobs = []
+    with concurrent.futures.ThreadPoolExecutor(workers) as pool:
+        pending = {pool.submit(runJob, session, directory, mayapy, timeout, publish, cache, cacheSize): i
+                   for i, (session, directory) in enumerate(zip(sessions, directories))}
+        for future in concurrent.futures.as_completed(pending):
+            job = future.result()
+            _log(f"{job['status']:<7} {job['time']:7.1f} s  {job['session']}")
+            jobs.append((pending[future], job))
+
+    jobs = [job for i, job in sorted(jobs, key=lambda item: item[0])]
+    ok = sum(job["status"] == "ok" for job in jobs)
+    cached = [(job["report"] or {}).get("cache") for job in jobs]
+
+    return {"jobs": jobs, "ok": ok, "failed": len(jobs) - ok,
+            "cache": {"hits": cached.count("hit"), "misses": cached.count("miss")},
+            "time": time.perf_counter() - start, "workers": workers, "logs": logs}
+
+
+'''     '''
+''' CLI '''
+'''     '''
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="build one session, from mayapy")
+    build.add_argument("session", help="session file")
+    build.add_argument("--report", help="write the build report to this JSON file")
+    build.add_argument("--no-publish", action="store_true", help="build without publishing")
+    build.add_argument("--undo", action="store_true", help="keep undo recording on while building")
+    build.add_argument("--cache", help="publish cache directory, reused when the session content was already published")
+    build.add_argument("--cache-size", type=float, default=publishCache.MAX_SIZE / 1024 ** 3,
+                       help="publish cache size limit in GB")
+
+    run = commands.add_parser("run", help="build many sessions on parallel mayapy processes")
+    run.add_argument("sessions", nargs="+", help="session files")
+    run.add_argument("--workers", type=int, help="mayapy processes running at once, defaults to the number of cores")
+    run.add_argument("--mayapy", help="mayapy executable, defaults to the one of $MAYA_LOCATION or the PATH")
+    run.add_argument("--logs", help="directory receiving job logs and reports, defaults to a temporary directory")
+    run.add_argument("--timeout", type=float, help="seconds after which a job is killed")
+    run.add_argument("--no-publish", action="store_true", help="build without publishing")
+    run.add_argument("--cache", help="publish cache directory shared by every job")
+    run.add_argument("--cache-size", type=float, help="publish cache size limit in GB")
+    run.add_argument("--report", help="write the summary report to this JSON file")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        return _build(args)
+
+    summary = runJobs(args.sessions, args.workers, args.mayapy, args.logs, args.timeout, not args.no_publish,
+                      args.cache, args.cache_size)
+    _log(f"{summary['ok']} built, {summary['failed']} failed in {summary['time']:.1f} s "
+         f"({summary['cache']['hits']} from cache), logs in {summary['logs']}")
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(summary, f, indent=2, sort_keys=True)
+
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
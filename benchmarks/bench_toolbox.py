@@ -0,0 +1,291 @@
+"""
+Micro-benchmarks for the toolbox attribute helpers and session setup.
+
+Sweeps node and attribute counts and reports wall time, scene command calls and
+allocations for each helper. Runs against the in-memory scene by default, or
+against Maya with --maya (from mayapy).
+
+    python benchmarks/bench_toolbox.py --save baseline.json
+    python benchmarks/bench_toolbox.py --compare baseline.json
+"""
+import argparse, importlib, json, os, sys, time, tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(ROOT))
+geppetto = importlib.import_module(os.path.basename(ROOT))
+tb = geppetto.tb
+scene = importlib.import_module(f"{geppetto.__name__}.utils.scene")
+
+
+class CountingScene(object):
+    """
+    Backend wrapper counting every command sent to the scene
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.calls = 0
+
+    def __getattr__(self, name):
+        command = getattr(self.backend, name)
+
+        def counted(*args, **kwargs):
+            self.calls += 1
+            return command(*args, **kwargs)
+
+        return counted
+
+
+'''       '''
+''' SCENE '''
+'''       '''
+
+def newScene(maya=False):
+    """
+    Start from an empty scene
+
+    Args:
+        maya (bool, optional): use the Maya session instead of an in-memory scene. Defaults to False.
+
+    Returns:
+        CountingScene: the new, current, backend
+    """
+    if maya:
+        import maya.cmds
+        maya.cmds.file(new=True, force=True)
+        backend = scene.MayaScene()
+    else:
+        backend = scene.MemoryScene()
+    counter = CountingScene(backend)
+    scene.setBackend(counter)
+
+    return counter
+
+
+def populate(nodes, attrs=0):
+    """
+    Create a session holding given number of modules, each with given number of float attributes
+
+    Args:
+        nodes (int): number of modules
+        attrs (int, optional): number of attributes per module. Defaults to 0.
+
+    Returns:
+        list: module names
+    """
+    tb.createBaseStructure()
+    modules = [tb.mc.group(n=f"module{i}", em=True, p="geppetto|modules") for i in range(nodes)]
+    tb.addAttributes([tb.attrSpec("float", f"setting{j}", module) for module in modules for j in range(attrs)])
+
+    return modules
+
+
+'''       '''
+''' CASES '''
+'''       '''
+
+def _modules(nodes):
+    return [tb.mc.group(n=f"node{i}", em=True) for i in range(nodes)]
+
+def _addFloat(nodes, attrs):
+    objs = _modules(nodes)
+    def run():
+        for obj in objs:
+            for j in range(attrs):
+                tb.addFloat(f"float{j}", obj, 1, min=0, max=10)
+    return run
+
+def _addEnum(nodes, attrs):
+    objs = _modules(nodes)
+    def run():
+        for obj in objs:
+            for j in range(attrs):
+                tb.addEnum(f"enum{j}", obj, ["a", "b", "c"])
+    return run
+
+def _addVector(nodes, attrs):
+    objs = _modules(nodes)
+    def run():
+        for obj in objs:
+            for j in range(attrs):
+                tb.addVector(f"vector{j}", obj)
+    return run
+
+def _addDivider(nodes, attrs):
+    objs = _modules(nodes)
+    def run():
+        for obj in objs:
+            for j in range(attrs):
+                tb.addDivider(f"DIVIDER{j}", obj)
+    return run
+
+def _addAttributes(nodes, attrs):
+    objs = _modules(nodes)
+    def run():
+        tb.addAttributes([tb.attrSpec("float", f"float{j}", obj, value=1, min=0, max=10) for obj in objs for j in range(attrs)])
+    return run
+
+def _createBaseStructure(nodes, attrs):
+    return tb.createBaseStructure
+
+def _getGeppetto(nodes, attrs):
+    populate(nodes, attrs)
+    def run():
+        for i in range(nodes):
+            tb.getGeppetto()
+    return run
+
+def _getModules(nodes, attrs):
+    populate(nodes, attrs)
+    def run():
+        for i in range(100):
+            tb.getModules()
+    return run
+
+CASES = {
+    "addFloat": _addFloat,
+    "addEnum": _addEnum,
+    "addVector": _addVector,
+    "addDivider": _addDivider,
+    "addAttributes": _addAttributes,
+    "createBaseStructure": _createBaseStructure,
+    "getGeppetto": _getGeppetto,
+    "getModules": _getModules,
+}
+
+
+'''        '''
+''' RUNNER '''
+'''        '''
+
+def measure(case, nodes, attrs, repeat=3, maya=False):
+    """
+    Measure one case at one scale
+
+    Args:
+        case (str): case name, key of CASES
+        nodes (int): number of nodes
+        attrs (int): number of attributes per node
+        repeat (int, optional): number of timed runs, the best one is kept. Defaults to 3.
+        maya (bool, optional): run in the Maya session. Defaults to False.
+
+    Returns:
+        dict: wall time in seconds, scene command calls, allocated blocks and peak allocated bytes
+    """
+    wall = None
+    for i in range(repeat):
+        counter = newScene(maya)
+        run = CASES[case](nodes, attrs)
+        counter.calls = 0
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        wall = elapsed if wall is None else min(wall, elapsed)
+    calls = counter.calls
+
+    # ALLOCATIONS ARE MEASURED APART, TRACING SLOWS EVERYTHING DOWN
+    newScene(maya)
+    run = CASES[case](nodes, attrs)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    run()
+    after = tracemalloc.take_snapshot()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    blocks = sum(max(stat.count_diff, 0) for stat in after.compare_to(before, "filename"))
+
+    return {"wall": wall, "calls": calls, "blocks": blocks, "peak": peak}
+
+
+def run(cases, nodes, attrs, repeat=3, maya=False):
+    """
+    Sweep every case over every node and attribute count
+
+    Args:
+        cases (list): case names, keys of CASES
+        nodes (list): node counts
+        attrs (list): attribute counts per node
+        repeat (int, optional): number of timed runs per measure. Defaults to 3.
+        maya (bool, optional): run in the Maya session. Defaults to False.
+
+    Returns:
+        dict: results keyed by "case[nodes x attrs]"
+    """
+    results = {}
+    for case in cases:
+        for n in nodes:
+            for a in attrs:
+                key = f"{case}[{n}x{a}]"
+                results[key] = measure(case, n, a, repeat, maya)
+                r = results[key]
+                print(f"{key:<36} {r['wall']*1000:>10.2f} ms {r['calls']:>9} calls {r['blocks']:>9} blocks {r['peak']/1024:>10.1f} KiB")
+
+    return results
+
+
+# ABSOLUTE DIFFERENCES BELOW THESE ARE NOISE, NOT REGRESSIONS
+NOISE = {"wall": 0.001, "blocks": 100}
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compare results with a saved baseline
+
+    Args:
+        results (dict): new results
+        baseline (dict): saved results
+        tolerance (float): allowed relative wall time and allocation increase
+
+    Returns:
+        list: regression descriptions, empty if none
+    """
+    regressions = []
+    for key, new in results.items():
+        old = baseline.get(key)
+        if not old:
+            continue
+        if new["calls"] > old["calls"]:
+            regressions.append(f"{key}: calls {old['calls']} -> {new['calls']}")
+        for metric, noise in NOISE.items():
+            if new[metric] > old[metric] * (1 + tolerance) and new[metric] - old[metric] > noise:
+                regressions.append(f"{key}: {metric} {old[metric]:.6g} -> {new[metric]:.6g}")
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", default=",".join(CASES), help="comma separated cases to run")
+    parser.add_argument("--nodes", default="10,100,1000", help="comma separated node counts")
+    parser.add_argument("--attrs", default="1,10", help="comma separated attribute counts per node")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per measure, the best one is kept")
+    parser.add_argument("--maya", action="store_true", help="run in a Maya standalone session")
+    parser.add_argument("--save", help="save results to this JSON baseline")
+    parser.add_argument("--compare", help="compare results with this JSON baseline, exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown when comparing")
+    args = parser.parse_args(argv)
+
+    if args.maya:
+        import maya.standalone
+        maya.standalone.initialize()
+
+    results = run(args.cases.split(","), [int(n) for n in args.nodes.split(",")],
+                  [int(a) for a in args.attrs.split(",")], args.repeat, args.maya)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
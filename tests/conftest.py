@@ -0,0 +1,45 @@
+"""
+Headless tests, run against the in-memory scene:
+
+    python -m pytest -q
+"""
+import importlib, os, sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(ROOT))
+geppetto = importlib.import_module(os.path.basename(ROOT))
+
+
+def _module(name):
+    return importlib.import_module(f"{geppetto.__name__}.utils.{name}")
+
+
+@pytest.fixture(autouse=True)
+def memoryScene():
+    """
+    Give each test its own empty scene and no session file
+    """
+    backend = _module("scene").MemoryScene()
+    _module("scene").setBackend(backend)
+    _module("toolbox").resetSession()
+    yield backend
+
+
+@pytest.fixture
+def mc():
+    return _module("scene").cmds
+
+
+@pytest.fixture
+def tb():
+    return _module("toolbox")
+
+
+@pytest.fixture
+def utils():
+    """
+    Import a utils module by name, like utils("puppet")
+    """
+    return _module
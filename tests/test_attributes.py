@@ -0,0 +1,43 @@
+def test_addAttributesReturnsNamesInOrder(tb, mc):
+    node = mc.group(n="node", em=True)
+    specs = [tb.attrSpec("float", "speed", node, value=2.5, min=0, max=10),
+             tb.attrSpec("enum", "mode", node, cases=["fk", "ik"], value=1),
+             tb.attrSpec("vector", "offset", node, value=[1, 2, 3]),
+             tb.attrSpec("string", "label", node, value="arm")]
+
+    assert tb.addAttributes(specs) == ["node.speed", "node.mode", "node.offset", "node.label"]
+    assert mc.getAttr("node.speed") == 2.5
+    assert mc.getAttr("node.mode") == 1
+    assert mc.getAttr("node.offset") == [(1, 2, 3)]
+    assert mc.getAttr("node.label") == "arm"
+
+
+def test_addAttributesSkipsExisting(tb, mc):
+    node = mc.group(n="node", em=True)
+    tb.addFloat("speed", node, value=1)
+    mc.setAttr("node.speed", 4)
+
+    assert tb.addAttributes([tb.attrSpec("float", "speed", node, value=2)]) == ["node.speed"]
+    assert mc.getAttr("node.speed") == 4
+
+
+def test_addAttributesSettings(tb, mc):
+    node = mc.group(n="node", em=True)
+    tb.addDivider("Settings", node)
+    tb.addInt("count", node, keyable=False, channelbox=False)
+
+    assert mc.getAttr("node.Settings", lock=True)
+    assert not mc.getAttr("node.count", keyable=True)
+    assert not mc.getAttr("node.count", channelBox=True)
+
+
+def test_getAttributesRoundTrip(tb, mc):
+    source = mc.group(n="source", em=True)
+    tb.addAttributes([tb.attrSpec("float", "speed", source, value=2.5, min=0, max=10),
+                      tb.attrSpec("enum", "mode", source, cases="fk:ik", value=1),
+                      tb.attrSpec("vector", "offset", source, value=[1, 2, 3], keyable=False)])
+    target = mc.group(n="target", em=True)
+    tb.addAttributes([dict(spec, obj=target) for spec in mc.getAttributes(source)])
+
+    assert [dict(spec, obj=None) for spec in mc.getAttributes(target)] \
+        == [dict(spec, obj=None) for spec in mc.getAttributes(source)]
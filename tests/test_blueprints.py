@@ -0,0 +1,90 @@
+import os
+
+
+INSTRUCTIONS = [{"name": "root", "type": "group", "parameters": {"name": "rootGrp"}},
+                {"name": "child", "type": "group", "parameters": {"name": "childGrp"}, "inputs": ["root"]}]
+
+
+def _blueprint(tb, instructions=INSTRUCTIONS):
+    tb.createBaseStructure()
+    blueprint = tb.createBlueprint("body")
+    tb.setInstructions(blueprint, [dict(instruction) for instruction in instructions])
+
+    return blueprint
+
+
+def test_hashIgnoresRuntimeState(tb):
+    instruction = dict(INSTRUCTIONS[0])
+    digest = tb.instructionHash(instruction)
+
+    assert tb.instructionHash(dict(instruction, build={"inputHash": "x"}, hash="y")) == digest
+    assert tb.instructionHash(dict(instruction, parameters={"name": "other"})) != digest
+
+
+def test_exportImportRoundTrip(tb, mc, tmp_path):
+    blueprint = _blueprint(tb)
+    digest = mc.getAttr(f"{blueprint}.blueprint_hash")
+    path = tb.exportBlueprint(blueprint, str(tmp_path))
+    assert os.path.basename(path) == f"body.{digest}.gpb"
+
+    mc.delete(blueprint)
+    assert tb.importBlueprint(path) == "body"
+    assert mc.getAttr("body.blueprint_hash") == digest
+    assert [instruction["name"] for instruction in tb.getInstructions("body")] == ["root", "child"]
+    assert tb.exportBlueprint("body", str(tmp_path)) == path
+
+
+def test_exportSkipsUnchanged(tb, tmp_path):
+    blueprint = _blueprint(tb)
+    path = tb.exportBlueprint(blueprint, str(tmp_path))
+    mtime = os.stat(path).st_mtime_ns
+
+    assert tb.exportBlueprint(blueprint, str(tmp_path)) == path
+    assert os.stat(path).st_mtime_ns == mtime
+
+
+def test_exportReplacesOlder(tb, tmp_path):
+    blueprint = _blueprint(tb)
+    old = tb.exportBlueprint(blueprint, str(tmp_path))
+    tb.setInstructions(blueprint, tb.getInstructions(blueprint)[:1])
+    new = tb.exportBlueprint(blueprint, str(tmp_path))
+
+    assert new != old
+    assert os.listdir(str(tmp_path)) == [os.path.basename(new)]
+
+
+def test_importKeepsUnchangedState(tb, tmp_path):
+    blueprint = _blueprint(tb)
+    changed = [dict(INSTRUCTIONS[0]), dict(INSTRUCTIONS[1], parameters={"name": "otherGrp"})]
+    tb.setInstructions(blueprint, changed)
+    path = tb.exportBlueprint(blueprint, str(tmp_path))
+
+    instructions = [dict(instruction) for instruction in INSTRUCTIONS]
+    instructions[0]["build"] = {"inputHash": "built"}
+    tb.setInstructions(blueprint, instructions)
+    tb.importBlueprint(path)
+
+    instructions = tb.getInstructions(blueprint)
+    assert instructions[0]["build"] == {"inputHash": "built"}
+    assert "build" not in instructions[1]
+    assert instructions[1]["parameters"] == {"name": "otherGrp"}
+
+
+def test_importSameHashDoesNotRead(tb, tmp_path):
+    blueprint = _blueprint(tb)
+    path = tb.exportBlueprint(blueprint, str(tmp_path))
+    with open(path, "w") as f:
+        f.write("not read")
+
+    assert tb.importBlueprint(path) == blueprint
+
+
+def test_syncBlueprints(tb, tmp_path):
+    blueprint = _blueprint(tb)
+    tb.createBlueprint("face")
+    tb.exportBlueprint(blueprint, str(tmp_path))
+    assert tb.syncBlueprints(str(tmp_path)) == []
+
+    tb.setInstructions(blueprint, [])
+    assert tb.syncBlueprints(str(tmp_path)) == ["body"]
+    assert len(tb.getInstructions(blueprint)) == 2
@@ -0,0 +1,102 @@
+import pytest
+
+
+def _instruction(name, inputs=(), **parameters):
+    return {"name": name, "type": "group", "parameters": dict(parameters, name=f"{name}Grp"), "inputs": list(inputs)}
+
+
+def _rig(tb):
+    tb.createBaseStructure()
+    arm = tb.createModule("arm", "arm", "L")
+    tb.addFloat("length", arm, value=1)
+    blueprint = tb.createBlueprint("body")
+    tb.setInstructions(blueprint, [_instruction("root"), _instruction("arm", ["root"], module="L_arm"),
+                                   _instruction("hand", ["arm"]), _instruction("other")])
+
+    return blueprint
+
+
+def test_order(tb, utils):
+    puppet = utils("puppet")
+    graph = puppet.BuildGraph([_instruction("child", ["root"]), _instruction("other"), _instruction("root")])
+
+    assert [instruction["name"] for instruction in graph.order] == ["other", "root", "child"]
+
+
+def test_cycle(tb, utils):
+    puppet = utils("puppet")
+    with pytest.raises(RuntimeError):
+        puppet.BuildGraph([_instruction("a", ["b"]), _instruction("b", ["a"])])
+
+
+def test_upstreamChangeChangesHash(tb, utils):
+    puppet = utils("puppet")
+    instructions = [_instruction("root"), _instruction("child", ["root"])]
+    graph = puppet.BuildGraph(instructions)
+    hashes = {}
+    for instruction in graph.order:
+        hashes[instruction["name"]] = graph.inputHash(instruction, hashes)
+
+    instructions[0]["parameters"]["name"] = "renamedGrp"
+    graph = puppet.BuildGraph(instructions)
+    changed = {}
+    for instruction in graph.order:
+        changed[instruction["name"]] = graph.inputHash(instruction, changed)
+    assert changed["child"] != hashes["child"]
+
+
+def test_skipClean(tb, mc, utils):
+    puppet = utils("puppet")
+    blueprint = _rig(tb)
+
+    assert puppet.buildPuppet(blueprint)["built"] == ["root", "arm", "hand", "other"]
+    report = puppet.buildPuppet(blueprint)
+    assert report["built"] == []
+    assert report["skipped"] == ["root", "arm", "hand", "other"]
+    assert mc.ls("rootGrp", "armGrp", "handGrp", "otherGrp") == ["rootGrp", "armGrp", "handGrp", "otherGrp"]
+
+
+def test_instructionChangeRebuildsDownstream(tb, utils):
+    puppet = utils("puppet")
+    blueprint = _rig(tb)
+    puppet.buildPuppet(blueprint)
+    instructions = tb.getInstructions(blueprint)
+    instructions[1]["parameters"]["side"] = "L"
+    tb.setInstructions(blueprint, instructions)
+
+    report = puppet.buildPuppet(blueprint)
+    assert report["built"] == ["arm", "hand"]
+    assert report["skipped"] == ["root", "other"]
+
+
+def test_moduleChangeRebuildsDownstream(tb, mc, utils):
+    puppet = utils("puppet")
+    blueprint = _rig(tb)
+    puppet.buildPuppet(blueprint)
+    mc.setAttr("L_arm.length", 2)
+
+    assert puppet.buildPuppet(blueprint)["built"] == ["arm", "hand"]
+
+
+def test_deletedNodesRebuildDownstream(tb, mc, utils):
+    puppet = utils("puppet")
+    blueprint = _rig(tb)
+    puppet.buildPuppet(blueprint)
+    mc.delete("rootGrp")
+
+    report = puppet.buildPuppet(blueprint)
+    assert report["built"] == ["root", "arm", "hand"]
+    assert report["skipped"] == ["other"]
+    assert mc.ls("rootGrp", "armGrp", "handGrp") == ["rootGrp", "armGrp", "handGrp"]
+
+
+def test_disabledAndForce(tb, utils):
+    puppet = utils("puppet")
+    blueprint = _rig(tb)
+    instructions = tb.getInstructions(blueprint)
+    instructions[3]["enabled"] = False
+    tb.setInstructions(blueprint, instructions)
+
+    report = puppet.buildPuppet(blueprint)
+    assert report["disabled"] == ["other"]
+    assert puppet.buildPuppet(blueprint, force=True)["built"] == ["root", "arm", "hand"]
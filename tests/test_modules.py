@@ -0,0 +1,64 @@
+def _modules(tb):
+    tb.createBaseStructure()
+    for name, moduleType, side in [("arm", "arm", "L"), ("arm", "arm", "R"), ("spine", "spine", "-")]:
+        tb.createModule(name, moduleType, side)
+
+    return tb.getModuleIndex()
+
+
+def test_index(tb):
+    index = _modules(tb)
+
+    assert tb.getModules() == ["L_arm", "R_arm", "spine"]
+    assert index.bySide("L") == ["L_arm"]
+    assert index.byType("arm") == ["L_arm", "R_arm"]
+    assert index.get("spine")["type"] == "spine"
+    assert index.get("missing") is None
+
+
+def test_indexDoesNotScan(tb, memoryScene):
+    index = _modules(tb)
+    index.names()
+    calls = []
+    listRelatives = memoryScene.listRelatives
+    memoryScene.listRelatives = lambda *args, **kwargs: calls.append(args) or listRelatives(*args, **kwargs)
+    for i in range(10):
+        tb.getModules()
+        index.byType("arm")
+
+    assert not calls
+
+
+def test_indexRename(tb, mc):
+    index = _modules(tb)
+    index.names()
+    mc.rename("L_arm", "R_leg")
+
+    assert tb.getModules() == ["R_leg", "R_arm", "spine"]
+    assert index.bySide("L") == []
+    assert index.bySide("R") == ["R_leg", "R_arm"]
+    assert index.byType("arm") == ["R_leg", "R_arm"]
+    assert index.get("R_leg")["side"] == "R"
+
+    # CALLBACKS FOLLOW THE NEW NAME
+    mc.rename("R_leg", "L_leg")
+    assert index.get("L_leg")["side"] == "L"
+
+
+def test_indexAddDelete(tb, mc):
+    index = _modules(tb)
+    index.names()
+    tb.createModule("neck", "neck")
+    mc.delete("R_arm")
+
+    assert tb.getModules() == ["L_arm", "spine", "neck"]
+    assert index.byType("arm") == ["L_arm"]
+
+
+def test_indexNewScene(tb, mc):
+    _modules(tb)
+    tb.getModules()
+    mc.file(new=True, force=True)
+    tb.createBaseStructure()
+
+    assert tb.getModules() == []
@@ -0,0 +1,173 @@
+import pytest
+
+
+ATTRS = {"multDoubleLinear": ["input1", "input2", "output"], "addDoubleLinear": ["input1", "input2", "output"],
+         "unitConversion": ["input", "conversionFactor", "output"], "decomposeMatrix": ["inputMatrix",
+         "inputRotateOrder", "outputTranslate"]}
+
+
+@pytest.fixture
+def optimizeGraph(utils):
+    return utils("optimize").optimizeGraph
+
+
+def _node(mc, nodeType, name, **values):
+    node = mc.createNode(nodeType, n=name)
+    for attr in ATTRS.get(nodeType, []):
+        mc.addAttr(node, ln=attr, at="double", dv=values.get(attr, 0))
+    if nodeType == "multiplyDivide":
+        mc.addAttr(node, ln="operation", at="long", dv=values.get("operation", 1))
+        for attr in ["input1", "input2", "output"]:
+            mc.addAttr(node, ln=attr, at="double3")
+            for axis in "XYZ":
+                mc.addAttr(node, ln=f"{attr}{axis}", at="double", p=attr, dv=values.get(f"{attr}{axis}", 0))
+
+    return node
+
+
+def _transform(tb, mc, name, *attrs):
+    node = mc.createNode("transform", n=name)
+    for attr in attrs:
+        tb.addFloat(attr, node)
+
+    return node
+
+
+def test_deleteDead(tb, mc, optimizeGraph):
+    _node(mc, "multDoubleLinear", "dead")
+    _transform(tb, mc, "ctrl")
+
+    report = optimizeGraph({"A": ["dead", "ctrl"]})
+    assert report["deleted"] == 1
+    assert report["before"] == 2 and report["after"] == 1
+    assert not mc.objExists("dead") and mc.objExists("ctrl")
+
+
+def test_foldConstants(tb, mc, optimizeGraph):
+    _node(mc, "multDoubleLinear", "mult", input1=2, input2=3)
+    _transform(tb, mc, "target", "value")
+    mc.connectAttr("mult.output", "target.value")
+
+    assert optimizeGraph({"A": ["mult", "target"]})["folded"] == 1
+    assert not mc.objExists("mult")
+    assert mc.getAttr("target.value") == 6
+
+
+def test_bypassIdentity(tb, mc, optimizeGraph):
+    _transform(tb, mc, "source", "value")
+    _transform(tb, mc, "target", "value")
+    _node(mc, "multDoubleLinear", "mult", input2=1)
+    mc.connectAttr("source.value", "mult.input1")
+    mc.connectAttr("mult.output", "target.value")
+
+    assert optimizeGraph({"A": ["mult", "target"]})["bypassed"] == 1
+    assert mc.listConnections("target.value", s=True, d=False, p=True) == ["source.value"]
+
+
+def test_mergeConversions(tb, mc, optimizeGraph):
+    _transform(tb, mc, "source", "value")
+    _transform(tb, mc, "target", "value")
+    _node(mc, "unitConversion", "first", conversionFactor=2)
+    _node(mc, "unitConversion", "second", conversionFactor=3)
+    mc.connectAttr("source.value", "first.input")
+    mc.connectAttr("first.output", "second.input")
+    mc.connectAttr("second.output", "target.value")
+
+    assert optimizeGraph({"A": ["first", "second"]})["conversions"] == 1
+    assert not mc.objExists("first")
+    assert mc.getAttr("second.conversionFactor") == 6
+    assert mc.listConnections("second.input", s=True, d=False, p=True) == ["source.value"]
+
+
+def _duplicates(tb, mc):
+    _transform(tb, mc, "driver", "matrix")
+    _transform(tb, mc, "target", "translate", "rotate")
+    for name, attr in [("dm0", "translate"), ("dm1", "rotate")]:
+        _node(mc, "decomposeMatrix", name)
+        mc.connectAttr("driver.matrix", f"{name}.inputMatrix")
+        mc.connectAttr(f"{name}.outputTranslate", f"target.{attr}")
+
+
+def test_mergeDuplicates(tb, mc, optimizeGraph):
+    _duplicates(tb, mc)
+
+    assert optimizeGraph({"A": ["dm0", "dm1", "target"]})["merged"] == 1
+    assert mc.ls("dm0", "dm1") == ["dm0"]
+    assert mc.listConnections("target.rotate", s=True, d=False, p=True) == ["dm0.outputTranslate"]
+
+
+def test_noMergeAcrossInstructions(tb, mc, optimizeGraph):
+    _duplicates(tb, mc)
+
+    assert optimizeGraph({"A": ["dm0"], "B": ["dm1"]})["merged"] == 0
+    assert mc.ls("dm0", "dm1") == ["dm0", "dm1"]
+
+
+def test_keepNodesReadElsewhere(tb, mc, optimizeGraph):
+    _transform(tb, mc, "source", "value")
+    _transform(tb, mc, "target", "value")
+    _node(mc, "multDoubleLinear", "mult", input2=1)
+    mc.connectAttr("source.value", "mult.input1")
+    mc.connectAttr("mult.output", "target.value")
+
+    # TARGET BELONGS TO ANOTHER INSTRUCTION
+    assert optimizeGraph({"A": ["mult"], "B": ["target"]})["bypassed"] == 0
+    assert mc.objExists("mult")
+
+
+def test_boundaryUntouched(tb, mc, optimizeGraph):
+    _node(mc, "multDoubleLinear", "given", input1=2, input2=3)
+    _node(mc, "multDoubleLinear", "other")
+    mc.connectAttr("given.output", "other.input1")
+
+    report = optimizeGraph({"A": ["given"]})
+    assert report["deleted"] == report["folded"] == 0
+    assert mc.objExists("other")
+
+
+def test_partlyConnectedCompound(tb, mc, optimizeGraph):
+    _transform(tb, mc, "source", "value")
+    _transform(tb, mc, "target", "first", "second")
+    for i, y in enumerate([2.0, 3.0]):
+        _node(mc, "multiplyDivide", f"md{i}", input2Y=y)
+        mc.connectAttr("source.value", f"md{i}.input2X")
+        mc.connectAttr(f"md{i}.output", f"target.{['first', 'second'][i]}")
+
+    # SAME CONNECTIONS, DIFFERENT CONSTANT CHILDREN
+    assert optimizeGraph({"A": ["md0", "md1", "target"]})["merged"] == 0
+    assert mc.ls("md0", "md1") == ["md0", "md1"]
+
+
+def test_rootsKept(tb, mc, optimizeGraph):
+    _duplicates(tb, mc)
+    _node(mc, "multDoubleLinear", "spare")
+
+    report = optimizeGraph({"A": ["dm0", "dm1", "target", "spare"]}, roots=["dm1", "spare"])
+    assert report["merged"] == 1 and report["deleted"] == 0
+    assert mc.ls("dm0", "dm1", "spare") == ["dm1", "spare"]
+    assert mc.listConnections("target.translate", s=True, d=False, p=True) == ["dm1.outputTranslate"]
+
+
+def test_buildKeepsOutputs(tb, mc, utils):
+    puppet = utils("puppet")
+
+    def decompose(instruction, context):
+        _duplicates(tb, mc)
+        _node(mc, "multDoubleLinear", "spare")
+        return {"nodes": ["target", "dm0", "dm1", "spare"], "translate": "dm1.outputTranslate", "spare": ["spare"]}
+
+    def read(instruction, context):
+        return {"nodes": [], "read": context["outputs"]["decompose"]["translate"]}
+
+    puppet.register("testDecompose", decompose)
+    puppet.register("testRead", read)
+    tb.createBaseStructure()
+    blueprint = tb.createBlueprint("body")
+    tb.setInstructions(blueprint, [{"name": "decompose", "type": "testDecompose", "parameters": {}},
+                                   {"name": "read", "type": "testRead", "parameters": {}, "inputs": ["decompose"]}])
+
+    report = puppet.buildPuppet(blueprint, optimize=True)
+    assert report["optimize"]["merged"] == 1
+    assert mc.ls("dm0", "dm1", "spare") == ["dm1", "spare"]
+    assert tb.getInstructions(blueprint)[0]["build"]["outputs"]["nodes"] == ["target", "dm1", "spare"]
+    assert puppet.buildPuppet(blueprint, optimize=True)["skipped"] == ["decompose", "read"]
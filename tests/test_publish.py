@@ -0,0 +1,111 @@
+import os
+
+
+def _file(tmp_path, name, size):
+    path = tmp_path / name
+    path.write_bytes(os.urandom(size))
+
+    return str(path)
+
+
+def _age(cache, digest, seconds):
+    os.utime(cache.path(digest), (seconds, seconds))
+
+
+def test_putFetch(utils, tmp_path):
+    cache = utils("cache").PublishCache(str(tmp_path / "cache"))
+    source = _file(tmp_path, "rig.mb", 100)
+    cache.put("abc", source)
+    destination = str(tmp_path / "publish" / "rig.mb")
+
+    assert cache.fetch("abc", destination)
+    assert not cache.fetch("def", destination)
+    assert open(destination, "rb").read() == open(source, "rb").read()
+    assert cache.stats() == {"hits": 1, "misses": 1, "evictions": 0, "entries": 1, "size": 100}
+
+
+def test_copiesNotLinks(utils, tmp_path):
+    cache = utils("cache").PublishCache(str(tmp_path / "cache"))
+    cache.put("abc", _file(tmp_path, "rig.mb", 100))
+    destination = str(tmp_path / "published.mb")
+    cache.fetch("abc", destination)
+    with open(destination, "wb") as f:
+        f.write(b"saved in place")
+
+    assert os.path.getsize(cache.path("abc")) == 100
+
+
+def test_evictLeastRecentlyUsed(utils, tmp_path):
+    cache = utils("cache").PublishCache(str(tmp_path / "cache"), maxSize=300)
+    for i, digest in enumerate(["a", "b", "c"]):
+        cache.put(digest, _file(tmp_path, f"{digest}.mb", 100))
+        _age(cache, digest, 1000 + i)
+    # USED LAST
+    cache.get("a")
+
+    cache.put("d", _file(tmp_path, "d.mb", 100))
+    assert cache.evictions == 1
+    assert cache.get("b") is None
+    assert all(cache.get(digest) for digest in ["a", "c", "d"])
+    assert cache.size() <= 300
+
+
+def test_evictKeepsNewEntry(utils, tmp_path):
+    cache = utils("cache").PublishCache(str(tmp_path / "cache"), maxSize=100)
+    cache.put("a", _file(tmp_path, "a.mb", 100))
+    _age(cache, "a", 1000)
+    cache.put("big", _file(tmp_path, "big.mb", 200))
+
+    assert cache.get("a") is None
+    assert cache.get("big")
+
+
+def _session(tb, mc, tmp_path):
+    tb.createBaseStructure()
+    arm = tb.createModule("arm", "arm", "L")
+    guide = mc.createNode("joint", n="L_arm_guide", p=f"{tb.getGeppetto()}|modules|{arm}")
+    tb.addFloat("twist", guide, value=0.1 + 0.2)
+    mc.xform(guide, m=(1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1, 0, 0.1 + 0.2, 1 / 3, -1e-9, 1))
+    tb.createModule("spine", "spine")
+    blueprint = tb.createBlueprint("body")
+    tb.setInstructions(blueprint, [{"name": "root", "type": "group", "parameters": {"name": "rootGrp"}}])
+    mc.setAttr(f"{tb.getGeppetto()}.rig_name", "bob", type="string")
+
+    return str(tmp_path / "session.gpto")
+
+
+def test_sessionHashSaveReopen(tb, mc, tmp_path):
+    path = _session(tb, mc, tmp_path)
+    tb.saveSession(path)
+    digest = tb.sessionHash()
+
+    tb.openSession(path)
+    assert tb.sessionHash() == digest
+    tb.loadModule("L_arm")
+    assert tb.sessionHash() == digest
+
+    tb.saveSession()
+    tb.openSession(path)
+    assert tb.sessionHash() == digest
+
+
+def test_sessionHashIgnoresDrift(tb, mc, tmp_path):
+    path = _session(tb, mc, tmp_path)
+    tb.saveSession(path)
+    digest = tb.sessionHash()
+    tb.openSession(path)
+    tb.loadModule("L_arm")
+    mc.setAttr("L_arm_guide.twist", 0.3 + 1e-12)
+
+    assert tb.sessionHash() == digest
+
+
+def test_sessionHashChanges(tb, mc, tmp_path):
+    path = _session(tb, mc, tmp_path)
+    tb.saveSession(path)
+    digest = tb.sessionHash()
+    tb.openSession(path)
+    tb.loadModule("L_arm")
+    mc.setAttr("L_arm_guide.twist", 0.5)
+
+    assert tb.sessionHash() != digest
@@ -0,0 +1,64 @@
+import pytest
+
+
+def _countLookups(backend):
+    calls = []
+    ls = backend.ls
+    backend.ls = lambda *args, **kwargs: calls.append(args) or ls(*args, **kwargs)
+
+    return calls
+
+
+def test_rootLookedUpOnce(tb, memoryScene):
+    tb.createBaseStructure()
+    calls = _countLookups(memoryScene)
+    for i in range(10):
+        assert tb.getGeppetto() == "|geppetto"
+
+    assert len(calls) <= 1
+
+
+def test_rootFollowsReparent(tb, mc):
+    tb.createBaseStructure()
+    tb.getGeppetto()
+    mc.parent("geppetto", mc.group(n="world", em=True))
+
+    assert tb.getGeppetto() == "|world|geppetto"
+
+
+def test_rootRenamed(tb, mc):
+    tb.createBaseStructure()
+    tb.getGeppetto()
+    mc.rename("geppetto", "puppeteer")
+
+    assert not tb.geppettoExists()
+
+
+def test_rootDeleted(tb, mc):
+    tb.createBaseStructure()
+    assert tb.geppettoExists()
+
+    mc.delete("geppetto")
+    assert not tb.geppettoExists()
+    with pytest.raises(RuntimeError):
+        tb.getGeppetto()
+
+
+def test_rootClearedOnNewScene(tb, mc, memoryScene):
+    tb.createBaseStructure()
+    tb.getGeppetto()
+    mc.file(new=True, force=True)
+    assert not tb.geppettoExists()
+
+    tb.createBaseStructure()
+    calls = _countLookups(memoryScene)
+    assert tb.getGeppetto() == "|geppetto"
+    assert len(calls) == 1
+
+
+def test_rootPerBackend(tb, utils):
+    tb.createBaseStructure()
+    tb.getGeppetto()
+    utils("scene").setBackend(utils("scene").MemoryScene())
+
+    assert not tb.geppettoExists()
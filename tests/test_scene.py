@@ -0,0 +1,76 @@
+import pytest
+
+
+def test_hierarchy(mc):
+    root = mc.group(n="root", em=True)
+    child = mc.group(n="child", em=True)
+    mc.parent(child, root)
+
+    assert mc.ls("child", l=True) == ["|root|child"]
+    assert mc.listRelatives("root", c=True) == ["child"]
+
+    mc.rename("|root|child", "renamed")
+    assert mc.objExists("renamed") and not mc.objExists("child")
+
+    mc.delete("root")
+    assert not mc.objExists("renamed")
+
+
+def test_handlesFollowNodes(mc):
+    node = mc.group(n="node", em=True)
+    handle = mc.getHandle(node)
+    parent = mc.group(n="parent", em=True)
+    mc.parent(node, parent)
+    mc.rename("|parent|node", "other")
+
+    assert mc.resolveHandle(handle) == "|parent|other"
+
+    mc.delete("other")
+    assert mc.resolveHandle(handle) is None
+
+
+def test_connections(tb, mc):
+    source = mc.group(n="source", em=True)
+    target = mc.group(n="target", em=True)
+    tb.addFloat("out", source, value=3)
+    tb.addFloat("in", target)
+    mc.connectAttr("source.out", "target.in")
+
+    assert mc.getAttr("target.in") == 3
+    assert mc.listConnections("source", s=False, d=True, c=True, p=True) == ["source.out", "target.in"]
+    with pytest.raises(RuntimeError):
+        mc.setAttr("target.in", 1)
+
+    mc.disconnectAttr("source.out", "target.in")
+    assert mc.listConnections("target", s=True, d=False) is None
+
+
+def test_fileRoundTrip(tb, mc, tmp_path):
+    source = mc.group(n="source", em=True)
+    target = mc.createNode("joint", n="target", p=source)
+    tb.addAttributes([tb.attrSpec("float", "out", source, value=3, min=0),
+                      tb.attrSpec("vector", "offset", target, value=[1, 2, 3])])
+    mc.connectAttr("source.out", "target.offsetY")
+    mc.xform(target, m=(1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1, 0, 1, 2, 3, 1))
+    events = []
+    mc.addSceneCallback(lambda *event: events.append(event[0]))
+
+    path = str(tmp_path / "scene.ma")
+    mc.file(rename=path)
+    mc.file(save=True, type="mayaAscii")
+    mc.file(new=True, force=True)
+    assert not mc.objExists("source")
+
+    mc.file(path, open=True, force=True)
+    assert events == ["new", "opened"]
+    assert mc.file(q=True, sn=True) == path
+    assert mc.ls("target", l=True) == ["|source|target"]
+    assert mc.getAttr("target.offset") == [(1, 3, 3)]
+    assert mc.xform("target", q=True, m=True)[12:15] == [1, 2, 3]
+    assert mc.getAttributes("source") == [{"type": "float", "attr": "out", "obj": "source", "value": 3, "keyable": True,
+                                           "locked": False, "channelbox": True, "min": 0}]
+
+
+def test_saveNeedsName(mc):
+    with pytest.raises(RuntimeError):
+        mc.file(save=True)
@@ -0,0 +1,169 @@
+import os, random
+
+import pytest
+
+
+def _payload(seed):
+    rng = random.Random(seed)
+
+    return {"values": [rng.random() for i in range(500)]}
+
+
+def _sections(**payloads):
+    return {("module", name): {"meta": {"side": "-"}, "payload": payload} for name, payload in payloads.items()}
+
+
+def test_roundTrip(utils, tmp_path):
+    session = utils("session")
+    path = str(tmp_path / "session.gpto")
+    session.SessionFile(path).save({"rig_name": "bob"}, _sections(arm=_payload(0), leg=_payload(1)))
+
+    reopened = session.SessionFile(path)
+    assert session.isSessionFile(path)
+    assert reopened.settings == {"rig_name": "bob"}
+    assert reopened.keys("module") == ["arm", "leg"]
+    assert reopened.meta("module", "leg") == {"side": "-"}
+    assert reopened.read("module", "leg") == _payload(1)
+
+
+def test_appendChangedOnly(utils, tmp_path):
+    session = utils("session")
+    path = str(tmp_path / "session.gpto")
+    sessionFile = session.SessionFile(path)
+    sessionFile.save({}, _sections(arm=_payload(0), leg=_payload(1), spine=_payload(2)))
+    offsets = {key: section["offset"] for key, section in sessionFile.sections.items()}
+    size = os.path.getsize(path)
+
+    sections = _sections(arm=_payload(3))
+    sections.update({("module", "leg"): {}, ("module", "spine"): {}})
+    sessionFile.save({}, sections)
+
+    assert sessionFile.sections["module/arm"]["offset"] >= size
+    assert sessionFile.sections["module/leg"]["offset"] == offsets["module/leg"]
+    assert os.path.getsize(path) > size
+    assert session.SessionFile(path).read("module", "arm") == _payload(3)
+    assert session.SessionFile(path).read("module", "spine") == _payload(2)
+
+
+def test_unchangedPayloadKept(utils, tmp_path):
+    session = utils("session")
+    path = str(tmp_path / "session.gpto")
+    sessionFile = session.SessionFile(path)
+    sessionFile.save({}, _sections(arm=_payload(0), leg=_payload(1)))
+    offsets = {key: section["offset"] for key, section in sessionFile.sections.items()}
+
+    sessionFile.save({}, _sections(arm=_payload(0), leg=_payload(1)))
+
+    assert {key: section["offset"] for key, section in sessionFile.sections.items()} == offsets
+
+
+def test_compaction(utils, tmp_path):
+    session = utils("session")
+    path = str(tmp_path / "session.gpto")
+    sessionFile = session.SessionFile(path)
+    sessionFile.save({}, _sections(arm=_payload(0), leg=_payload(1)))
+    size = os.path.getsize(path)
+    for seed in range(2, 6):
+        sessionFile.save({}, _sections(arm=_payload(seed), leg=_payload(1)))
+
+    # NEVER MORE DEAD THAN LIVE BYTES
+    assert os.path.getsize(path) < 2 * size
+    reopened = session.SessionFile(path)
+    assert reopened.read("module", "arm") == _payload(5)
+    assert reopened.read("module", "leg") == _payload(1)
+
+
+def test_previousName(utils, tmp_path):
+    session = utils("session")
+    path = str(tmp_path / "session.gpto")
+    sessionFile = session.SessionFile(path)
+    sessionFile.save({}, _sections(arm=_payload(0)))
+
+    sessionFile.save({}, {("module", "L_arm"): {"meta": {"side": "L"}, "previous": "arm"}})
+
+    reopened = session.SessionFile(path)
+    assert reopened.keys("module") == ["L_arm"]
+    assert reopened.meta("module", "L_arm") == {"side": "L"}
+    assert reopened.read("module", "L_arm") == _payload(0)
+
+
+def test_foreignFile(utils, tmp_path):
+    session = utils("session")
+    path = tmp_path / "notes.txt"
+    path.write_text("not a session")
+
+    assert not session.isSessionFile(str(path))
+    with pytest.raises(IOError):
+        session.SessionFile(str(path))
+
+    session.SessionFile(str(path), overwrite=True).save({}, _sections(arm=_payload(0)))
+    assert session.SessionFile(str(path)).read("module", "arm") == _payload(0)
+
+
+def _session(tb, mc):
+    tb.createBaseStructure()
+    arm = tb.createModule("arm", "arm", "L")
+    guide = mc.createNode("joint", n="L_arm_guide", p=f"{tb.getGeppetto()}|modules|{arm}")
+    tb.addFloat("twist", guide, value=0.25)
+    mc.xform(guide, m=(1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1, 0, 0.1, 0.2, 0.3, 1))
+    tb.createModule("spine", "spine")
+    blueprint = tb.createBlueprint("body")
+    tb.setInstructions(blueprint, [{"name": "root", "type": "group", "parameters": {"name": "rootGrp"}}])
+
+
+def _renamed(data, module):
+    return dict(data, guides=[dict(guide, parent=module) for guide in data["guides"]])
+
+
+def test_lazyModules(tb, mc, tmp_path):
+    _session(tb, mc)
+    path = str(tmp_path / "session.gpto")
+    data = tb.getModuleData("L_arm")
+    tb.saveSession(path)
+
+    tb.openSession(path)
+    assert tb.getModules() == ["L_arm", "spine"]
+    assert not mc.objExists("L_arm_guide")
+
+    # RENAMED BEFORE BEING LOADED
+    mc.rename("L_arm", "R_arm")
+    assert tb.getModuleData("R_arm") == _renamed(data, "R_arm")
+    assert tb.getInstructions("body")[0]["name"] == "root"
+
+
+def test_saveKeepsUnloaded(tb, mc, tmp_path):
+    _session(tb, mc)
+    path = str(tmp_path / "session.gpto")
+    data = tb.getModuleData("L_arm")
+    tb.saveSession(path)
+    tb.openSession(path)
+    mc.rename("L_arm", "R_arm")
+    tb.saveSession()
+
+    tb.openSession(path)
+    assert tb.getModules() == ["R_arm", "spine"]
+    assert tb.getModuleData("R_arm") == _renamed(data, "R_arm")
+
+
+def test_saveRefusesForeignFile(tb, mc, tmp_path):
+    _session(tb, mc)
+    path = tmp_path / "notes.txt"
+    path.write_text("not a session")
+
+    with pytest.raises(RuntimeError):
+        tb.saveSession(str(path))
+    assert path.read_text() == "not a session"
+
+    tb.saveSession(str(path), overwrite=True)
+    tb.openSession(str(path))
+    assert tb.getModules() == ["L_arm", "spine"]
+
+
+def test_newSceneForgetsSessionFile(tb, mc, tmp_path):
+    _session(tb, mc)
+    tb.saveSession(str(tmp_path / "session.gpto"))
+    mc.file(new=True, force=True)
+    tb.createBaseStructure()
+
+    with pytest.raises(RuntimeError):
+        tb.saveSession()
@@ -0,0 +1,162 @@
+import functools, re
+
+
+# INSTRUCTION HEADER HUES ARE ROUNDED TO THIS STEP, ONE RULE EACH
+HUE_STEP = 15
+
+SIDE_COLORS = {"-": (255, 255, 255), "L": (108, 200, 255), "R": (255, 108, 108)}
+
+# $px(n) SIZES ARE SCALED BY THE SCREEN RATIO WHEN COMPILING, $sides AND $hues ARE GENERATED RULES
+_TEMPLATE = '''
+QLineEdit {
+    border-radius: 5px;
+    }
+QLineEdit:focus {
+    border: 1 solid white;
+    }
+QScrollArea, QListView {
+    border: 0;
+    }
+
+/* MODULES TAB */
+QFrame#modulesFrame, QFrame#modulesFrame QFrame {
+    background-color: #373737;
+    border-radius: 5px;
+    }
+QFrame#modulesFrame QPushButton {
+    border-radius: 5px;
+    background-color: #EEF4F9;
+    color: #373737;
+    }
+QFrame#modulesFrame QPushButton:hover {
+    background-color: #BCC0C4;
+    }
+QSlider#jointSlider::groove:horizontal {
+    background-color: #444444;
+    border: 0px solid #424242;
+    height: $px(5)px;
+    border-radius: $px(4)px;
+    }
+QSlider#jointSlider::handle:horizontal {
+    background-color: white;
+    border: 0px solid white;
+    width: $px(15)px;
+    height: $px(15)px;
+    line-height: $px(16)px;
+    margin-top: $px(-5)px;
+    margin-bottom: $px(-5)px;
+    border-radius: $px(7)px;
+    }
+QPushButton#addButton, QFrame#modulesFrame QPushButton#addButton {
+    background-color: #51C080;
+    border-radius: 5px;
+    font-weight: bold;
+    font-size: 24px;
+    color: white;
+    }
+QPushButton#addButton:hover, QFrame#modulesFrame QPushButton#addButton:hover {
+    background-color: #6FCF97;
+    }
+QLabel#sectionLabel {
+    color: white;
+    font-weight: bold;
+    border-bottom: 1px solid white;
+    }
+#whiteLine {
+    background-color: white;
+    }
+SideButton {
+    color: white;
+    border: none;
+    border-radius: 6px;
+    font-weight: bold;
+    }
+$sides
+
+/* BLUEPRINT TABS */
+DragItem#dropIndicator {
+    background-color: white;
+    border: 1px solid white;
+    }
+QFrame#instructionHeader {
+    border: none;
+    border-radius: 5px;
+    }
+QFrame#instructionHeader * {
+    color: white;
+    }
+$hues
+QFrame#instructionHeader QCheckBox {
+    border-radius: 5px;
+    border: none;
+    background-color: white;
+    color: black;
+    }
+QFrame#instructionHeader QToolButton {
+    border: none;
+    }
+QLabel#instructionDescription {
+    font-size: 14px;
+    }
+QScrollArea#instructionContent {
+    background-color: rgba(0,0,0,0);
+    border: none;
+    }
+EditableLabel {
+    background-color: rgba(0, 0, 0, 0);
+    border: none;
+    }
+EditableLabel[editing="true"] {
+    background-color: rgba(0, 0, 0, 70);
+    }
+'''
+
+
+def hueBucket(hue):
+    """
+    Returns:
+        int: given hue rounded to the closest compiled one, the value of the instruction header "hue" property
+    """
+    return int(round(hue / HUE_STEP) * HUE_STEP) % 360
+
+
+@functools.lru_cache()
+def compileStyleSheet(ratio):
+    """
+    Build the Workshop stylesheet, applied once on the window. Cached per screen ratio.
+
+    Args:
+        ratio (float): screen ratio, see getScreenRatio
+
+    Returns:
+        str: stylesheet
+    """
+    sides = "\n".join(f'SideButton[side="{side}"] {{ background-color: rgba({r}, {g}, {b}, 50); }}'
+                      for side, (r, g, b) in SIDE_COLORS.items())
+    hues = "\n".join(f'QFrame#instructionHeader[hue="{hue}"] {{ background-color: hsl({hue}, 50, 100); }}'
+                     for hue in range(0, 360, HUE_STEP))
+
+    ret = re.sub(r"\$px\((-?\d+)\)", lambda match: str(round(int(match.group(1)) * ratio)), _TEMPLATE)
+
+    return ret.replace("$sides", sides).replace("$hues", hues)
+
+
+def setState(widget, name, value):
+    """
+    Set a dynamic property the stylesheet selects on, and restyle the widget only if it changed
+
+    Args:
+        widget (QWidget): widget
+        name (str): property name
+        value (str): property value
+    """
+    if widget.property(name) == value:
+        return
+
+    widget.setProperty(name, value)
+    style = widget.style()
+    style.unpolish(widget)
+    style.polish(widget)
+    widget.update()
+
+    return
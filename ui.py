@@ -1,15 +1,19 @@
-import maya.cmds as mc
 from maya import OpenMayaUI
 from maya.app.general.mayaMixin import MayaQWidgetDockableMixin
 
-import os, sys
+import bisect, collections, os, sys, time
 import importlib as imp
-from shiboken2 import wrapInstance
+from shiboken2 import isValid, wrapInstance
 from PySide2.QtWidgets import *
 from PySide2.QtCore import *
 from PySide2.QtGui import *
+from PySide2.QtSvg import QSvgRenderer
 
+from . import theme
 from .utils import toolbox as tb
+from .utils import guides, mirror, profiler, puppet, sync
+from .utils.session import isSessionFile
+from .utils.scene import cmds as mc
 
 imp.reload(tb)
  
@@ -39,16 +43,176 @@ def delete_workspace_control(control):
     return
 
 
+class ScreenRatio(QObject):
+    """
+    Screen ratio service: ratio of the screen showing the Workshop to a 144 dpi screen.
+    Ratios are computed once per screen, fonts and metrics built from them are cached,
+    changed is emitted when the watched window moves to a screen with another ratio.
+    """
+    changed = Signal(float)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._ratios = {}
+        self._fonts = {}
+        self._metrics = {}
+        self._screen = None
+        self._watched = None
+
+    def ratio(self, screen=None):
+        screen = screen or self._screen or QGuiApplication.primaryScreen()
+        name = screen.name()
+        if name not in self._ratios:
+            self._ratios[name] = screen.logicalDotsPerInchX() / 144
+        
+        return self._ratios[name]
+
+    def font(self, pixelSize, bold=False):
+        """
+        Returns:
+            QFont: shared font of given size in 144 dpi pixels, don't modify it
+        """
+        key = (pixelSize, bold)
+        if key not in self._fonts:
+            font = QFont()
+            font.setPixelSize(round(pixelSize*self.ratio()))
+            font.setBold(bold)
+            self._fonts[key] = font
+        
+        return self._fonts[key]
+
+    def fontMetrics(self, font):
+        key = font.key()
+        if key not in self._metrics:
+            self._metrics[key] = QFontMetrics(font)
+        
+        return self._metrics[key]
+
+    def watch(self, widget):
+        """
+        Follow the screen of given widget window, it has to be shown
+        """
+        window = widget.window().windowHandle()
+        if window is None or window is self._watched:
+            return
+        
+        self._watched = window
+        window.screenChanged.connect(self._onScreenChanged)
+        self._onScreenChanged(window.screen())
+        
+        return
+
+    def _onScreenChanged(self, screen):
+        old = self.ratio()
+        self._screen = screen
+        new = self.ratio()
+        if new != old:
+            self._fonts.clear()
+            self._metrics.clear()
+            self.changed.emit(new)
+        
+        return
+
+screenRatio = ScreenRatio()
+
+
+# QWIDGETSIZE_MAX, WIDGETS WITHOUT A MAXIMUM SIZE
+WIDGET_SIZE_MAX = (1 << 24) - 1
+
+
 def getScreenRatio():
-    dpi = QDesktopWidget().logicalDpiX()
-    
-    return dpi/144
+    return screenRatio.ratio()
+
+
+class IconCache(object):
+    """
+    Process-wide cache of rasterized icons keyed by (file, size, device pixel ratio).
+    SVGs are rendered once at the exact pixel size through QSvgRenderer,
+    the least recently used pixmaps are evicted past maxSize entries.
+    """
+    ICONS_DIR = os.path.join(os.path.dirname(__file__), "icons")
+
+    def __init__(self, maxSize=256):
+        self.maxSize = maxSize
+        self.hits = 0
+        self.misses = 0
+        self._pixmaps = collections.OrderedDict()
+
+    def pixmap(self, filename, width=None, height=None, ratio=1.0):
+        """
+        Get an icon pixmap, fitted in given size keeping its aspect ratio
+
+        Args:
+            filename (str): file name in the icons directory, or absolute path
+            width (float, optional): width in device independent pixels. Defaults to the icon size.
+            height (float, optional): height in device independent pixels. Defaults to the icon size.
+            ratio (float, optional): device pixel ratio of the screen showing the icon. Defaults to 1.0.
+
+        Returns:
+            QPixmap: icon, shared, don't paint on it
+        """
+        key = (filename, width and round(width), height and round(height), ratio)
+        pixmap = self._pixmaps.get(key)
+        if pixmap is not None:
+            self.hits += 1
+            self._pixmaps.move_to_end(key)
+            return pixmap
+
+        self.misses += 1
+        path = filename if os.path.isabs(filename) else os.path.join(self.ICONS_DIR, filename)
+        if path.endswith(".svg"):
+            renderer = QSvgRenderer(path)
+            size = renderer.defaultSize()
+            if width and height:
+                size.scale(round(width*ratio), round(height*ratio), Qt.KeepAspectRatio)
+            pixmap = QPixmap(size)
+            pixmap.fill(Qt.transparent)
+            painter = QPainter(pixmap)
+            renderer.render(painter)
+            painter.end()
+        else:
+            pixmap = QPixmap(path)
+            if width and height:
+                pixmap = pixmap.scaled(round(width*ratio), round(height*ratio), Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        pixmap.setDevicePixelRatio(ratio)
+
+        self._pixmaps[key] = pixmap
+        while len(self._pixmaps) > self.maxSize:
+            self._pixmaps.popitem(last=False)
+
+        return pixmap
+
+    def stats(self):
+        """
+        Returns:
+            dict: {"hits", "misses", "size"}
+        """
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._pixmaps)}
+
+    def clear(self):
+        self._pixmaps.clear()
+        self.hits = self.misses = 0
+        return
+
+iconCache = IconCache()
+
+# SCENE EVENTS, DELIVERED TO THE WORKSHOP ONCE PER EVENT LOOP CYCLE
+sceneSync = sync.SceneSync(lambda flush: QTimer.singleShot(0, flush))
 
 
 class Workshop(MayaQWidgetDockableMixin, QMainWindow):
     TOOL_NAME = 'Geppetto'
     _menuBar = None
     _mainWidget = None
+    fastBuild = False
+    optimizeBuild = False
+    startupPhases = None
+    model = None
+    _syncListener = None
+    mirrorPlane = "YZ"
+    JOINT_SCALE_STEPS = 50
+    SESSION_FILTER = "Geppetto session (*.gpt)"
+    BLUEPRINT_FILTER = f"Geppetto blueprint (*{tb.BLUEPRINT_EXTENSION})"
 
     def __init__(self, parent=None):
         # DELETE WINDOW IF ALREADY EXISTS
@@ -64,31 +228,134 @@ class Workshop(MayaQWidgetDockableMixin, QMainWindow):
         self.setWindowFlags(Qt.Window)
         self.setWindowTitle(self.TOOL_NAME)
         self.resize(700*self.ratio, 1000*self.ratio)
+        
+        # ONE STYLESHEET FOR THE WHOLE WINDOW, WIDGETS ONLY SET NAMES AND STATES
+        self.setStyleSheet(theme.compileStyleSheet(self.ratio))
                 
         return
     
     
-    def start(self):
+    def start(self, startTime=None):
+        """
+        Build and show the window. Only the current tab is built before showing it, other tabs are built
+        on first activation and heavy population runs once the event loop is idle.
+        Startup phases are logged, see startupPhases.
+
+        Args:
+            startTime (float, optional): time.perf_counter() when the tool was launched,
+                to include the window creation in the timings. Defaults to now.
+        """
+        self._phaseStart = time.perf_counter() if startTime is None else startTime
+        self._launchTime = self._phaseStart
+        self.startupPhases = []
+        self._starting = True
+        self._deferred = []
+        self._tabBuilders = {}
+        self.model = None
+        if startTime is not None:
+            self._phase("window")
+        
         self._mainWidget = QWidget()
         self.setCentralWidget(self._mainWidget)
-        self._mainWidget.setStyleSheet('''
-                                       QLineEdit {
-                                           border-radius: 5px;
-                                           }
-                                       QLineEdit:focus {
-                                           border: 1 solid white;
-                                           }
-                                       ''')
         
-        if not tb.geppettoExists():
+        # KEEP IN STEP WITH THE SCENE, ONLY THE LAST WORKSHOP LISTENS
+        sceneSync.removeListener(Workshop._syncListener)
+        Workshop._syncListener = self._onSceneChanged
+        sceneSync.addListener(self._onSceneChanged)
+        sceneSync.start()
+        self._hasSession = tb.geppettoExists()
+        
+        if not self._hasSession:
             # IF GEPPETTO DOESN'T EXISTS, CREATE START UI
             self._buildStartUI()
         else:
             # ELSE BUILD STANDARD UI
             self._buildUI()
+        self._phase("build")
         
         # SHOW WINDOW AND SET DOCKABLE
         super(self.__class__, self).show(dockable=True)
+        self._phase("show")
+        
+        # RELAYOUT ONCE WHEN MOVED TO A SCREEN WITH ANOTHER RATIO
+        if not getattr(self, "_watchingRatio", False):
+            screenRatio.changed.connect(self._onRatioChanged)
+            self._watchingRatio = True
+        screenRatio.watch(self)
+        
+        self._logPhases("interactive")
+        
+        return
+
+    def _onRatioChanged(self, ratio):
+        # RESTYLE AND RESCALE IN PLACE, REBUILDING WOULD DROP BUILT TABS AND RESTART A STARTUP IN PROGRESS
+        factor = ratio / self.ratio
+        self.ratio = ratio
+        self.setStyleSheet(theme.compileStyleSheet(ratio))
+        if factor != 1:
+            self._rescale(factor)
+        
+        return
+
+    def _rescale(self, factor):
+        """
+        Scale the window and the size constraints of every widget in it, layouts follow
+        """
+        for widget in self.findChildren(QWidget):
+            minimum, maximum = widget.minimumSize(), widget.maximumSize()
+            if minimum.width() or minimum.height():
+                widget.setMinimumSize(round(minimum.width() * factor), round(minimum.height() * factor))
+            if maximum.width() < WIDGET_SIZE_MAX or maximum.height() < WIDGET_SIZE_MAX:
+                widget.setMaximumSize(*[size if size >= WIDGET_SIZE_MAX else round(size * factor)
+                                        for size in (maximum.width(), maximum.height())])
+        self.resize(round(self.width() * factor), round(self.height() * factor))
+        
+        return
+
+    def _phase(self, name):
+        now = time.perf_counter()
+        self.startupPhases.append((name, now - self._phaseStart))
+        self._phaseStart = now
+        
+        return
+
+    def _logPhases(self, label):
+        phases = ", ".join(f"{name} {elapsed * 1000:.1f} ms" for name, elapsed in self.startupPhases)
+        tb.print(f"Geppetto {label} in {(time.perf_counter() - self._launchTime) * 1000:.1f} ms ({phases})")
+        
+        return
+
+    def _defer(self, name, function, tab=None):
+        """
+        Run given function once the window is shown and the event loop is idle
+
+        Args:
+            name (str): phase name
+            function (function): called without arguments
+            tab (QWidget, optional): tab the function fills, it is dropped if the tab is removed first.
+                Defaults to None.
+        """
+        if not self._deferred:
+            QTimer.singleShot(0, self._runDeferred)
+        self._deferred.append((name, function, tab))
+        
+        return
+
+    def _runDeferred(self):
+        if not self._deferred:
+            return
+        
+        self._phaseStart = time.perf_counter()
+        deferred, self._deferred = self._deferred, []
+        for name, function, tab in deferred:
+            if tab is not None and not isValid(tab):
+                continue
+            function()
+            if self._starting:
+                self._phase(name)
+        if self._starting:
+            self._starting = False
+            self._logPhases("populated")
         
         return
     
@@ -115,6 +382,7 @@ class Workshop(MayaQWidgetDockableMixin, QMainWindow):
         self._mainWidget.setLayout(mainLayout)
         
         newBtn.clicked.connect(self.createNewSession)
+        openBtn.clicked.connect(self.openSession)
         
         return
 
@@ -135,12 +403,15 @@ class Workshop(MayaQWidgetDockableMixin, QMainWindow):
         
         # BOTTOM TAB LAYOUT
         tabWidget = QTabWidget()
-        tabWidget.setStyleSheet("QTabWidget#tabWidget{ border: 0px;}")
-        # build modules tab
-        self._buildModulesTab(tabWidget)
-        # build blueprints tabs
-        for bp in ["bp1", "bp2"]:
-            self._buildBlueprintTab(tabWidget, bp)
+        self._tabWidget = tabWidget
+        # modules tab
+        self._addTab(QWidget(), "Modules", self._buildModulesTab)
+        # blueprints tabs
+        for bp in tb.getBlueprints():
+            self._addBlueprintTab(bp)
+        # only the visible tab is built now, the others on first activation
+        self._buildTab(tabWidget.currentIndex())
+        tabWidget.currentChanged.connect(self._buildTab)
         
         # CREATE MAIN LAYOUT
         mainLayout = QGridLayout()
@@ -153,11 +424,46 @@ class Workshop(MayaQWidgetDockableMixin, QMainWindow):
         
         return
 
-    def _buildModulesTab(self, parent):
-        # WIDGET and MAIN LAYOUT
-        moduleTab = QWidget()
-        parent.addTab(moduleTab, "Modules")
+    def _addTab(self, tab, name, builder, index=-1):
+        """
+        Add an empty tab, filled by builder when first shown
+
+        Args:
+            tab (QWidget): tab widget
+            name (str): tab label
+            builder (function): called with the tab to build its content
+            index (int, optional): tab position. Defaults to -1, last.
+        """
+        self._tabBuilders[tab] = builder
+        self._tabWidget.insertTab(index, tab, name)
+        
+        return
+
+    def _addBlueprintTab(self, blueprint, index=-1):
+        self._addTab(QWidgetRelativeChildren(), blueprint, lambda tab: self._buildBlueprintTab(tab, blueprint), index)
+        
+        return
+
+    def _removeTab(self, index):
+        tab = self._tabWidget.widget(index)
+        self._tabBuilders.pop(tab, None)
+        # DEFERRED FILLS OF THE TAB WOULD REACH DELETED WIDGETS
+        self._deferred = [entry for entry in self._deferred if entry[2] is not tab]
+        self._tabWidget.removeTab(index)
+        tab.deleteLater()
         
+        return
+
+    def _buildTab(self, index):
+        builder = self._tabBuilders.pop(self._tabWidget.widget(index), None)
+        if builder:
+            builder(self._tabWidget.widget(index))
+            if self._starting:
+                self._phase(f"{self._tabWidget.tabText(index)} tab")
+        
+        return
+
+    def _buildModulesTab(self, moduleTab):
         # MAIN LAYOUT
         mainLayout = QHBoxLayout()
         moduleTab.setLayout(mainLayout)
@@ -179,65 +485,53 @@ class Workshop(MayaQWidgetDockableMixin, QMainWindow):
         
         # MODULES FRAME
         modulesFrame = QFrame()
-        modulesFrame.setStyleSheet('''
-                                   QFrame{ background-color: #373737;
-                                           border-radius: 5px;}
-                                   QPushButton{ border-radius: 5px; background-color: #EEF4F9; color: #373737; }
-                                   QPushButton:hover{ background-color: #BCC0C4; }
-                                   ''')
+        modulesFrame.setObjectName("modulesFrame")
         leftLayout.addWidget(modulesFrame)
         # modules layout
         modulesLayout = QVBoxLayout()
         modulesFrame.setLayout(modulesLayout)
+        # modules filter
+        modulesFilter = QLineEdit()
+        modulesFilter.setPlaceholderText("filter modules")
+        modulesFilter.setClearButtonEnabled(True)
+        modulesLayout.addWidget(modulesFilter)
         # modules list
         modulesList = QListView()
         self.model = ModulesListModel()
-        modulesList.setModel(self.model)
-        modulesList.setStyleSheet("QListView{ border: 0px;}")
+        self._modulesProxy = QSortFilterProxyModel(self)
+        self._modulesProxy.setSourceModel(self.model)
+        self._modulesProxy.setFilterCaseSensitivity(Qt.CaseInsensitive)
+        modulesFilter.textChanged.connect(self._modulesProxy.setFilterFixedString)
+        modulesList.setModel(self._modulesProxy)
+        modulesDelegate = ModuleDelegate(modulesList)
+        modulesDelegate.viewClicked.connect(self.viewModule)
+        modulesDelegate.selectClicked.connect(self.selectModule)
+        modulesList.setItemDelegate(modulesDelegate)
+        modulesList.setUniformItemSizes(True)
+        modulesList.setMouseTracking(True)
         modulesLayout.addWidget(modulesList)
         self._modulesList = modulesList
-        # for module in tb.getModules():
-        #     self._addModule(module)
+        self._defer("modules", self.refreshModules)
         # modules stretch
         modulesLayout.addStretch(1)
         
         # JOINT SIZE SLIDER
         jointSlider = QSlider(Qt.Horizontal)
-        jointSlider.setValue(50)
-        jointSlider.setStyleSheet('''
-                                  QSlider::groove:horizontal { 
-                                      background-color: #444444;
-                                      border: 0px solid #424242; 
-                                      height: '''+str(5*self.ratio)+'''px; 
-                                      border-radius: '''+str(4*self.ratio)+'''px;
-                                  }  
-                                  QSlider::handle:horizontal { 
-                                      background-color: white; 
-                                      border: 0px solid white; 
-                                      width: '''+str(15*self.ratio)+'''px; 
-                                      height: '''+str(15*self.ratio)+'''px; 
-                                      line-height: '''+str(16*self.ratio)+'''px; 
-                                      margin-top: '''+str(-5*self.ratio)+'''px; 
-                                      margin-bottom: '''+str(-5*self.ratio)+'''px; 
-                                      border-radius: '''+str(7*self.ratio)+'''px; 
-                                  }
-                                  ''')
+        jointSlider.setValue(round(tb.getJointDisplayScale() * self.JOINT_SCALE_STEPS))
+        jointSlider.setObjectName("jointSlider")
         modulesLayout.addWidget(jointSlider)
+        # preview at most once per frame, commit once on release
+        self._jointScaleTimer = QTimer(self)
+        self._jointScaleTimer.setSingleShot(True)
+        self._jointScaleTimer.setInterval(16)
+        self._jointScaleTimer.timeout.connect(self._previewJointScale)
+        jointSlider.sliderPressed.connect(self._startJointScale)
+        jointSlider.valueChanged.connect(lambda value: self.setJointScale(value, jointSlider.isSliderDown()))
+        jointSlider.sliderReleased.connect(lambda: self.setJointScale(jointSlider.value()))
         
         # ADD MODULES BUTTON
         addModuleBtn = QPushButton("+")
-        addModuleBtn.setStyleSheet('''
-                                   QPushButton{
-                                       background-color: #51C080;
-                                       border-radius: 5px;
-                                       font-weight: bold;
-                                       font-size: 24px;
-                                       color: white;
-                                       }
-                                   QPushButton:hover{
-                                       background-color: #6FCF97;
-                                       }
-                                   ''')
+        addModuleBtn.setObjectName("addButton")
         addModuleBtn.setMinimumHeight(35*self.ratio)
         modulesLayout.addWidget(addModuleBtn)
         
@@ -250,10 +544,12 @@ class Workshop(MayaQWidgetDockableMixin, QMainWindow):
         mirrorModulesBtn.setMinimumHeight(58*self.ratio)
         mirrorModulesBtn.setMinimumWidth(58*self.ratio)
         bottomLeftLayout.addWidget(mirrorModulesBtn, 0, 0)
+        mirrorModulesBtn.clicked.connect(self.mirrorModules)
         # build rig guides button
         buildGuidesBtn = QPushButton("build guides")
         buildGuidesBtn.setMinimumHeight(58*self.ratio)
         bottomLeftLayout.addWidget(buildGuidesBtn, 0, 1)
+        buildGuidesBtn.clicked.connect(self.buildGuides)
         # show rig guides button
         showGuidesBtn = QPushButton("show")
         showGuidesBtn.setMinimumHeight(58*self.ratio)
@@ -281,8 +577,10 @@ class Workshop(MayaQWidgetDockableMixin, QMainWindow):
         # module side
         moduleSide = SideButton("-")
         moduleNameLayout.addWidget(moduleSide)
+        self._moduleSide = moduleSide
         # module name
         moduleName = QLineEdit("leg")
+        self._moduleName = moduleName
         moduleName.setMinimumWidth(250*self.ratio)
         moduleName.setMinimumHeight(20*self.ratio)
         moduleName.setTextMargins(5, 0, 0, 2)
@@ -304,19 +602,13 @@ class Workshop(MayaQWidgetDockableMixin, QMainWindow):
         # label
         connectLabel = QLabel("Connect to")
         connectLabel.setAlignment(Qt.AlignVCenter)
-        connectLabel.setStyleSheet('''
-                                   QLabel{
-                                       color: white;
-                                       font-weight: bold;
-                                       border-bottom: 1px solid white;
-                                   }
-                                   ''')
+        connectLabel.setObjectName("sectionLabel")
         connectLabel.setContentsMargins(0, 30, 0, 0)
         settingsLayout.addWidget(connectLabel)
         # line
         line = QFrame()
         line.setFixedSize(150*self.ratio, 2)
-        line.setStyleSheet("background-color: white;")
+        line.setObjectName("whiteLine")
         settingsLayout.addWidget(line)
         horizontalLayout = QHBoxLayout()
         settingsLayout.addLayout(horizontalLayout)
@@ -335,25 +627,16 @@ class Workshop(MayaQWidgetDockableMixin, QMainWindow):
         # label
         settingsLabel = QLabel("Settings")
         settingsLabel.setAlignment(Qt.AlignVCenter)
-        settingsLabel.setStyleSheet('''
-                                   QLabel{
-                                       color: white;
-                                       font-weight: bold;
-                                       border-bottom: 1px solid white;
-                                   }
-                                   ''')
+        settingsLabel.setObjectName("sectionLabel")
         settingsLabel.setContentsMargins(0, 30, 0, 0)
         settingsLayout.addWidget(settingsLabel)
         # line
         line = QFrame()
         line.setFixedSize(150*self.ratio, 2)
-        line.setStyleSheet("background-color: white;")
+        line.setObjectName("whiteLine")
         settingsLayout.addWidget(line)
         # scroll layout
         scrollArea = QScrollArea()
-        scrollArea.setStyleSheet('''QScrollArea{
-                                        border: 0;
-                                    }''')
         scrollArea.setWidgetResizable(True)
         scrollArea.setSizeAdjustPolicy(QAbstractScrollArea.AdjustToContents)
         scrollWidget = QWidget()
@@ -375,11 +658,7 @@ class Workshop(MayaQWidgetDockableMixin, QMainWindow):
         
         return
 
-    def _buildBlueprintTab(self, parent, bpName):
-        # WIDGET
-        blueprintTab = QWidgetRelativeChildren()
-        parent.addTab(blueprintTab, bpName)
-        
+    def _buildBlueprintTab(self, blueprintTab, bpName):
         # MAIN LAYOUT
         mainLayout = QVBoxLayout()
         blueprintTab.setLayout(mainLayout)
@@ -404,31 +683,31 @@ class Workshop(MayaQWidgetDockableMixin, QMainWindow):
         
         # scroll layout
         scrollArea = QScrollArea()
-        scrollArea.setStyleSheet('''QScrollArea{
-                                        border: 0;
-                                    }''')
         scrollArea.setWidgetResizable(True)
         scrollArea.setSizeAdjustPolicy(QAbstractScrollArea.AdjustToContents)
         scrollWidget = DragWidget(orientation=Qt.Orientation.Vertical)
-        # scrollWidget.setStyleSheet('''
-        #                            DragWidget {
-        #                                background-color: rgb(255, 0, 0);
-        #                                }''')
         scrollArea.setWidget(scrollWidget)
         mainLayout.addWidget(scrollArea)
         
-        for i in range(5):
-            sublod = Instruction(title=f"Action {i}", hue=(i*130)%360)
-            scrollWidget.add_item(sublod)
+        def taskLayout():
             lyt = QVBoxLayout()
             for i in range(3):
                 lyt.addWidget(QPushButton(f"Task {i}"))
-            sublod.setContentLayout(lyt)
+            return lyt
+        
+        def fillInstructions():
+            instructions = tb.getInstructions(bpName)
+            blueprintTab.blueprintHash = mc.getAttr(f"{bpName}.blueprint_hash")
+            for i, instruction in enumerate(instructions):
+                sublod = Instruction(title=instruction["name"], hue=(i*130)%360, content=taskLayout)
+                scrollWidget.add_item(sublod)
+            
+            spacer = DragItem()
+            spacer.setFixedHeight(60*self.ratio)
+            spacer.setDragEnabled(False)
+            scrollWidget.add_item(spacer)
         
-        spacer = DragItem()
-        spacer.setFixedHeight(60*self.ratio)
-        spacer.setDragEnabled(False)
-        scrollWidget.add_item(spacer)
+        self._defer(f"{bpName} instructions", fillInstructions, blueprintTab)
             
         
         # ADD ACTION BUTTON
@@ -440,11 +719,101 @@ class Workshop(MayaQWidgetDockableMixin, QMainWindow):
         buildModuleBtn = QPushButton("Build Puppet")
         buildModuleBtn.setMinimumHeight(58*self.ratio)
         mainLayout.addWidget(buildModuleBtn)
+        buildModuleBtn.clicked.connect(lambda: self.buildPuppet(bpName))
         
         return
 
     def _addModule(self, module):
-        self.model.appendRow(ModuleWidget(module))
+        self.model.appendRow(module, tb.moduleSide(module), mc.getAttr(f"{module}.module_type"))
+        return
+
+    def refreshModules(self):
+        if self.model is None:
+            return
+        if not tb.geppettoExists():
+            self.model.setModules([])
+            return
+        
+        index = tb.getModuleIndex()
+        self.model.setModules([(entry["name"], entry["side"], entry["type"]) for entry in map(index.get, index.names())])
+        
+        return
+
+    def _onSceneChanged(self, changes):
+        # SESSION CREATED OR REMOVED, SWITCH BETWEEN START AND STANDARD UI
+        if changes["reset"] and tb.geppettoExists() != self._hasSession:
+            self.start()
+            return
+        
+        if changes["modules"] and self.model is not None:
+            self._updateModules(changes["modules"])
+        if changes["blueprints"] and self._hasSession:
+            self._updateBlueprintTabs(changes["blueprints"])
+        
+        return
+
+    def _updateModules(self, changes):
+        index = tb.getModuleIndex()
+        modules = []
+        for name in changes["names"]:
+            entry = index.get(name)
+            if entry is None:
+                continue
+            moduleType = entry["type"]
+            if name in changes["changed"] and mc.objExists(f"{name}.module_type"):
+                moduleType = mc.getAttr(f"{name}.module_type")
+            modules.append((name, entry["side"], moduleType))
+        self.model.updateModules(modules, changes["renamed"])
+        
+        return
+
+    def _updateBlueprintTabs(self, changes):
+        tabs = self._tabWidget
+        names = changes["names"]
+        
+        # DROP REMOVED BLUEPRINTS, REBUILD RENAMED AND EDITED ONES IN PLACE
+        current = []
+        for i in reversed(range(1, tabs.count())):
+            name = tabs.tabText(i)
+            newName = changes["renamed"].get(name, name)
+            if newName not in names:
+                self._removeTab(i)
+                continue
+            # BUILT TABS SHOWING OTHER INSTRUCTIONS THAN THE BLUEPRINT HOLDS
+            edited = newName in changes["changed"] and getattr(tabs.widget(i), "blueprintHash", None) not in (
+                None, mc.getAttr(f"{newName}.blueprint_hash"))
+            if newName != name or edited:
+                active = tabs.currentIndex() == i
+                self._removeTab(i)
+                self._addBlueprintTab(newName, i)
+                if active:
+                    tabs.setCurrentIndex(i)
+            current.insert(0, newName)
+        
+        # REORDERED, REBUILD EVERY BLUEPRINT TAB
+        kept = set(current)
+        if [name for name in names if name in kept] != current:
+            for i in reversed(range(1, tabs.count())):
+                self._removeTab(i)
+            kept = set()
+        
+        # ADD NEW BLUEPRINTS
+        for i, name in enumerate(names):
+            if name not in kept:
+                self._addBlueprintTab(name, i + 1)
+        
+        return
+
+    def viewModule(self, module):
+        side = tb.moduleSide(module)
+        self._moduleSide.set(side)
+        self._moduleName.setText(module if side == "-" else module[2:])
+        
+        return
+
+    def selectModule(self, module):
+        mc.select(f"{tb.getGeppetto()}|modules|{module}")
+        
         return
 
     def _createMenuBar(self):
@@ -467,6 +836,13 @@ class Workshop(MayaQWidgetDockableMixin, QMainWindow):
         fileMenu.addSeparator()
         replacePathAction = fileMenu.addAction("Replace &Path")
         resetAction = fileMenu.addAction("&Reset")
+        fileMenu.addSeparator()
+        fastBuildAction = fileMenu.addAction("&Fast Build")
+        fastBuildAction.setCheckable(True)
+        fastBuildAction.setChecked(self.fastBuild)
+        optimizeBuildAction = fileMenu.addAction("&Optimize Build")
+        optimizeBuildAction.setCheckable(True)
+        optimizeBuildAction.setChecked(self.optimizeBuild)
         
         # Module
         addModuleAction = moduleMenu.addAction("&Add")
@@ -476,6 +852,14 @@ class Workshop(MayaQWidgetDockableMixin, QMainWindow):
         moduleMenu.addSeparator()
         renameModuleAction = moduleMenu.addAction("Re&name")
         reinitializeModuleAction = moduleMenu.addAction("&Reinitialize")
+        moduleMenu.addSeparator()
+        mirrorPlaneMenu = moduleMenu.addMenu("&Mirror Plane")
+        mirrorPlaneGroup = QActionGroup(mirrorPlaneMenu)
+        for plane in mirror.PLANES:
+            planeAction = mirrorPlaneMenu.addAction(plane)
+            planeAction.setCheckable(True)
+            planeAction.setChecked(plane == self.mirrorPlane)
+            mirrorPlaneGroup.addAction(planeAction)
         
         # Blueprint
         addBpAction = blueprintMenu.addAction("&Add")
@@ -486,20 +870,26 @@ class Workshop(MayaQWidgetDockableMixin, QMainWindow):
         blueprintMenu.addSeparator()
         importBpAction = blueprintMenu.addAction("&Import")
         exportBpAction = blueprintMenu.addAction("&Export")
+        syncBpAction = blueprintMenu.addAction("S&ync Library")
         blueprintMenu.addSeparator()
         renameBpAction = blueprintMenu.addAction("Re&name")
         
         # Help
         docsAction = helpMenu.addAction("&Documentation")
         aboutAction = helpMenu.addAction("&About")
+        helpMenu.addSeparator()
+        profilerAction = helpMenu.addAction("&Profiler")
         
         # # CONNECT FUNCTIONS
-        # newAction.triggered.connect(tb.newSession)
-        # openAction.triggered.connect(tb.openSession)
-        # saveAction.triggered.connect(tb.saveSession)
-        # saveAsAction.triggered.connect(tb.saveSessionAs)
+        newAction.triggered.connect(self.createNewSession)
+        openAction.triggered.connect(self.openSession)
+        saveAction.triggered.connect(self.saveSession)
+        saveAsAction.triggered.connect(self.saveSessionAs)
         # replacePathAction.triggered.connect(tb.replaceSessionPaths)
-        resetAction.triggered.connect(self.start)
+        resetAction.triggered.connect(self.reset)
+        fastBuildAction.toggled.connect(self.setFastBuild)
+        optimizeBuildAction.toggled.connect(self.setOptimizeBuild)
+        mirrorPlaneGroup.triggered.connect(lambda action: self.setMirrorPlane(action.text()))
         
         # addModuleAction.triggered.connect(tb.addModule)
         # deleteModuleAction.triggered.connect(tb.deleteModule)
@@ -511,53 +901,359 @@ class Workshop(MayaQWidgetDockableMixin, QMainWindow):
         # deleteBpAction.triggered.connect(tb.deleteBlueprint)
         # duplicateBpAction.triggered.connect(tb.duplicateBlueprint)
         # instanciateBpAction.triggered.connect(tb.instanceBlueprint)
-        # importBpAction.triggered.connect(tb.importBlueprint)
-        # exportBpAction.triggered.connect(tb.exportBlueprint)
+        importBpAction.triggered.connect(self.importBlueprint)
+        exportBpAction.triggered.connect(self.exportBlueprint)
+        syncBpAction.triggered.connect(self.syncBlueprints)
         # renameBpAction.triggered.connect(tb.renameBlueprint)
         
         # docsAction.triggered.connect(tb.openDocumentation)
         # aboutAction.triggered.connect(tb.aboutWindow)
+        profilerAction.triggered.connect(self.showProfiler)
         
         self._menuBar = menuBar
         
         return
 
     def createNewSession(self):
-        tb.createBaseStructure()
-        self.start()
+        with profiler.operation("New session"):
+            tb.createBaseStructure()
+            self.start()
+        
+        return
+
+    def openSession(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Open Session", "", self.SESSION_FILTER)
+        if not path:
+            return
+        
+        with profiler.operation("Open session"):
+            tb.openSession(path)
+            self.start()
+        
+        return
+
+    def saveSession(self):
+        if not mc.getAttr(f"{tb.getGeppetto()}.session_path"):
+            self.saveSessionAs()
+            return
+        
+        with profiler.operation("Save session"):
+            tb.saveSession()
+        
+        return
+
+    def saveSessionAs(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Save Session As", "", self.SESSION_FILTER)
+        if not path:
+            return
+        
+        # ANOTHER KIND OF FILE IS REPLACED AS A WHOLE, NEVER APPENDED TO
+        overwrite = os.path.exists(path) and not isSessionFile(path)
+        if overwrite:
+            answer = QMessageBox.question(self, "Save Session As", f"{path} is not a Geppetto session. Replace it?")
+            if answer != QMessageBox.Yes:
+                return
+        
+        with profiler.operation("Save session"):
+            tb.saveSession(path, overwrite=overwrite)
         
         return
 
+    def importBlueprint(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Import Blueprint", "", self.BLUEPRINT_FILTER)
+        if not path:
+            return
+        
+        with profiler.operation("Import blueprint"):
+            tb.importBlueprint(path)
+        
+        return
+
+    def exportBlueprint(self):
+        blueprint = self._tabWidget.tabText(self._tabWidget.currentIndex())
+        if blueprint not in tb.getBlueprints():
+            mc.warning("Select a blueprint tab to export.")
+            return
+        
+        directory = QFileDialog.getExistingDirectory(self, "Export Blueprint To Library")
+        if not directory:
+            return
+        
+        with profiler.operation("Export blueprint"):
+            tb.exportBlueprint(blueprint, directory)
+        
+        return
+
+    def syncBlueprints(self):
+        directory = QFileDialog.getExistingDirectory(self, "Blueprint Library")
+        if not directory:
+            return
+        
+        with profiler.operation("Sync blueprints"):
+            updated = tb.syncBlueprints(directory)
+        tb.print(f"{len(updated)} blueprints updated")
+        
+        return
+
+    def reset(self):
+        with profiler.operation("Reset"):
+            # THE SESSION IS GONE, SO IS ITS FILE
+            if not tb.geppettoExists():
+                tb.resetSession()
+            self.start()
+        
+        return
+
+    def setFastBuild(self, value):
+        self.fastBuild = value
+        
+        return
+
+    def setOptimizeBuild(self, value):
+        self.optimizeBuild = value
+        
+        return
+
+    def _startJointScale(self):
+        self._jointScaleStart = tb.getJointDisplayScale() if tb.geppettoExists() else None
+        
+        return
+
+    def _previewJointScale(self):
+        if tb.geppettoExists():
+            tb.setJointDisplayScale(self._jointScale, preview=True)
+        
+        return
+
+    def setJointScale(self, value, dragging=False):
+        """
+        Scale guide joints from the slider value, JOINT_SCALE_STEPS being a 1.0 scale.
+        While dragging, changes are coalesced into one preview per frame that isn't recorded in the undo queue.
+        """
+        self._jointScale = max(value, 1) / self.JOINT_SCALE_STEPS
+        if dragging:
+            if not self._jointScaleTimer.isActive():
+                self._jointScaleTimer.start()
+            return
+        
+        self._jointScaleTimer.stop()
+        if not tb.geppettoExists():
+            return
+        # SINGLE UNDO STEP FROM THE VALUE BEFORE THE DRAG
+        start = getattr(self, "_jointScaleStart", None)
+        if start is not None:
+            tb.setJointDisplayScale(start, preview=True)
+            self._jointScaleStart = None
+        tb.setJointDisplayScale(self._jointScale)
+        
+        return
+
+    def setMirrorPlane(self, plane):
+        self.mirrorPlane = plane
+        
+        return
+
+    def mirrorModules(self):
+        with tb.buildContext("Mirror modules", fast=self.fastBuild):
+            count = mirror.mirrorModules(plane=self.mirrorPlane)
+        tb.print(f"{count} guides mirrored across {self.mirrorPlane}")
+        
+        return
+
+    def buildGuides(self):
+        with tb.buildContext("Build guides", fast=self.fastBuild):
+            report = guides.buildGuides(mirror.selectedModules() or None)
+        for module, stats in report["modules"].items():
+            tb.print(f"{module}: {stats['guides']} guides in {stats['time']*1000:.1f} ms")
+        tb.print(f"Guides created in {report['create']*1000:.1f} ms")
+        
+        return
+
+    def buildPuppet(self, blueprint):
+        if blueprint not in tb.getBlueprints():
+            mc.warning(f"Blueprint {blueprint} doesn't exist")
+            return
+
+        with tb.buildContext("Build puppet", fast=self.fastBuild):
+            report = puppet.buildPuppet(blueprint, optimize=self.optimizeBuild)
+        tb.print(f"{blueprint}: {len(report['built'])} instructions built, {len(report['skipped'])} up to date")
+        if report["optimize"]:
+            stats = report["optimize"]
+            tb.print(f"{blueprint}: optimized from {stats['before']} to {stats['after']} nodes "
+                     f"in {stats['time']*1000:.1f} ms")
+        
+        return
+
+    def showProfiler(self):
+        # ONE PANEL PER WORKSHOP
+        if not getattr(self, "_profilerPanel", None):
+            self._profilerPanel = ProfilerPanel(self)
+        self._profilerPanel.show()
+        self._profilerPanel.raise_()
+        
+        return
+
+class ProfilerPanel(QWidget):
+    """
+    Show the scene commands that cost the most during the last operation.
+    Profiling is enabled while the panel is open.
+    """
+    COLUMNS = ["Command", "Caller", "Calls", "Time (ms)"]
+
+    def __init__(self, parent=None, count=15):
+        super().__init__(parent)
+        self.setWindowFlags(Qt.Window)
+        self.setWindowTitle("Geppetto Profiler")
+        self.count = count
+
+        layout = QVBoxLayout(self)
+        self.title = QLabel("Waiting for an operation...")
+        layout.addWidget(self.title)
+
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        layout.addWidget(self.table)
+
+        buttonsLayout = QHBoxLayout()
+        layout.addLayout(buttonsLayout)
+        totalBtn = QPushButton("Session total")
+        totalBtn.clicked.connect(self.showTotal)
+        buttonsLayout.addWidget(totalBtn)
+        resetBtn = QPushButton("Reset")
+        resetBtn.clicked.connect(self.reset)
+        buttonsLayout.addWidget(resetBtn)
+
+    def showEvent(self, e):
+        profiler.enable()
+        profiler.addListener(self.showOperation)
+        return super().showEvent(e)
+
+    def closeEvent(self, e):
+        profiler.removeListener(self.showOperation)
+        profiler.disable()
+        return super().closeEvent(e)
+
+    def showOperation(self, name, stats):
+        calls = sum(count for count, elapsed in stats.values())
+        self.title.setText(f"{name}: {calls} commands")
+        self._fill(profiler.top(stats, self.count))
+        return
+
+    def showTotal(self):
+        icons = iconCache.stats()
+        self.title.setText(f"Session total, icon cache: {icons['hits']} hits, {icons['misses']} misses")
+        self._fill(profiler.top(count=self.count))
+        return
+
+    def reset(self):
+        profiler.reset()
+        self.title.setText("Waiting for an operation...")
+        self._fill([])
+        return
+
+    def _fill(self, rows):
+        self.table.setRowCount(len(rows))
+        for row, (command, caller, count, elapsed) in enumerate(rows):
+            for column, value in enumerate([command, caller, str(count), f"{elapsed*1000:.2f}"]):
+                self.table.setItem(row, column, QTableWidgetItem(value))
+        return
+
+
 class ModulesListModel(QAbstractListModel):
-    def __init__(self, data=[], parent=None):
+    SideRole = Qt.UserRole + 1
+    TypeRole = Qt.UserRole + 2
+
+    def __init__(self, modules=None, parent=None):
         super().__init__(parent)
-        self._data = data
+        # ONE (NAME, SIDE, TYPE) TUPLE PER ROW
+        self._data = list(modules or [])
 
     def rowCount(self, parent=QModelIndex()):
-        return len(self._data)
+        return 0 if parent.isValid() else len(self._data)
 
     def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        name, side, moduleType = self._data[index.row()]
         if role == Qt.DisplayRole:
-            return self._data[index.row()]
-
-        if role == Qt.UserRole:
-            # Return a custom widget instance for the item
-            widget = ModuleWidget(self._data[index.row()])
-            return widget
+            return name
+        if role == self.SideRole:
+            return side
+        if role == self.TypeRole:
+            return moduleType
 
         return None
 
-    def appendRow(self, data, parent=QModelIndex()):
-        row = len(self._data)-1
+    def setModules(self, modules):
+        self.beginResetModel()
+        self._data = list(modules)
+        self.endResetModel()
+        return
+
+    def updateModules(self, modules, renamed=None):
+        """
+        Bring the rows to given modules with as few row changes as possible: renamed and edited rows are
+        updated in place, runs of missing rows removed and runs of new rows inserted.
+        Resets the model if the kept rows were reordered.
+
+        Args:
+            modules (list): (name, side, type) tuples, in order
+            renamed (dict, optional): {old name: new name}. Defaults to None.
+        """
+        renamed = renamed or {}
+        modules = list(modules)
+        names = {module[0] for module in modules}
+        current = [renamed.get(name, name) for name, side, moduleType in self._data]
+        
+        # REMOVE MISSING ROWS, BOTTOM UP
+        row = len(current)
+        while row:
+            row -= 1
+            if current[row] in names:
+                continue
+            end = row
+            while row and current[row - 1] not in names:
+                row -= 1
+            self.removeRows(row, end - row + 1)
+            del current[row:end + 1]
+        
+        kept = set(current)
+        if [module[0] for module in modules if module[0] in kept] != current:
+            self.setModules(modules)
+            return
+        
+        # INSERT NEW ROWS, UPDATE KEPT ONES
+        row = 0
+        while row < len(modules):
+            if modules[row][0] in kept:
+                if self._data[row] != modules[row]:
+                    self._data[row] = modules[row]
+                    self.dataChanged.emit(self.index(row), self.index(row))
+                row += 1
+                continue
+            end = row
+            while end < len(modules) and modules[end][0] not in kept:
+                end += 1
+            self.beginInsertRows(QModelIndex(), row, end - 1)
+            self._data[row:row] = modules[row:end]
+            self.endInsertRows()
+            row = end
+        
+        return
+
+    def appendRow(self, name, side="-", moduleType="", parent=QModelIndex()):
+        row = len(self._data)
         self.beginInsertRows(parent, row, row)
-        self._data.insert(row, data)
+        self._data.append((name, side, moduleType))
         self.endInsertRows()
         return True
 
     def removeRows(self, row, count, parent=QModelIndex()):
         self.beginRemoveRows(parent, row, row + count - 1)
-        for i in range(count):
-            self._data.pop(row)
+        del self._data[row:row + count]
         self.endRemoveRows()
         return True
 
@@ -565,22 +1261,89 @@ class ModulesListModel(QAbstractListModel):
         self.beginMoveRows(sourceParent, sourceRow, sourceRow + count - 1, destinationParent, destinationChild)
         items = self._data[sourceRow:sourceRow + count]
         del self._data[sourceRow:sourceRow + count]
+        if destinationChild > sourceRow:
+            destinationChild -= count
         self._data[destinationChild:destinationChild] = items
         self.endMoveRows()
         return True
 
 
-class ModuleWidget(QWidget):
-    def __init__(self, name, parent=None):
-        super(self.__class__, self).__init__(parent)
+class ModuleDelegate(QStyledItemDelegate):
+    """
+    Paints module rows, side chip, name and "view"/"select" buttons, without any widget per row.
+    Buttons are hit-tested on mouse release.
+    """
+    viewClicked = Signal(str)
+    selectClicked = Signal(str)
+
+    BUTTONS = ["view", "select"]
+    SIDE_COLORS = {"-": QColor(255, 255, 255, 50), "L": QColor(108, 200, 255, 50), "R": QColor(255, 108, 108, 50)}
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.ratio = getScreenRatio()
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), int(30*self.ratio))
+
+    def _buttonRects(self, rect):
+        width = 50*self.ratio
+        height = rect.height() - 8*self.ratio
+        top = rect.top() + 4*self.ratio
+        right = rect.right() - 4*self.ratio
+        ret = []
+        for i in range(len(self.BUTTONS)):
+            left = right - (len(self.BUTTONS)-i)*(width + 4*self.ratio) + 4*self.ratio
+            ret.append(QRectF(left, top, width, height))
 
-        self.row = QHBoxLayout()
+        return ret
 
-        self.row.addWidget(QLabel(name))
-        self.row.addWidget(QPushButton("view"))
-        self.row.addWidget(QPushButton("select"))
+    def paint(self, painter, option, index):
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        rect = QRectF(option.rect)
+        if option.state & QStyle.State_Selected:
+            painter.fillRect(rect, option.palette.highlight())
 
-        self.setLayout(self.row)
+        # SIDE CHIP
+        side = index.data(ModulesListModel.SideRole)
+        chip = QRectF(rect.left() + 4*self.ratio, rect.top() + 5*self.ratio, 20*self.ratio, rect.height() - 10*self.ratio)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(self.SIDE_COLORS.get(side, self.SIDE_COLORS["-"]))
+        painter.drawRoundedRect(chip, 5, 5)
+        painter.setPen(Qt.white)
+        painter.drawText(chip, Qt.AlignCenter, side)
+
+        # NAME
+        buttons = self._buttonRects(rect)
+        textRect = QRectF(chip.right() + 8*self.ratio, rect.top(), buttons[0].left() - chip.right() - 12*self.ratio, rect.height())
+        name = option.fontMetrics.elidedText(index.data(), Qt.ElideRight, int(textRect.width()))
+        painter.drawText(textRect, Qt.AlignVCenter | Qt.AlignLeft, name)
+
+        # BUTTONS
+        hover = option.state & QStyle.State_MouseOver
+        cursor = option.widget.viewport().mapFromGlobal(QCursor.pos()) if hover and option.widget else None
+        for label, button in zip(self.BUTTONS, buttons):
+            hovered = cursor is not None and button.contains(QPointF(cursor))
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(QColor("#BCC0C4") if hovered else QColor("#EEF4F9"))
+            painter.drawRoundedRect(button, 5, 5)
+            painter.setPen(QColor("#373737"))
+            painter.drawText(button, Qt.AlignCenter, label)
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QEvent.MouseMove and option.widget:
+            option.widget.viewport().update(option.rect)
+        if event.type() != QEvent.MouseButtonRelease or event.button() != Qt.LeftButton:
+            return super().editorEvent(event, model, option, index)
+
+        for label, button in zip(self.BUTTONS, self._buttonRects(QRectF(option.rect))):
+            if button.contains(QPointF(event.pos())):
+                getattr(self, f"{label}Clicked").emit(index.data())
+                return True
+
+        return super().editorEvent(event, model, option, index)
 
 
 class SideButton(QPushButton):
@@ -588,14 +1351,6 @@ class SideButton(QPushButton):
         super().__init__(parent)
         self.ratio = getScreenRatio()
         self.setFixedSize(25*self.ratio, 25*self.ratio)
-        self.setStyleSheet('''
-                           SideButton{
-                               color: white;
-                               border: none;
-                               border-radius: 6px;
-                               font-weight: bold;
-                               }
-                           ''')
         
         self.set(side)
         
@@ -613,14 +1368,7 @@ class SideButton(QPushButton):
         
         self.state = side
         self.setText(side)
-        
-        if side == "-":
-            r, g, b = [255, 255, 255]
-        elif side == "L":
-            r, g, b = [108, 200, 255]
-        else:
-            r, g, b = [255, 108, 108]
-        self.setStyleSheet(f"background-color: rgba({r}, {g}, {b}, 50)")
+        theme.setState(self, "side", side)
         
         return
 
@@ -647,64 +1395,69 @@ class EditableLabel(QLineEdit):
         self.textChanged.connect(self.resizeToContent)
         
         self.setTextMargins(5, 0, 0, 2)
-        self.setStyleSheet('''background-color: rgba(0, 0, 0, 0); border: none;''')
         
     def mouseDoubleClickEvent(self, e):
         self.setReadOnly(False)
         mc.select(cl=True)
-        self.setStyleSheet('''background-color: rgba(0, 0, 0, 70); border: none;''')
+        theme.setState(self, "editing", "true")
     
     def focusOutEvent(self, e):
         self.setReadOnly(True)
-        self.setStyleSheet('''background-color: rgba(0, 0, 0, 0); border: none;''')
+        theme.setState(self, "editing", "false")
         return super().focusOutEvent(e)
     
     def toggleReadOnly(self):
         self.setReadOnly(not self.isReadOnly())
-        self.setStyleSheet('''background-color: rgba(0, 0, 0, 0); border: none;''')
+        theme.setState(self, "editing", "false" if self.isReadOnly() else "true")
     
     def resizeToContent(self):
-        ratio = getScreenRatio()
+        ratio = screenRatio.ratio()
         text = self.text()
-        fm = QFontMetrics(self.font())
+        fm = screenRatio.fontMetrics(self.font())
         pixelsWide = fm.width(text)+(15*ratio)
         if pixelsWide < 350*ratio:
             self.setFixedWidth(pixelsWide)
             self.adjustSize()
 
 class ImageWidget(QWidget):
-    def __init__(self, filename, parent=None):
+    def __init__(self, filename, width=None, height=None, parent=None):
         super().__init__(parent)
-        self.path = self._absolutePath(filename)
-        self._initUI()
-        
-    def __init__(self, filename, width, height, parent=None):
-        super().__init__(parent)
-        self.path = self._absolutePath(filename)
+        self.filename = filename
         self.size = [width, height]
         self._initUI()
-        
-    def _absolutePath(self, filename):
-        dirname = os.path.dirname(__file__)
-        path = os.path.join(dirname, 'icons', filename)
-        
-        return path
     
     def _initUI(self):
         layout = QVBoxLayout(self)
         layout.setMargin(0)
         layout.setAlignment(Qt.AlignCenter)
 
-        pixmap = QPixmap(self.path)
-        if self.size:
-            w, h = self.size
-            pixmap = pixmap.scaled(w, h, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        w, h = self.size
+        pixmap = iconCache.pixmap(self.filename, w, h, self.devicePixelRatioF())
         label = QLabel(self)
         label.setPixmap(pixmap)
         label.setAlignment(Qt.AlignCenter)
 
         layout.addWidget(label)
 
+def iconLabel(filename, width=None, height=None, parent=None):
+    """
+    Lightweight ImageWidget for widgets built by the hundred: one label showing a shared IconCache pixmap
+
+    Returns:
+        QLabel: the label
+    """
+    label = QLabel(parent)
+    label.setPixmap(iconCache.pixmap(filename, width, height, label.devicePixelRatioF()))
+    label.setAlignment(Qt.AlignCenter)
+    
+    return label
+
+class TitleLabel(QLabel):
+    doubleClicked = Signal()
+
+    def mouseDoubleClickEvent(self, e):
+        self.doubleClicked.emit()
+
 class SwitchButton(QPushButton):
     def __init__(self, onText, offText, parent = None):
         super().__init__(parent)
@@ -720,6 +1473,7 @@ class SwitchButton(QPushButton):
         self._offText = offText
         self._width = width*ratio
         self._height = height*ratio
+        self._font = screenRatio.font(16, bold=True)
         
         self.setFixedWidth(self._width*2.1)
         self.setFixedHeight(self._height*3)
@@ -742,10 +1496,7 @@ class SwitchButton(QPushButton):
         pen = QPen(palette.light().color())
         pen.setWidth(2)
         
-        font = QFont()
-        font.setPixelSize(16*getScreenRatio())
-        font.setBold(True)
-        painter.setFont(font)
+        painter.setFont(self._font)
 
         painter.setPen(Qt.NoPen)
         painter.drawRoundedRect(QRect(-width, -radius, 2*width, 2.5*radius), radius, radius)
@@ -771,9 +1522,12 @@ class SwitchButton(QPushButton):
 class DragWidget(QWidget):
     """
     Generic list sorting handler.
+    Item geometry is cached when a drag enters and whenever the drop indicator moves,
+    and hit-tested with a binary search.
+    orderChanged is emitted once per drop with the old and new index of the moved item.
     """
 
-    orderChanged = Signal(list)
+    orderChanged = Signal(int, int)
 
     def __init__(self, *args, orientation=Qt.Orientation.Vertical, **kwargs):
         super().__init__()
@@ -790,85 +1544,92 @@ class DragWidget(QWidget):
         self.setLayout(self.dragLayout)
         self.dragLayout.setSizeConstraint(QLayout.SetMinAndMaxSize)
         
+        # Sorted items, the drop indicator isn't one of them.
+        self.items = []
+        self._centers = []
+        self._slot = None
+        
         dropIndicator = DragItem()
-        dropIndicator.setStyleSheet("background-color: white; border: 1px solid white;")
+        dropIndicator.setObjectName("dropIndicator")
         if self.orientation == Qt.Orientation.Vertical:
             dropIndicator.setFixedHeight(2)
         else:
             dropIndicator.setFixedWidth(2)
         dropIndicator.setVisible(False)
-        self.add_item(dropIndicator)
+        self.dragLayout.addWidget(dropIndicator)
         self.dropIndicator = dropIndicator
 
+    def _center(self, widget):
+        geometry = widget.geometry()
+        if self.orientation == Qt.Orientation.Vertical:
+            return geometry.center().y()
+        return geometry.center().x()
+
+    def _measure(self):
+        # THE INDICATOR TAKES SPACE, ITEMS AFTER IT MOVE WHEN IT IS SHOWN OR MOVED
+        self.dragLayout.activate()
+        self._centers = [self._center(item) for item in self.items]
+
+    def _slotAt(self, pos):
+        """
+        Get the index of the item a drop at given position goes before, len(items) for the end
+        """
+        value = pos.y() if self.orientation == Qt.Orientation.Vertical else pos.x()
+
+        return bisect.bisect_left(self._centers, value)
+
+    def _insertBefore(self, slot, widget):
+        # LAYOUT POSITION OF THE ITEM AT GIVEN SLOT, THE INDICATOR MAY BE ANYWHERE
+        self.dragLayout.removeWidget(widget)
+        if slot < len(self.items):
+            self.dragLayout.insertWidget(self.dragLayout.indexOf(self.items[slot]), widget)
+        else:
+            self.dragLayout.addWidget(widget)
+
     def dragEnterEvent(self, e):
         e.accept()
+        self._slot = None
         self.dropIndicator.setVisible(True)
+        self._measure()
             
     def dragMoveEvent(self, e):
         e.accept()
-        pos = e.pos()
-        indicatorY = self.dropIndicator.y()
+        slot = self._slotAt(e.pos())
+        if slot == self._slot:
+            return
 
-        for n in range(self.dragLayout.count()):
-            # Get the widget at each index in turn.
-            w = self.dragLayout.itemAt(n).widget()
-            if w == self.dropIndicator:
-                continue
-            if self.orientation == Qt.Orientation.Vertical:
-                # Drag drop vertically.
-                drop_here = pos.y() < w.y() - w.size().height() // 3
-            else:
-                # Drag drop horizontally.
-                drop_here = pos.x() < w.x() + w.size().width() // 2
-
-            if drop_here:
-                # We didn't drag past this widget.
-                # insert to the left of it.
-                if pos.y() > indicatorY:
-                    insertAt = n-2
-                else:
-                    insertAt = n-1
-                self.dragLayout.insertWidget(insertAt, self.dropIndicator)
-                self.orderChanged.emit(self.get_item_data())
-                # widget.setVisible(True)
-                break
+        self._slot = slot
+        self._insertBefore(slot, self.dropIndicator)
+        self._measure()
+
+    def dragLeaveEvent(self, e):
+        self.dropIndicator.setVisible(False)
+        self._slot = None
 
     def dropEvent(self, e):
-        pos = e.pos()
         widget = e.source()
-
-        for n in range(self.dragLayout.count()):
-            # Get the widget at each index in turn.
-            w = self.dragLayout.itemAt(n).widget()
-            if self.orientation == Qt.Orientation.Vertical:
-                # Drag drop vertically.
-                drop_here = pos.y() < w.y() - ((w.size().height())//3)
-            else:
-                # Drag drop horizontally.
-                drop_here = pos.x() < w.x() + w.size().width() // 2
-
-            if drop_here:
-                # We didn't drag past this widget.
-                # insert to the left of it.
-                self.dragLayout.insertWidget(n-1, widget)
-                self.orderChanged.emit(self.get_item_data())
-                # widget.setVisible(True)
-                break
-            
+        slot = self._slotAt(e.pos())
         self.dropIndicator.setVisible(False)
-
+        self._slot = None
         e.accept()
 
+        if widget not in self.items:
+            return
+        source = self.items.index(widget)
+        destination = slot - 1 if slot > source else slot
+        if destination == source:
+            return
+
+        self.items.insert(destination, self.items.pop(source))
+        self._insertBefore(destination + 1, widget)
+        self.orderChanged.emit(source, destination)
+
     def add_item(self, item):
+        self.items.append(item)
         self.dragLayout.addWidget(item)
 
     def get_item_data(self):
-        data = []
-        for n in range(self.dragLayout.count()):
-            # Get the widget at each index in turn.
-            w = self.dragLayout.itemAt(n).widget()
-            data.append(w.data)
-        return data
+        return [getattr(item, "data", None) for item in self.items]
 
 class DragItem(QLabel):
 
@@ -899,8 +1660,17 @@ class DragItem(QLabel):
             drag.exec_(Qt.MoveAction)
 
 class Instruction(QWidget):
-    def __init__(self, title='', hue=0, animationDuration=150, parent=None):
+    # SHARED BY EVERY INSTRUCTION, ONLY ONE TOGGLES AT A TIME
+    _animation = None
+
+    def __init__(self, title='', hue=0, animationDuration=150, content=None, parent=None):
         """
+        Collapsible instruction. Its content is only built on first expand, its header is made of plain labels
+        and the title editor is only built on first double click.
+
+        Args:
+            content (QLayout or function, optional): content layout, or a function returning it. Defaults to None.
+
         References:
             # Adapted from PyQt4 version
             https://stackoverflow.com/a/37927256/386398
@@ -910,53 +1680,43 @@ class Instruction(QWidget):
         super(Instruction, self).__init__(parent=parent)
 
         self.animationDuration = animationDuration
-        self.toggleAnimation = QParallelAnimationGroup()
-        self.contentArea =  QScrollArea()
+        self.contentArea = None
+        self._content = content
         self.toggleButton = QToolButton()
         self.ratio = getScreenRatio()
         
         headerBar = QFrame()
-        headerBar.setStyleSheet(''' QFrame{
-                                        background-color: hsl('''+str(hue)+''', 50, 100);
-                                        border: none;
-                                        border-radius: 5px;
-                                        }
-                                    *{ 
-                                        color: white;}''')
+        headerBar.setObjectName("instructionHeader")
+        headerBar.setProperty("hue", str(theme.hueBucket(hue)))
+        self.headerBar = headerBar
                 
         checkBox = QCheckBox()
-        checkBox.setStyleSheet('''
-                                QCheckBox{
-                                    border-radius: 5px;
-                                    border: none;
-                                    background-color: white;
-                                    color: black;
-                                    }''')
         checkBox.setChecked(True)
         self.checkBox = checkBox
         
-        actionIcon = ImageWidget("blank_w.svg", 24*self.ratio, 24*self.ratio)
+        actionIcon = iconLabel("blank_w.svg", 24*self.ratio, 24*self.ratio)
         self.actionImage = actionIcon
         
-        actionTitle = EditableLabel(title)
+        actionTitle = TitleLabel(title)
+        actionTitle.setContentsMargins(7, 0, 0, 2)
+        actionTitle.doubleClicked.connect(self._editTitle)
         self.actionTitle = actionTitle
         
         actionDescription = QLabel("3 actions")
-        actionDescription.setStyleSheet("QLabel{ font-size: 14px}")
+        actionDescription.setObjectName("instructionDescription")
         self.actionDescription = actionDescription
         
-        playButton = ImageWidget("blank_w.svg", 16*self.ratio, 16*self.ratio)
+        playButton = iconLabel("blank_w.svg", 16*self.ratio, 16*self.ratio)
         self.playButton = playButton
         
-        deleteButton = ImageWidget("blank_w.svg", 16*self.ratio, 16*self.ratio)
+        deleteButton = iconLabel("blank_w.svg", 16*self.ratio, 16*self.ratio)
         self.deleteButton = deleteButton
         
         line = QWidget()
         line.setFixedSize(2, 30*self.ratio)
-        line.setStyleSheet("background-color: white;")
+        line.setObjectName("whiteLine")
 
         toggleButton = self.toggleButton
-        toggleButton.setStyleSheet("QToolButton { border: none; }")
         toggleButton.setToolButtonStyle(Qt.ToolButtonIconOnly)
         toggleButton.setArrowType(Qt.UpArrow)
         toggleButton.setCheckable(True)
@@ -976,54 +1736,92 @@ class Instruction(QWidget):
         headerLayout.addWidget(toggleButton)
         headerBar.setLayout(headerLayout)
 
-        self.contentArea.setStyleSheet("QScrollArea { background-color: rgba(0,0,0,0); border: none; }")
-        self.contentArea.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
-        # start out collapsed
-        self.contentArea.setMaximumHeight(0)
-        self.contentArea.setMinimumHeight(0)
-        # let the entire widget grow and shrink with its content
-        toggleAnimation = self.toggleAnimation
-        toggleAnimation.addAnimation(QPropertyAnimation(self, b"minimumHeight"))
-        toggleAnimation.addAnimation(QPropertyAnimation(self, b"maximumHeight"))
-        toggleAnimation.addAnimation(QPropertyAnimation(self.contentArea, b"maximumHeight"))
         # don't waste space
         mainLayout = QVBoxLayout()
         mainLayout.setSpacing(0)
         mainLayout.setContentsMargins(0, 0, 0, 0)
         mainLayout.addWidget(headerBar)
-        mainLayout.addWidget(self.contentArea)
         self.mainLayout = mainLayout
         self.setLayout(self.mainLayout)
         
         # Store data for drag n drop
         self.data = title
 
-        def start_animation(checked):
-            arrow_type = Qt.DownArrow if checked else Qt.UpArrow
-            direction = QAbstractAnimation.Forward if checked else QAbstractAnimation.Backward
-            toggleButton.setArrowType(arrow_type)
-            self.toggleAnimation.setDirection(direction)
-            self.toggleAnimation.start()
-
-        self.toggleButton.clicked.connect(start_animation)
-        # START COLLAPSED
-        start_animation(False)
+        self.toggleButton.clicked.connect(self._toggle)
+
+    def _editTitle(self):
+        # SWAP THE TITLE LABEL FOR ITS EDITOR, ONCE
+        label = self.actionTitle
+        editor = EditableLabel(label.text())
+        self.headerBar.layout().replaceWidget(label, editor)
+        label.deleteLater()
+        self.actionTitle = editor
+        editor.mouseDoubleClickEvent(None)
+        editor.setFocus()
+
+    @classmethod
+    def _sharedAnimation(cls):
+        if cls._animation is None:
+            group = QParallelAnimationGroup()
+            for name in [b"minimumHeight", b"maximumHeight", b"maximumHeight"]:
+                animation = QPropertyAnimation()
+                animation.setPropertyName(name)
+                group.addAnimation(animation)
+            cls._animation = group
+
+        return cls._animation
+
+    def _buildContent(self):
+        contentLayout = self._content() if callable(self._content) else self._content
+        contentArea = QScrollArea()
+        contentArea.setObjectName("instructionContent")
+        contentArea.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
+        # start out collapsed
+        contentArea.setMaximumHeight(0)
+        contentArea.setMinimumHeight(0)
+        if contentLayout is not None:
+            contentArea.setLayout(contentLayout)
+        self.mainLayout.addWidget(contentArea)
+        self.contentArea = contentArea
+
+    def _toggle(self, checked):
+        if self.contentArea is None:
+            if not checked:
+                return
+            self._buildContent()
+        self.toggleButton.setArrowType(Qt.DownArrow if checked else Qt.UpArrow)
+
+        # FINISH ANY OTHER INSTRUCTION TOGGLE BEFORE TAKING THE ANIMATION OVER
+        group = self._sharedAnimation()
+        if group.state() == QAbstractAnimation.Running:
+            group.setCurrentTime(group.totalDuration() if group.direction() == QAbstractAnimation.Forward else 0)
+            group.stop()
+
+        collapsedHeight = self.headerBar.sizeHint().height()
+        contentLayout = self.contentArea.layout()
+        contentHeight = contentLayout.sizeHint().height() if contentLayout else 0
+        heights = [(self, collapsedHeight, collapsedHeight + contentHeight),
+                   (self, collapsedHeight, collapsedHeight + contentHeight),
+                   (self.contentArea, 0, contentHeight)]
+        for i, (target, start, end) in enumerate(heights):
+            animation = group.animationAt(i)
+            animation.setTargetObject(target)
+            animation.setDuration(self.animationDuration)
+            animation.setStartValue(start)
+            animation.setEndValue(end)
+        group.setDirection(QAbstractAnimation.Forward if checked else QAbstractAnimation.Backward)
+        group.start()
 
     def setContentLayout(self, contentLayout):
-        # Not sure if this is equivalent to self.contentArea.destroy()
-        self.contentArea.destroy()
-        self.contentArea.setLayout(contentLayout)
-        collapsedHeight = self.sizeHint().height() - self.contentArea.maximumHeight()
-        contentHeight = contentLayout.sizeHint().height()
-        for i in range(self.toggleAnimation.animationCount()-1):
-            expandAnimation = self.toggleAnimation.animationAt(i)
-            expandAnimation.setDuration(self.animationDuration)
-            expandAnimation.setStartValue(collapsedHeight)
-            expandAnimation.setEndValue(collapsedHeight + contentHeight)
-        contentAnimation = self.toggleAnimation.animationAt(self.toggleAnimation.animationCount() - 1)
-        contentAnimation.setDuration(self.animationDuration)
-        contentAnimation.setStartValue(0)
-        contentAnimation.setEndValue(contentHeight)
+        """
+        Set the content layout, or a function returning it, built on first expand
+        """
+        self._content = contentLayout
+        if self.contentArea is not None:
+            self.contentArea.deleteLater()
+            self.contentArea = None
+            if self.toggleButton.isChecked():
+                self._toggle(True)
 
     def set_data(self, data):
         self.data = data
@@ -1054,19 +1852,7 @@ class AddInstructionButton(QPushButton):
     def __init__(self, text, parent):
         super().__init__(text, parent)
         ratio = getScreenRatio()
-        
-        self.setStyleSheet('''
-                            QPushButton{
-                                background-color: #51C080;
-                                border-radius: 5px;
-                                font-weight: bold;
-                                font-size: 24px;
-                                color: white;
-                                }
-                            QPushButton:hover{
-                                background-color: #6FCF97;
-                                }
-                            ''')
+        self.setObjectName("addButton")
         self.setMinimumHeight(35*ratio)
         self.setFixedWidth(200*ratio)
         self.raise_()
@@ -0,0 +1,171 @@
+import os, shutil, tempfile
+
+
+# DEFAULT SIZE LIMIT, IN BYTES
+MAX_SIZE = 20 * 1024 ** 3
+
+
+def _copy(source, destination):
+    """
+    Copy source to destination, replacing destination atomically.
+    Never a hard link: Maya saves files in place, a save would change the cached file with it.
+    """
+    directory = os.path.dirname(os.path.abspath(destination))
+    os.makedirs(directory, exist_ok=True)
+    handle, temp = tempfile.mkstemp(prefix=".geppetto_", dir=directory)
+    os.close(handle)
+    try:
+        shutil.copyfile(source, temp)
+        os.replace(temp, destination)
+    except BaseException:
+        os.remove(temp)
+        raise
+
+    return
+
+
+class PublishCache(object):
+    """
+    Content-addressed store of published rigs, one file per session hash, see toolbox.sessionHash.
+
+    Files are copied in and out of the cache, so published files never share data with cached ones.
+    The least recently used entries are evicted once the cache grows past its size limit, recency being the
+    file modification time so that many processes can share a cache directory without any index to lock.
+    Hit and miss counters are kept per instance.
+
+    Args:
+        directory (str): cache directory, created if needed
+        maxSize (int, optional): size limit in bytes. Defaults to MAX_SIZE.
+        extension (str, optional): cached file extension. Defaults to ".mb".
+    """
+
+    def __init__(self, directory, maxSize=MAX_SIZE, extension=".mb"):
+        self.directory = directory
+        self.maxSize = maxSize
+        self.extension = extension
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, digest):
+        return os.path.join(self.directory, f"{digest}{self.extension}")
+
+    def get(self, digest):
+        """
+        Look up a cached file, marking it as recently used
+
+        Args:
+            digest (str): content hash
+
+        Returns:
+            str: cached file path, None on a miss
+        """
+        path = self.path(digest)
+        try:
+            os.utime(path)
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+
+        return path
+
+    def fetch(self, digest, destination):
+        """
+        Copy a cached file to destination
+
+        Args:
+            digest (str): content hash
+            destination (str): file to create or replace
+
+        Returns:
+            bool: True on a hit, False if nothing is cached for given hash
+        """
+        path = self.get(digest)
+        if path is None:
+            return False
+        _copy(path, destination)
+
+        return True
+
+    def put(self, digest, source):
+        """
+        Store a file in the cache and evict the least recently used files past the size limit
+
+        Args:
+            digest (str): content hash
+            source (str): file to store
+
+        Returns:
+            str: cached file path
+        """
+        path = self.path(digest)
+        _copy(source, path)
+        os.utime(path)
+        self.evict(keep=path)
+
+        return path
+
+    def entries(self):
+        """
+        Returns:
+            list: [(path, size, last use)], least recently used first
+        """
+        ret = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith(self.extension) and not entry.name.startswith("."):
+                    stat = entry.stat()
+                    ret.append((entry.path, stat.st_size, stat.st_mtime))
+
+        return sorted(ret, key=lambda item: item[2])
+
+    def size(self):
+        return sum(size for path, size, used in self.entries())
+
+    def evict(self, keep=None):
+        """
+        Remove the least recently used files until the cache fits its size limit
+
+        Args:
+            keep (str, optional): file never evicted. Defaults to None.
+
+        Returns:
+            int: number of removed files
+        """
+        entries = self.entries()
+        total = sum(size for path, size, used in entries)
+        ret = 0
+        for path, size, used in entries:
+            if total <= self.maxSize:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                # ALREADY EVICTED BY ANOTHER PROCESS
+                pass
+            total -= size
+            ret += 1
+        self.evictions += ret
+
+        return ret
+
+    def stats(self):
+        """
+        Returns:
+            dict: {"hits", "misses", "evictions", "entries", "size"}
+        """
+        entries = self.entries()
+
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "entries": len(entries), "size": sum(size for path, size, used in entries)}
+
+    def clear(self):
+        for path, size, used in self.entries():
+            os.remove(path)
+        self.hits = self.misses = self.evictions = 0
+
+        return
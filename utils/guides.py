@@ -0,0 +1,117 @@
+import time
+
+from . import toolbox as tb
+from .scene import IDENTITY, cmds as mc
+
+
+'''                 '''
+''' GUIDE TEMPLATES '''
+'''                 '''
+
+# GUIDE CHAINS OF THE BUILT-IN MODULE TYPES: (GUIDE, WORLD POSITION OF THE LEFT SIDE)
+CHAINS = {
+    "spine": [("hips", (0.0, 9.5, 0.0)), ("spine1", (0.0, 10.7, 0.0)), ("spine2", (0.0, 11.9, 0.0)), ("chest", (0.0, 13.0, 0.0))],
+    "neck": [("neck", (0.0, 15.0, 0.0)), ("head", (0.0, 16.0, 0.0)), ("headEnd", (0.0, 18.0, 0.0))],
+    "arm": [("clavicle", (0.3, 14.0, 0.3)), ("shoulder", (1.5, 14.0, 0.0)), ("elbow", (4.0, 14.0, -0.3)),
+            ("wrist", (6.5, 14.0, 0.0)), ("hand", (7.5, 14.0, 0.0))],
+    "leg": [("hip", (1.0, 9.0, 0.0)), ("knee", (1.0, 5.0, 0.3)), ("ankle", (1.0, 1.0, 0.0)),
+            ("ball", (1.0, 0.0, 1.0)), ("toe", (1.0, 0.0, 2.0))],
+}
+
+_templates = {}
+
+
+def register(moduleType, template):
+    """
+    Register the guides of a module type
+
+    Args:
+        moduleType (str): module type
+        template (function): called with the module name, returns guide descriptions for scene.createNodes.
+            A "parent" index refers to the returned list, None to the module.
+    """
+    _templates[moduleType] = template
+
+    return
+
+
+def chainTemplate(chain):
+    """
+    Make a template creating a joint chain, mirrored on X for right side modules
+
+    Args:
+        chain (list): [(guide name, world position)], parents first
+
+    Returns:
+        function: guide template
+    """
+    def template(module):
+        sign = -1.0 if tb.moduleSide(module) == "R" else 1.0
+        ret = []
+        previous = (0.0, 0.0, 0.0)
+        for i, (guide, (x, y, z)) in enumerate(chain):
+            position = (x * sign, y, z)
+            matrix = list(IDENTITY)
+            matrix[12:15] = [a - b for a, b in zip(position, previous)]
+            ret.append({"type": "joint", "name": f"{module}_{guide}", "parent": i - 1 if i else None, "matrix": matrix})
+            previous = position
+
+        return ret
+
+    return template
+
+
+def guideTemplate(module):
+    """
+    Returns:
+        list: guide descriptions of given module, empty if its type has no template
+    """
+    moduleType = mc.getAttr(f"{module}.module_type")
+    template = _templates.get(moduleType)
+
+    return template(module) if template else []
+
+
+'''              '''
+''' BUILD GUIDES '''
+'''              '''
+
+def buildGuides(modules=None):
+    """
+    Replace the guides of given modules, creating every guide of every module with a single scene.createNodes call
+
+    Args:
+        modules (list, optional): module names. Defaults to every module.
+
+    Returns:
+        dict: {"modules": {module: {"guides": count, "time": seconds}}, "create": seconds}.
+            Module times cover gathering their guides, "create" the batched creation of all of them.
+    """
+    modules = tb.getModules() if modules is None else modules
+    report = {"modules": {}, "create": 0.0}
+    nodes = []
+    old = []
+    for module in modules:
+        start = time.perf_counter()
+        moduleLong = f"{tb.getGeppetto()}|modules|{module}"
+        old += mc.listRelatives(moduleLong, c=True, f=True) or []
+        offset = len(nodes)
+        guides = guideTemplate(module)
+        for guide in guides:
+            parent = guide.get("parent")
+            nodes.append(dict(guide, parent=moduleLong if parent is None else parent + offset,
+                              connections=dict(tb.guideConnections(guide["type"]), **guide.get("connections", {}))))
+        report["modules"][module] = {"guides": len(guides), "time": time.perf_counter() - start}
+
+    start = time.perf_counter()
+    if old:
+        mc.delete(*old)
+    if nodes:
+        mc.createNodes(nodes)
+    report["create"] = time.perf_counter() - start
+
+    return report
+
+
+for _moduleType, _chain in CHAINS.items():
+    register(_moduleType, chainTemplate(_chain))
@@ -0,0 +1,197 @@
+import re
+
+try:
+    import numpy as np
+except ImportError:
+    # PURE PYTHON FALLBACK BELOW
+    np = None
+
+from . import toolbox as tb
+from .scene import cmds as mc
+
+
+'''        '''
+''' PLANES '''
+'''        '''
+
+# AXIS SCALES OF EACH MIRROR PLANE
+PLANES = {"YZ": (-1.0, 1.0, 1.0), "XZ": (1.0, -1.0, 1.0), "XY": (1.0, 1.0, -1.0)}
+
+_SIDE = re.compile(r"(^|_)([LR])(_|$)")
+
+
+def swapSide(name):
+    """
+    Swap every L/R side token in a name: "L_arm" -> "R_arm", "arm_R_tip" -> "arm_L_tip"
+
+    Args:
+        name (str): node name
+
+    Returns:
+        str: name with swapped sides, unchanged if it has no side
+    """
+    return _SIDE.sub(lambda match: match.group(1) + ("R" if match.group(2) == "L" else "L") + match.group(3), name)
+
+
+def nameSide(name):
+    """
+    Returns:
+        str: first L/R side token of a name or path, "-" if none
+    """
+    match = _SIDE.search(name)
+
+    return match.group(2) if match else "-"
+
+
+def _signs(plane):
+    """
+    Mirroring a matrix M across a plane, keeping it a proper rotation, is F * M * F with F the plane reflection.
+    F is diagonal so this boils down to scaling each element by the product of its row and column signs.
+
+    Returns:
+        list: 16 signs, row-major
+    """
+    if plane not in PLANES:
+        mc.error(f"Unknown mirror plane {plane}, use one of {', '.join(PLANES)}")
+    f = list(PLANES[plane]) + [1.0]
+
+    return [f[r] * f[c] for r in range(4) for c in range(4)]
+
+
+def mirrorMatrices(matrices, plane="YZ"):
+    """
+    Mirror many world matrices at once
+
+    Args:
+        matrices (list): one list of 16 floats per transform
+        plane (str, optional): mirror plane, key of PLANES. Defaults to "YZ".
+
+    Returns:
+        list: mirrored matrices, one list of 16 floats per transform
+    """
+    signs = _signs(plane)
+    if np is not None:
+        return (np.asarray(matrices, dtype=float).reshape(-1, 16) * np.asarray(signs)).tolist()
+
+    return [[value * sign for value, sign in zip(matrix, signs)] for matrix in matrices]
+
+
+'''         '''
+''' PAIRING '''
+'''         '''
+
+def _guides(module):
+    """
+    Returns:
+        dict: {guide path relative to the module: full path}, parents first
+    """
+    prefix = f"{tb.getGeppetto()}|modules|{module}|"
+    nodes = reversed(mc.listRelatives(prefix[:-1], ad=True, f=True) or [])
+
+    return {node[len(prefix):]: node for node in nodes}
+
+
+def _createCounterpart(module):
+    """
+    Create the opposite side module as a renamed copy of given one
+    """
+    data = tb.getModuleData(module)
+    for guide in data["guides"]:
+        guide["name"] = swapSide(guide["name"])
+        guide["parent"] = swapSide(guide["parent"])
+    name = swapSide(module)
+    side = tb.moduleSide(name)
+    target = tb.createModule(name if side == "-" else name[2:], mc.getAttr(f"{module}.module_type"), side)
+    tb.setModuleData(target, data)
+
+    return target
+
+
+def pairingTable(modules, source="L", create=True):
+    """
+    Pair the guides of given modules with their opposite side guides.
+    Side modules pair with their counterpart module, created if missing, center modules with themselves
+    through their sided guides. Guides are paired by path relative to their module, sides swapped.
+
+    Args:
+        modules (list): source module names
+        source (str, optional): side mirrored from inside center modules. Defaults to "L".
+        create (bool, optional): create missing counterpart modules. Defaults to True.
+
+    Returns:
+        list: [(source guide, target guide)] full paths, target parents first
+    """
+    ret = []
+    paired = set()
+    for module in modules:
+        target = swapSide(module)
+        if target != module and target in paired:
+            continue
+        if target != module and not mc.objExists(f"{tb.getGeppetto()}|modules|{target}"):
+            if not create:
+                continue
+            _createCounterpart(module)
+        paired.add(module)
+
+        guides = _guides(module)
+        targets = guides if target == module else _guides(target)
+        for path, guide in guides.items():
+            other = "|".join(swapSide(name) for name in path.split("|"))
+            # CENTER GUIDES OF CENTER MODULES LIE ON THE PLANE, SIDED ONES ONLY GO ONE WAY
+            if target == module and nameSide(path) != source:
+                continue
+            if other in targets:
+                ret.append((guide, targets[other]))
+
+    return ret
+
+
+'''        '''
+''' MIRROR '''
+'''        '''
+
+def selectedModules():
+    """
+    Get the modules holding the current selection
+
+    Returns:
+        list: module names, in selection order
+    """
+    prefix = f"{tb.getGeppetto()}|modules|"
+    ret = []
+    for node in mc.ls(sl=True, l=True) or []:
+        if node.startswith(prefix):
+            module = node[len(prefix):].split("|")[0]
+            if module not in ret:
+                ret.append(module)
+
+    return ret
+
+
+def mirrorModules(modules=None, plane="YZ", source="L"):
+    """
+    Mirror module guides to the opposite side with a single matrix read and a single matrix write
+
+    Args:
+        modules (list, optional): modules to mirror from. Defaults to the selected modules,
+            or every module of the source side and every center module if nothing is selected.
+        plane (str, optional): mirror plane, key of PLANES. Defaults to "YZ".
+        source (str, optional): side mirrored from when no module is given or selected. Defaults to "L".
+
+    Returns:
+        int: number of mirrored guides
+    """
+    if modules is None:
+        modules = selectedModules()
+    if not modules:
+        index = tb.getModuleIndex()
+        modules = index.bySide(source) + index.bySide("-")
+
+    pairs = pairingTable(modules, source)
+    if not pairs:
+        return 0
+
+    sources, targets = zip(*pairs)
+    mc.setMatrices(list(targets), mirrorMatrices(mc.getMatrices(list(sources)), plane))
+
+    return len(pairs)
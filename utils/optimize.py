@@ -0,0 +1,355 @@
+import time
+
+from .scene import cmds as mc
+
+
+'''           '''
+''' UTILITIES '''
+'''           '''
+
+# UTILITY NODES THE OPTIMIZER MAY MERGE, BYPASS OR DELETE, WITH EVERY ATTRIBUTE THEIR RESULT DEPENDS ON
+UTILITIES = {
+    "unitConversion": ["input", "conversionFactor"],
+    "multDoubleLinear": ["input1", "input2"],
+    "addDoubleLinear": ["input1", "input2"],
+    "multiplyDivide": ["operation", "input1", "input2"],
+    "decomposeMatrix": ["inputMatrix", "inputRotateOrder"],
+}
+
+# CONSTANT INPUTS MAKING A NODE PASS ANOTHER INPUT THROUGH: {type: [(constant input, value, passed input)]}
+IDENTITIES = {
+    "multDoubleLinear": [("input2", 1.0, "input1"), ("input1", 1.0, "input2")],
+    "addDoubleLinear": [("input2", 0.0, "input1"), ("input1", 0.0, "input2")],
+}
+
+
+def _attr(plug):
+    return plug.split(".", 1)[1]
+
+
+def _isInput(plug, attr):
+    """
+    Returns:
+        bool: True if plug is given attribute or one of its X, Y, Z children
+    """
+    name = _attr(plug)
+
+    return name == attr or (name.startswith(attr) and name[len(attr):] in ("X", "Y", "Z"))
+
+
+def _value(value):
+    # COMPOUND VALUES COME AS [(x, y, z)]
+    if isinstance(value, list) and len(value) == 1 and isinstance(value[0], tuple):
+        return value[0]
+    if isinstance(value, list):
+        return tuple(value)
+
+    return value
+
+
+def _compute(nodeType, values):
+    """
+    Evaluate a utility node from its constant inputs.
+    Unit conversions are never folded, setAttr works in UI units while they output internal ones.
+
+    Returns:
+        any: output value, None if it can't be computed here
+    """
+    if nodeType == "multDoubleLinear":
+        return values["input1"] * values["input2"]
+    if nodeType == "addDoubleLinear":
+        return values["input1"] + values["input2"]
+    if nodeType == "multiplyDivide":
+        a, b = values["input1"], values["input2"]
+        if values["operation"] == 1:
+            return tuple(x * y for x, y in zip(a, b))
+        if values["operation"] == 2 and all(b):
+            return tuple(x / y for x, y in zip(a, b))
+
+    return None
+
+
+'''       '''
+''' GRAPH '''
+'''       '''
+
+class RigGraph(object):
+    """
+    Utility node network of a built rig, with the connections of each node read once and kept up to date
+    while the optimizer rewires it. Only given nodes are part of the graph, the nodes they connect to are
+    boundaries that are never changed.
+
+    Args:
+        groups (dict): {owner: nodes}, the nodes created by each instruction of the build
+        roots (iterable, optional): nodes that must be kept, like the ones instructions output. Defaults to ().
+    """
+
+    def __init__(self, groups, roots=()):
+        self.roots = set(roots)
+        self.types = {}
+        self.inputs = {}
+        self.outputs = {}
+        self.owners = {}
+        self.nodes = []
+        for owner, nodes in groups.items():
+            for node in nodes:
+                if node in self.owners or not mc.objExists(node):
+                    continue
+                self.owners[node] = owner
+                self.nodes.append(node)
+                self.types[node] = mc.nodeType(node)
+                if self.types[node] in UTILITIES:
+                    self._read(node)
+
+    def _read(self, node):
+        pairs = mc.listConnections(node, s=True, d=False, c=True, p=True) or []
+        self.inputs[node] = dict(zip(pairs[::2], pairs[1::2]))
+        pairs = mc.listConnections(node, s=False, d=True, c=True, p=True) or []
+        self.outputs[node] = list(zip(pairs[::2], pairs[1::2]))
+
+    def utilities(self):
+        """
+        Iterate over the utility nodes, skipping the ones removed meanwhile
+        """
+        for node in list(self.nodes):
+            if self.types.get(node) in UTILITIES:
+                yield node
+
+    def internal(self, node):
+        """
+        Returns:
+            bool: True if every node reading given one was created by the same instruction,
+                only such nodes may be removed
+        """
+        owner = self.owners[node]
+
+        return all(self.owners.get(destination.split(".")[0]) == owner for source, destination in self.outputs[node])
+
+    def removable(self, node):
+        """
+        Returns:
+            bool: True if the node is not a root and only read by its own instruction
+        """
+        return node not in self.roots and self.internal(node)
+
+    def connected(self, node, attr):
+        return any(_isInput(plug, attr) for plug in self.inputs[node])
+
+    def constants(self, node):
+        """
+        Returns:
+            dict: {attribute: value} of the unconnected attributes the node result depends on,
+                the unconnected X, Y, Z children of partly connected compounds come one by one
+        """
+        ret = {}
+        for attr in UTILITIES[self.types[node]]:
+            connected = [_attr(plug) for plug in self.inputs[node] if _isInput(plug, attr)]
+            if not connected:
+                ret[attr] = _value(mc.getAttr(f"{node}.{attr}"))
+            elif attr not in connected:
+                for child in [f"{attr}{axis}" for axis in "XYZ" if f"{attr}{axis}" not in connected]:
+                    ret[child] = _value(mc.getAttr(f"{node}.{child}"))
+
+        return ret
+
+    def _refresh(self, plugs):
+        for plug in plugs:
+            node = plug.split(".")[0]
+            if node not in self.inputs:
+                continue
+            if mc.objExists(node):
+                self._read(node)
+            else:
+                # MAYA DELETES THE UNIT CONVERSIONS A DELETION LEAVES UNCONNECTED
+                self._forget(node)
+
+    def _forget(self, node):
+        self.inputs.pop(node, None)
+        self.outputs.pop(node, None)
+        self.types.pop(node, None)
+        if node in self.nodes:
+            self.nodes.remove(node)
+
+    def connect(self, source, destination):
+        mc.connectAttr(source, destination, force=True)
+        self._refresh([source, destination])
+
+    def reroute(self, node, plugs):
+        """
+        Move the outgoing connections of a node to other plugs
+
+        Args:
+            node (str): node
+            plugs (function): called with each output attribute, returns the plug replacing it
+        """
+        for source, destination in list(self.outputs[node]):
+            mc.connectAttr(plugs(_attr(source)), destination, force=True)
+            self._refresh([plugs(_attr(source)), destination])
+        self.outputs[node] = []
+
+    def delete(self, node):
+        neighbours = list(self.inputs.pop(node, {}).values()) + [plug for source, plug in self.outputs.pop(node, [])]
+        mc.delete(node)
+        self._forget(node)
+        self._refresh(neighbours)
+
+
+'''          '''
+''' OPTIMIZE '''
+'''          '''
+
+def _deleteDead(graph):
+    ret = 0
+    for node in graph.utilities():
+        if not graph.outputs[node] and node not in graph.roots:
+            graph.delete(node)
+            ret += 1
+
+    return ret
+
+
+def _foldConstants(graph):
+    """
+    Replace utility nodes with only constant inputs by their value, set on their destinations
+    """
+    ret = 0
+    for node in graph.utilities():
+        nodeType = graph.types[node]
+        if graph.inputs[node] or not graph.outputs[node] or not graph.removable(node):
+            continue
+        value = _compute(nodeType, graph.constants(node))
+        if value is None:
+            continue
+
+        # COMPOUND RESULTS ONLY FOLD INTO COMPOUND DESTINATIONS
+        for source, destination in graph.outputs[node]:
+            if isinstance(value, tuple) != (_attr(source) == "output" and nodeType == "multiplyDivide"):
+                break
+            if mc.getAttr(destination, lock=True):
+                break
+        else:
+            for source, destination in list(graph.outputs[node]):
+                mc.disconnectAttr(source, destination)
+                mc.setAttr(destination, *(value if isinstance(value, tuple) else [value]))
+            graph.delete(node)
+            ret += 1
+
+    return ret
+
+
+def _bypassIdentities(graph):
+    """
+    Remove utility nodes passing one input through, connecting its source to their destinations
+    """
+    ret = 0
+    for node in graph.utilities():
+        nodeType = graph.types[node]
+        if not graph.removable(node):
+            continue
+        for constant, value, passed in IDENTITIES.get(nodeType, []):
+            source = graph.inputs[node].get(f"{node}.{passed}")
+            if not source or graph.connected(node, constant) or graph.constants(node)[constant] != value:
+                continue
+            graph.reroute(node, lambda attr: source)
+            graph.delete(node)
+            ret += 1
+            break
+
+        # MULTIPLY OR DIVIDE BY ONE, COMPOUND CONNECTIONS ONLY
+        if nodeType == "multiplyDivide" and node in graph.types:
+            source = graph.inputs[node].get(f"{node}.input1")
+            if (source and not graph.connected(node, "input2") and graph.constants(node)["input2"] == (1.0, 1.0, 1.0)
+                    and graph.constants(node).get("operation") in (1, 2)
+                    and all(_attr(plug) == "output" for plug, destination in graph.outputs[node])):
+                graph.reroute(node, lambda attr: source)
+                graph.delete(node)
+                ret += 1
+
+    return ret
+
+
+def _mergeConversions(graph):
+    """
+    Merge chains of unit conversions into one conversion by the product of their factors
+    """
+    ret = 0
+    for node in graph.utilities():
+        if graph.types.get(node) != "unitConversion" or len(graph.outputs[node]) != 1:
+            continue
+        source = graph.inputs[node].get(f"{node}.input")
+        plug, destination = graph.outputs[node][0]
+        following = destination.split(".")[0]
+        if not source or graph.types.get(following) != "unitConversion" or _attr(destination) != "input":
+            continue
+        if graph.owners[following] != graph.owners[node] or node in graph.roots:
+            continue
+        if graph.connected(node, "conversionFactor") or graph.connected(following, "conversionFactor"):
+            continue
+
+        factor = graph.constants(node)["conversionFactor"] * graph.constants(following)["conversionFactor"]
+        mc.setAttr(f"{following}.conversionFactor", factor)
+        graph.connect(source, destination)
+        graph.delete(node)
+        ret += 1
+
+    return ret
+
+
+def _mergeDuplicates(graph):
+    """
+    Merge utility nodes of the same instruction and type computing the same thing from the same inputs
+    """
+    ret = 0
+    kept = {}
+    for node in graph.utilities():
+        inputs = tuple(sorted((_attr(destination), source) for destination, source in graph.inputs[node].items()))
+        signature = (graph.owners[node], graph.types[node], inputs, tuple(sorted(graph.constants(node).items())))
+        other = kept.setdefault(signature, node)
+        if other == node:
+            continue
+        # KEEP THE ONE OTHER INSTRUCTIONS READ OR OUTPUT
+        if not graph.removable(node):
+            if not graph.removable(other):
+                continue
+            node, other = other, node
+            kept[signature] = other
+        graph.reroute(node, lambda attr: f"{other}.{attr}")
+        graph.delete(node)
+        ret += 1
+
+    return ret
+
+
+def optimizeGraph(groups, roots=()):
+    """
+    Simplify the utility node network of a built rig without changing what it computes:
+    merge duplicate nodes and unit conversion chains, fold constant and identity operations
+    and delete utility nodes nothing reads. Runs until nothing changes.
+    Only utility node types listed in UTILITIES are ever removed, and only given nodes are changed.
+    Nodes merge and fold with nodes of their own group only, and nodes read by another group are kept,
+    so each instruction can still be rebuilt on its own. Roots are always kept.
+
+    Args:
+        groups (dict): {owner: nodes}, the nodes created by each instruction of the build
+        roots (iterable, optional): nodes that must be kept, like the ones instructions output. Defaults to ().
+
+    Returns:
+        dict: {"before": node count, "after": node count, "merged", "conversions", "folded", "bypassed",
+               "deleted": counts, "time": seconds}
+    """
+    start = time.perf_counter()
+    graph = RigGraph(groups, roots)
+    report = {"before": len(graph.nodes), "merged": 0, "conversions": 0, "folded": 0, "bypassed": 0, "deleted": 0}
+
+    changed = True
+    while changed:
+        counts = {"merged": _mergeDuplicates(graph), "conversions": _mergeConversions(graph),
+                  "folded": _foldConstants(graph), "bypassed": _bypassIdentities(graph), "deleted": _deleteDead(graph)}
+        for key, count in counts.items():
+            report[key] += count
+        changed = any(counts.values())
+
+    report["after"] = len(graph.nodes)
+    report["time"] = time.perf_counter() - start
+
+    return report
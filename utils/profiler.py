@@ -0,0 +1,191 @@
+import contextlib, sys, time
+
+from . import scene
+
+
+_PACKAGE = __name__.rsplit(".utils", 1)[0]
+_IGNORED = {f"{_PACKAGE}.utils.scene", __name__}
+
+_stats = {}
+_listeners = []
+lastOperation = None
+
+
+class ProfiledScene(object):
+    """
+    Backend wrapper recording call count, cumulative time and calling function of every scene command
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def __getattr__(self, name):
+        command = getattr(self.backend, name)
+        if not callable(command):
+            return command
+
+        def profiled(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return command(*args, **kwargs)
+            finally:
+                _record(name, _caller(), time.perf_counter() - start)
+
+        return profiled
+
+
+def _caller():
+    """
+    Find the Geppetto function that sent the current command
+
+    Returns:
+        str: "module.function", "?" if the command didn't come from Geppetto
+    """
+    frame = sys._getframe(2)
+    while frame:
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith(_PACKAGE) and module not in _IGNORED:
+            return f"{module.rsplit('.', 1)[-1]}.{frame.f_code.co_name}"
+        frame = frame.f_back
+
+    return "?"
+
+
+def _record(command, caller, elapsed):
+    stats = _stats.get((command, caller))
+    if stats is None:
+        _stats[(command, caller)] = [1, elapsed]
+    else:
+        stats[0] += 1
+        stats[1] += elapsed
+
+
+'''     '''
+''' API '''
+'''     '''
+
+def enable():
+    """
+    Start profiling every command Geppetto sends to the scene
+    """
+    if not isEnabled():
+        scene.setBackend(ProfiledScene(scene.getBackend()))
+
+    return
+
+
+def disable():
+    """
+    Stop profiling, counters are kept until reset
+    """
+    backend = scene.getBackend()
+    if isinstance(backend, ProfiledScene):
+        scene.setBackend(backend.backend)
+
+    return
+
+
+def isEnabled():
+    return isinstance(scene.getBackend(), ProfiledScene)
+
+
+def reset():
+    """
+    Clear every counter
+    """
+    global lastOperation
+    _stats.clear()
+    lastOperation = None
+
+    return
+
+
+def snapshot():
+    """
+    Get a copy of the counters
+
+    Returns:
+        dict: {(command, caller): [count, seconds]}
+    """
+    return {key: list(value) for key, value in _stats.items()}
+
+
+def diff(before, after):
+    """
+    Get the calls made between two snapshots
+
+    Args:
+        before (dict): older snapshot
+        after (dict): newer snapshot
+
+    Returns:
+        dict: {(command, caller): [count, seconds]}
+    """
+    ret = {}
+    for key, (count, elapsed) in after.items():
+        oldCount, oldElapsed = before.get(key, [0, 0.0])
+        if count > oldCount:
+            ret[key] = [count - oldCount, elapsed - oldElapsed]
+
+    return ret
+
+
+def top(stats=None, count=10, by="time"):
+    """
+    Get the most expensive commands
+
+    Args:
+        stats (dict, optional): a snapshot or diff. Defaults to the current counters.
+        count (int, optional): number of entries. Defaults to 10.
+        by (str, optional): sort by "time" or "count". Defaults to "time".
+
+    Returns:
+        list: [(command, caller, count, seconds)], most expensive first
+    """
+    stats = _stats if stats is None else stats
+    index = 1 if by == "time" else 0
+    ret = sorted(stats.items(), key=lambda item: item[1][index], reverse=True)[:count]
+
+    return [(command, caller, calls, elapsed) for (command, caller), (calls, elapsed) in ret]
+
+
+def addListener(callback):
+    """
+    Call given function after each profiled operation
+
+    Args:
+        callback (function): called with the operation name and its diff
+    """
+    if callback not in _listeners:
+        _listeners.append(callback)
+
+    return
+
+
+def removeListener(callback):
+    if callback in _listeners:
+        _listeners.remove(callback)
+
+    return
+
+
+@contextlib.contextmanager
+def operation(name):
+    """
+    Profile a user operation and notify listeners with the commands it sent
+
+    Args:
+        name (str): operation name
+    """
+    global lastOperation
+    if not isEnabled():
+        yield
+        return
+
+    before = snapshot()
+    try:
+        yield
+    finally:
+        lastOperation = (name, diff(before, snapshot()))
+        for callback in list(_listeners):
+            callback(*lastOperation)
@@ -0,0 +1,425 @@
+import atexit, hashlib, heapq, json, multiprocessing, os, pickle, shutil, sys, time
+from concurrent import futures
+
+from . import scene, toolbox as tb
+from .optimize import optimizeGraph
+from .scene import cmds as mc
+
+
+'''                      '''
+''' INSTRUCTION REGISTRY '''
+'''                      '''
+
+_registry = {}
+
+
+def register(type, run, compute=None):
+    """
+    Register an instruction type
+
+    Args:
+        type (str): instruction type, the "type" key of instructions
+        run (function): called on the main thread with (instruction, context) when the instruction is built,
+            or (instruction, context, computed) if the type has a compute function.
+            context holds "blueprint" and the "outputs" of every instruction built before.
+            Returns a JSON serializable dict of outputs, the scene nodes it created in "nodes".
+        compute (function, optional): pure computation run in a worker process before run, called with
+            (instruction, modules), modules being {name: module data} for the modules the instruction reads.
+            Must not send any scene command and must return plain, picklable values. Computes that can't be
+            pickled, such as lambdas or nested functions, run on the main thread instead. Defaults to None.
+    """
+    _registry[type] = (run, compute)
+
+    return
+
+
+def getRunner(type):
+    """
+    Returns:
+        tuple: (run, compute) functions of given instruction type, compute may be None
+    """
+    if type not in _registry:
+        mc.error(f"Unknown instruction type: {type}")
+
+    return _registry[type]
+
+
+def _group(instruction, context):
+    parameters = instruction.get("parameters", {})
+    group = mc.group(n=parameters.get("name", instruction["name"]), em=True)
+    if parameters.get("parent"):
+        mc.parent(group, parameters["parent"])
+
+    return {"nodes": [group]}
+
+register("group", _group)
+
+
+'''                  '''
+''' DEPENDENCY GRAPH '''
+'''                  '''
+
+def _hash(data):
+    return hashlib.sha1(json.dumps(data, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+class BuildGraph(object):
+    """
+    Blueprint instructions as a dependency graph.
+
+    An instruction depends on the instructions named in its "inputs" and on the modules named in its
+    "module" or "modules" parameters. Its input hash covers its own content hash, the settings and guide
+    positions of its modules and the input hashes of its upstream instructions, so a change anywhere
+    upstream makes every downstream instruction dirty.
+
+    Args:
+        instructions (list): blueprint instructions, in blueprint order
+    """
+
+    def __init__(self, instructions):
+        self.instructions = instructions
+        self.byName = {instruction["name"]: instruction for instruction in instructions}
+        self.order = self._sort()
+        self._moduleData = {}
+        self._moduleHashes = {}
+
+    def upstream(self, instruction):
+        """
+        Returns:
+            list: names of the instructions given one depends on
+        """
+        return [name for name in instruction.get("inputs") or [] if name in self.byName]
+
+    def modules(self, instruction):
+        """
+        Returns:
+            list: names of the modules given instruction reads
+        """
+        parameters = instruction.get("parameters") or {}
+        ret = list(parameters.get("modules") or [])
+        if parameters.get("module"):
+            ret.insert(0, parameters["module"])
+
+        return ret
+
+    def _sort(self):
+        """
+        Sort instructions so that each one comes after its inputs, blueprint order breaks ties
+
+        Returns:
+            list: sorted instructions
+        """
+        position = {instruction["name"]: i for i, instruction in enumerate(self.instructions)}
+        waiting = {name: len(self.upstream(self.byName[name])) for name in position}
+        downstream = {name: [] for name in position}
+        for instruction in self.instructions:
+            for name in self.upstream(instruction):
+                downstream[name].append(instruction["name"])
+
+        ready = [(position[name], name) for name, count in waiting.items() if not count]
+        heapq.heapify(ready)
+        ret = []
+        while ready:
+            i, name = heapq.heappop(ready)
+            ret.append(self.byName[name])
+            for child in downstream[name]:
+                waiting[child] -= 1
+                if not waiting[child]:
+                    heapq.heappush(ready, (position[child], child))
+
+        if len(ret) != len(self.instructions):
+            cycle = [name for name, count in waiting.items() if count]
+            mc.error(f"Instructions depend on each other: {', '.join(cycle)}")
+
+        return ret
+
+    def moduleData(self, module):
+        if module not in self._moduleData:
+            self._moduleData[module] = tb.getModuleData(module) if mc.objExists(module) else None
+
+        return self._moduleData[module]
+
+    def moduleHash(self, module):
+        if module not in self._moduleHashes:
+            self._moduleHashes[module] = tb.dataHash(self.moduleData(module))
+
+        return self._moduleHashes[module]
+
+    def inputHash(self, instruction, upstreamHashes):
+        """
+        Hash everything an instruction build depends on
+
+        Args:
+            instruction (dict): instruction
+            upstreamHashes (dict): input hashes of the instructions already visited
+
+        Returns:
+            str: sha1 hex digest
+        """
+        return _hash({"instruction": tb.instructionHash(instruction),
+                      "modules": [self.moduleHash(module) for module in self.modules(instruction)],
+                      "upstream": [upstreamHashes.get(name) for name in self.upstream(instruction)]})
+
+
+'''       '''
+''' BUILD '''
+'''       '''
+
+def _exists(nodes):
+    return len(mc.ls(*nodes)) == len(nodes) if nodes else True
+
+
+def _compute(compute, instruction, modules):
+    start = time.perf_counter()
+    ret = compute(instruction, modules)
+
+    return ret, time.perf_counter() - start
+
+
+class _ComputeScene(object):
+    """
+    Scene backend of compute processes, computes get everything they read as arguments
+    """
+
+    def __getattr__(self, name):
+        raise RuntimeError(f"Scene command {name} sent from an instruction compute, computes only get plain data")
+
+
+def _startWorker():
+    # THE SCENE IS CUT OFF ONCE PER PROCESS, NOT CHECKED ON EVERY COMMAND
+    scene.setBackend(_ComputeScene())
+
+    return
+
+
+def _interpreter():
+    """
+    Returns:
+        str: python interpreter running compute processes, mayapy from the Maya GUI. None if there is none.
+    """
+    name = os.path.basename(sys.executable).lower()
+    if not name.startswith("maya") or name.startswith("mayapy"):
+        return sys.executable
+
+    directories = [os.path.dirname(sys.executable), os.path.join(os.path.dirname(os.path.dirname(sys.executable)), "bin")]
+    if os.environ.get("MAYA_LOCATION"):
+        directories.insert(0, os.path.join(os.environ["MAYA_LOCATION"], "bin"))
+    for directory in directories:
+        path = shutil.which("mayapy", path=directory)
+        if path:
+            return path
+
+    return None
+
+
+# COMPUTE POOL SHARED BY EVERY BUILD, WORKERS COST MORE TO START THAN MOST COMPUTES
+_pool = {"executor": None, "workers": None, "exit": False}
+
+
+def _startPool(workers):
+    """
+    Start a compute pool: worker processes, the GIL keeps threads from computing in parallel.
+    Falls back to threads when no interpreter can be spawned.
+
+    Args:
+        workers (int): worker count
+
+    Returns:
+        concurrent.futures.Executor: the pool
+    """
+    interpreter = _interpreter()
+    if interpreter is None:
+        return futures.ThreadPoolExecutor(workers, "geppettoCompute")
+
+    # SPAWNED, FORKING THE MAYA PROCESS IS NOT SAFE
+    context = multiprocessing.get_context("spawn")
+    if interpreter != sys.executable:
+        context.set_executable(interpreter)
+
+    return futures.ProcessPoolExecutor(workers, mp_context=context, initializer=_startWorker)
+
+
+def getPool(workers=None):
+    """
+    Get the shared compute pool, started on first use and kept for the next builds.
+    Asking for another worker count replaces it.
+
+    Args:
+        workers (int, optional): worker count. Defaults to the number of cores.
+
+    Returns:
+        concurrent.futures.Executor: the pool
+    """
+    workers = workers or os.cpu_count()
+    if _pool["executor"] is not None and _pool["workers"] != workers:
+        shutdownPool()
+    if _pool["executor"] is None:
+        _pool["executor"] = _startPool(workers)
+        _pool["workers"] = workers
+        if not _pool["exit"]:
+            atexit.register(shutdownPool)
+            _pool["exit"] = True
+
+    return _pool["executor"]
+
+
+def shutdownPool():
+    """
+    Stop the shared compute pool workers, the next build starts new ones
+    """
+    executor, _pool["executor"] = _pool["executor"], None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+    return
+
+
+def _picklable(function):
+    try:
+        pickle.dumps(function)
+    except Exception:
+        return False
+
+    return True
+
+
+def _outputNodes(value):
+    """
+    Get the nodes named in instruction outputs, plugs count for their node
+
+    Returns:
+        set: node names
+    """
+    if isinstance(value, str):
+        return {value.split(".")[0]}
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, (list, tuple)):
+        return set().union(*[_outputNodes(item) for item in value])
+
+    return set()
+
+
+def buildPuppet(blueprint, force=False, workers=None, executor=None, optimize=False):
+    """
+    Build a blueprint, re-running only the instructions whose inputs changed since the last build
+    and everything downstream of them. Build state is kept in each instruction "build" key.
+
+    The compute functions of dirty instructions all start at once on a process pool, while the main thread
+    runs the scene edits one instruction at a time in build order, each waiting for its own compute only.
+
+    Args:
+        blueprint (str): blueprint name
+        force (bool, optional): rebuild every instruction. Defaults to False.
+        workers (int, optional): compute processes of the shared pool, see getPool. Defaults to the number of cores.
+        executor (concurrent.futures.Executor, optional): run computes on this executor instead of the shared pool.
+            Scene commands are refused from other threads while it computes in this process. Defaults to None.
+        optimize (bool, optional): simplify the node network of the instructions built, each one on its own,
+            see optimize.optimizeGraph. Defaults to False.
+
+    Returns:
+        dict: {"built": [names], "skipped": [names], "disabled": [names],
+               "times": {name: seconds}, "compute": {name: seconds}, "optimize": optimizeGraph report or None}
+    """
+    instructions = tb.getInstructions(blueprint)
+    graph = BuildGraph(instructions)
+    report = {"built": [], "skipped": [], "disabled": [], "times": {}, "compute": {}, "optimize": None}
+    context = {"blueprint": blueprint, "outputs": {}}
+
+    # PLAN ON THE MAIN THREAD, EVERY HASH IS KNOWN BEFORE ANYTHING IS BUILT
+    hashes = {}
+    plan = []
+    dirty = set()
+    for instruction in graph.order:
+        name = instruction["name"]
+        if not instruction.get("enabled", True):
+            hashes[name] = None
+            report["disabled"].append(name)
+            continue
+
+        hashes[name] = graph.inputHash(instruction, hashes)
+        state = instruction.get("build") or {}
+        nodes = (state.get("outputs") or {}).get("nodes", [])
+        # A REBUILT UPSTREAM INSTRUCTION GIVES NEW OUTPUTS EVEN WHEN ITS INPUT HASH DID NOT CHANGE
+        clean = (not force and state.get("inputHash") == hashes[name] and _exists(nodes)
+                 and not dirty.intersection(graph.upstream(instruction)))
+        if not clean:
+            dirty.add(name)
+        plan.append((instruction, clean))
+
+    computes = [(instruction, getRunner(instruction["type"])[1]) for instruction, clean in plan if not clean]
+    computes = [(instruction, compute) for instruction, compute in computes if compute]
+    pool = (executor or getPool(workers)) if computes else None
+    processes = isinstance(pool, futures.ProcessPoolExecutor)
+    # THREADS SHARE THIS PROCESS SCENE, ONLY THE MAIN THREAD MAY SEND COMMANDS
+    guarded = pool is not None and not processes
+    mainThreadOnly = scene.setMainThreadOnly(True) if guarded else None
+    pending = {}
+    try:
+        for instruction, compute in computes:
+            if processes and not _picklable(compute):
+                continue
+            modules = {module: graph.moduleData(module) for module in graph.modules(instruction)}
+            pending[instruction["name"]] = pool.submit(_compute, compute, instruction, modules)
+
+        for instruction, clean in plan:
+            name = instruction["name"]
+            state = instruction.get("build") or {}
+            nodes = (state.get("outputs") or {}).get("nodes", [])
+
+            # CLEAN AND STILL IN THE SCENE, WITH EVERY UPSTREAM INSTRUCTION SKIPPED TOO
+            if clean and _exists(nodes) and not dirty.intersection(graph.upstream(instruction)):
+                context["outputs"][name] = state["outputs"]
+                report["skipped"].append(name)
+                continue
+
+            # DIRTY, REMOVE WHAT THE PREVIOUS BUILD LEFT
+            dirty.add(name)
+            existing = mc.ls(*nodes) if nodes else []
+            if existing:
+                mc.delete(*existing)
+            instruction.pop("build", None)
+
+            run, compute = getRunner(instruction["type"])
+            args = [instruction, context]
+            if compute:
+                # INSTRUCTIONS WHOSE NODES WERE DELETED DURING THE BUILD ARE COMPUTED HERE
+                future = pending.pop(name, None)
+                modules = {module: graph.moduleData(module) for module in graph.modules(instruction)}
+                try:
+                    computed, elapsed = future.result() if future else _compute(compute, instruction, modules)
+                except futures.BrokenExecutor:
+                    # A WORKER DIED, COMPUTE HERE AND START A NEW POOL NEXT TIME
+                    if pool is _pool["executor"]:
+                        shutdownPool()
+                    computed, elapsed = _compute(compute, instruction, modules)
+                report["compute"][name] = elapsed
+                args.append(computed)
+
+            start = time.perf_counter()
+            outputs = run(*args) or {}
+            report["times"][name] = time.perf_counter() - start
+            instruction["build"] = {"inputHash": hashes[name], "outputs": outputs}
+            context["outputs"][name] = outputs
+            report["built"].append(name)
+
+        if optimize and report["built"]:
+            # SKIPPED INSTRUCTIONS WERE OPTIMIZED WHEN BUILT, THEIR NODES ARE LEFT AS THEY ARE
+            groups = {name: context["outputs"][name].get("nodes", []) for name in report["built"]}
+            # NODES OTHER INSTRUCTIONS MAY BE WIRED TO, "nodes" ONLY LISTS WHAT WAS CREATED
+            roots = _outputNodes([{key: value for key, value in outputs.items() if key != "nodes"}
+                                  for outputs in context["outputs"].values()])
+            report["optimize"] = optimizeGraph(groups, roots)
+            # NODES MERGED OR DELETED AWAY ARE NOT PART OF THE BUILD ANYMORE
+            for name in report["built"]:
+                outputs = context["outputs"][name]
+                if outputs.get("nodes"):
+                    outputs["nodes"] = [node for node in outputs["nodes"] if mc.objExists(node)]
+    finally:
+        for future in pending.values():
+            future.cancel()
+        if guarded:
+            scene.setMainThreadOnly(mainThreadOnly)
+        tb.setInstructions(blueprint, instructions)
+
+    return report
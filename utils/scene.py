@@ -0,0 +1,1335 @@
+import fnmatch, itertools, json, re, sys, threading
+
+try:
+    import maya.cmds as _mc
+    import maya.mel as _mm
+    import maya.api.OpenMaya as om2
+    from . import undo
+except ImportError:
+    # HEADLESS: ONLY THE IN-MEMORY SCENE IS AVAILABLE
+    _mc = _mm = om2 = undo = None
+
+
+'''               '''
+''' BACKEND SETUP '''
+'''               '''
+
+_backend = None
+
+
+def getBackend():
+    """
+    Get the scene backend every toolbox command goes through.
+    Defaults to the Maya session when Maya is available, an empty in-memory scene otherwise.
+
+    Returns:
+        MayaScene, MemoryScene: current backend
+    """
+    global _backend
+    if _backend is None:
+        _backend = MayaScene() if _mc else MemoryScene()
+
+    return _backend
+
+
+def setBackend(backend):
+    """
+    Set the scene backend every toolbox command goes through
+
+    Args:
+        backend (MayaScene, MemoryScene): the new backend
+
+    Returns:
+        MayaScene, MemoryScene: the previous backend
+    """
+    global _backend
+    previous = _backend
+    _backend = backend
+
+    return previous
+
+
+class _Commands(object):
+    """
+    maya.cmds look-alike forwarding every command to the current backend
+    """
+
+    def __getattr__(self, name):
+        return getattr(getBackend(), name)
+
+
+class _MainThreadCommands(_Commands):
+    """
+    Commands proxy refusing commands sent from other threads, see setMainThreadOnly
+    """
+
+    def __getattr__(self, name):
+        if threading.current_thread() is not _mainThread:
+            raise RuntimeError(f"Scene command {name} sent from {threading.current_thread().name}, "
+                               "scene commands only run on the main thread")
+
+        return getattr(getBackend(), name)
+
+_mainThread = threading.main_thread()
+cmds = _Commands()
+
+
+def setMainThreadOnly(value):
+    """
+    Refuse scene commands sent from other threads, for as long as code of this process computes on threads.
+    Commands are only checked while it is on.
+
+    Args:
+        value (bool): refuse commands from other threads
+
+    Returns:
+        bool: the previous setting
+    """
+    previous = isinstance(cmds, _MainThreadCommands)
+    cmds.__class__ = _MainThreadCommands if value else _Commands
+
+    return previous
+
+
+IDENTITY = (1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0)
+
+
+def multiplyMatrices(a, b):
+    """
+    Multiply two row-major 4x4 matrices given as 16 floats, like Maya does: a * b
+
+    Returns:
+        list: 16 floats
+    """
+    return [a[r*4]*b[c] + a[r*4+1]*b[4+c] + a[r*4+2]*b[8+c] + a[r*4+3]*b[12+c] for r in range(4) for c in range(4)]
+
+
+def inverseMatrix(m):
+    """
+    Invert an affine row-major 4x4 matrix given as 16 floats
+
+    Returns:
+        list: 16 floats
+    """
+    a, b, c = m[0:3]
+    d, e, f = m[4:7]
+    g, h, i = m[8:11]
+    det = a*(e*i - f*h) - b*(d*i - f*g) + c*(d*h - e*g)
+    r = [(e*i - f*h)/det, (c*h - b*i)/det, (b*f - c*e)/det,
+         (f*g - d*i)/det, (a*i - c*g)/det, (c*d - a*f)/det,
+         (d*h - e*g)/det, (b*g - a*h)/det, (a*e - b*d)/det]
+    tx, ty, tz = m[12:15]
+    t = [-(tx*r[0] + ty*r[3] + tz*r[6]), -(tx*r[1] + ty*r[4] + tz*r[7]), -(tx*r[2] + ty*r[5] + tz*r[8])]
+
+    return [r[0], r[1], r[2], 0.0, r[3], r[4], r[5], 0.0, r[6], r[7], r[8], 0.0, t[0], t[1], t[2], 1.0]
+
+
+def _flag(kwargs, short, long, default=None):
+    """
+    Get a command flag given either with its short or long name
+
+    Args:
+        kwargs (dict): command flags
+        short (str): flag short name
+        long (str): flag long name
+        default (any, optional): value if the flag is not given. Defaults to None.
+
+    Returns:
+        any: flag value
+    """
+    if short in kwargs:
+        return kwargs[short]
+
+    return kwargs.get(long, default)
+
+
+'''            '''
+''' MAYA SCENE '''
+'''            '''
+
+class MayaScene(object):
+    """
+    Scene backend running in the current Maya session.
+    Anything not defined here is forwarded to maya.cmds.
+    """
+
+    def __init__(self):
+        if not _mc:
+            raise RuntimeError("Maya is not available")
+
+        self._numericTypes = {
+            "bool": om2.MFnNumericData.kBoolean,
+            "float": om2.MFnNumericData.kDouble,
+            "int": om2.MFnNumericData.kInt,
+        }
+
+    def __getattr__(self, name):
+        return getattr(_mc, name)
+
+    def echo(self, text):
+        """
+        Print given text in mel so that is visible in Maya's log bar
+
+        Args:
+            text (str): the text to print
+        """
+        _mm.eval(f'print "{text}"')
+
+        return
+
+    def _createAttribute(self, attr, spec):
+        """
+        Create the MObject of a new attribute from its description
+
+        Args:
+            attr (str): attribute name
+            spec (dict): attribute description, see toolbox.attrSpec
+
+        Returns:
+            om2.MObject: the attribute, ready to be added to a node
+        """
+        kind = spec["type"]
+        value = spec.get("value")
+
+        if kind in self._numericTypes:
+            fn = om2.MFnNumericAttribute()
+            default = value if value is not None else 0
+            ret = fn.create(attr, attr, self._numericTypes[kind], default)
+            if spec.get("min") is not None:
+                fn.setMin(spec["min"])
+            if spec.get("max") is not None:
+                fn.setMax(spec["max"])
+        elif kind == "string":
+            fn = om2.MFnTypedAttribute()
+            ret = fn.create(attr, attr, om2.MFnData.kString)
+        elif kind == "enum":
+            fn = om2.MFnEnumAttribute()
+            ret = fn.create(attr, attr, value or 0)
+            cases = spec["cases"]
+            if isinstance(cases, str):
+                cases = cases.split(":")
+            for i, case in enumerate(cases):
+                fn.addField(case, i)
+        elif kind == "vector":
+            fn = om2.MFnNumericAttribute()
+            children = []
+            for ax in "XYZ":
+                children.append(fn.create(attr+ax, attr+ax, om2.MFnNumericData.kDouble, 0))
+                fn.keyable = spec.get("keyable", True)
+                fn.channelBox = spec.get("channelbox", True)
+            ret = fn.create(attr, attr, *children)
+        else:
+            raise ValueError(f"Unknown attribute type: {kind}")
+
+        # SETTINGS
+        fn.keyable = spec.get("keyable", True)
+        fn.channelBox = spec.get("channelbox", True)
+
+        return ret
+
+    def addAttributes(self, specs):
+        """
+        Add many attributes through one om2.MDGModifier, recorded as a single undo step
+
+        Args:
+            specs (list): attribute descriptions, see toolbox.attrSpec
+
+        Returns:
+            list: full attribute names, in the same order as specs
+        """
+        ret = []
+        modifier = om2.MDGModifier()
+        nodes = {}
+        added = []
+        queued = set()
+
+        for spec in specs:
+            obj = spec["obj"]
+            attr = spec["attr"].replace(' ','_')
+            fullName = f"{obj}.{attr}"
+            ret.append(fullName)
+
+            # GET NODE ONCE PER OBJECT
+            if obj not in nodes:
+                selection = om2.MSelectionList()
+                selection.add(obj)
+                nodes[obj] = om2.MFnDependencyNode(selection.getDependNode(0))
+            node = nodes[obj]
+
+            # IF ATTRIBUTE ALREADY EXISTS, SKIP IT
+            if node.hasAttribute(attr) or fullName in queued:
+                continue
+            queued.add(fullName)
+
+            modifier.addAttribute(node.object(), self._createAttribute(attr, spec))
+            added.append((fullName, node, attr, spec))
+
+        if not added:
+            return ret
+
+        # ADD ATTRIBUTES
+        modifier.doIt()
+        self._setAttributeValues(modifier, added)
+        modifier.doIt()
+
+        # SINGLE UNDO STEP
+        undo.record(modifier)
+
+        return ret
+
+    def _setAttributeValues(self, modifier, added):
+        """
+        Queue the values and locks of new attributes, they need the attributes to exist
+
+        Args:
+            modifier (om2.MDGModifier): modifier the attributes were added with
+            added (list): [(full name, om2.MFnDependencyNode, attribute name, spec)]
+        """
+        for fullName, node, attr, spec in added:
+            if spec["type"] == "string" and spec.get("value"):
+                modifier.newPlugValueString(node.findPlug(attr, False), spec["value"])
+            if spec["type"] == "vector" and spec.get("value"):
+                plug = node.findPlug(attr, False)
+                for i, value in enumerate(spec["value"]):
+                    modifier.newPlugValueDouble(plug.child(i), value)
+            if spec.get("locked"):
+                plugs = [fullName]
+                if spec["type"] == "vector":
+                    plugs += [fullName+ax for ax in "XYZ"]
+                for plug in plugs:
+                    modifier.commandToExecute(f'setAttr -lock 1 "{plug}"')
+
+        return
+
+    def createNodes(self, nodes):
+        """
+        Create many DAG nodes with their parenting, local matrices and attributes through one om2.MDagModifier,
+        recorded as a single undo step
+
+        Args:
+            nodes (list): node descriptions {"type", "name", "parent", "matrix", "attributes", "connections"}.
+                "parent" is an existing node name or the index of a description before in the list, None for the world.
+                "matrix" is an optional local matrix as 16 floats, "attributes" optional attrSpec without "obj",
+                "connections" optional {attribute: source plug} of existing plugs driving the node.
+
+        Returns:
+            list: full names of the created nodes, in the same order as nodes
+        """
+        modifier = om2.MDagModifier()
+        objects = []
+        parents = {}
+        for node in nodes:
+            parent = node.get("parent")
+            if isinstance(parent, int):
+                parentObj = objects[parent]
+            elif parent:
+                if parent not in parents:
+                    selection = om2.MSelectionList()
+                    selection.add(parent)
+                    parents[parent] = selection.getDependNode(0)
+                parentObj = parents[parent]
+            else:
+                parentObj = om2.MObject.kNullObj
+            obj = modifier.createNode(node["type"], parentObj)
+            modifier.renameNode(obj, node["name"])
+            objects.append(obj)
+
+        # CREATE AND PARENT EVERYTHING
+        modifier.doIt()
+
+        added = []
+        for node, obj in zip(nodes, objects):
+            fn = om2.MFnDependencyNode(obj)
+            for spec in node.get("attributes") or []:
+                attr = spec["attr"].replace(' ','_')
+                modifier.addAttribute(obj, self._createAttribute(attr, spec))
+                added.append((f"{fn.name()}.{attr}", fn, attr, spec))
+            if node.get("matrix"):
+                transformation = om2.MTransformationMatrix(om2.MMatrix(node["matrix"]))
+                plugs = {"translate": transformation.translation(om2.MSpace.kTransform),
+                         "scale": transformation.scale(om2.MSpace.kTransform),
+                         "shear": transformation.shear(om2.MSpace.kTransform)}
+                for name, values in plugs.items():
+                    plug = fn.findPlug(name, False)
+                    for i, value in enumerate(values):
+                        modifier.newPlugValueDouble(plug.child(i), value)
+                rotation = transformation.rotation()
+                rotation.reorderIt(fn.findPlug("rotateOrder", False).asInt())
+                plug = fn.findPlug("rotate", False)
+                for i, value in enumerate((rotation.x, rotation.y, rotation.z)):
+                    modifier.newPlugValueMAngle(plug.child(i), om2.MAngle(value))
+
+        # ATTRIBUTES AND TRANSFORMS
+        modifier.doIt()
+
+        # VALUES AND CONNECTIONS NEED THE ATTRIBUTES TO EXIST
+        sources = {}
+        self._setAttributeValues(modifier, added)
+        for node, obj in zip(nodes, objects):
+            fn = om2.MFnDependencyNode(obj)
+            for attr, source in (node.get("connections") or {}).items():
+                if source not in sources:
+                    selection = om2.MSelectionList()
+                    selection.add(source)
+                    sources[source] = selection.getPlug(0)
+                modifier.connect(sources[source], fn.findPlug(attr, False))
+        modifier.doIt()
+
+        # SINGLE UNDO STEP
+        undo.record(modifier)
+
+        return [om2.MDagPath.getAPathTo(obj).fullPathName() for obj in objects]
+
+    def getAttributes(self, node):
+        """
+        Describe the dynamic attributes of a node, the opposite of addAttributes
+
+        Args:
+            node (str): node name
+
+        Returns:
+            list: attribute descriptions, see toolbox.attrSpec. Values are the current ones.
+        """
+        fn = om2.MFnDependencyNode(self.getHandle(node).object())
+        ret = []
+        for i in range(fn.attributeCount()):
+            attr = fn.attribute(i)
+            attrFn = om2.MFnAttribute(attr)
+            if not attrFn.dynamic or not attrFn.parent.isNull():
+                continue
+
+            plug = fn.findPlug(attr, False)
+            spec = {"attr": attrFn.name, "obj": node, "keyable": attrFn.keyable,
+                    "channelbox": attrFn.channelBox, "locked": plug.isLocked}
+            if attr.hasFn(om2.MFn.kEnumAttribute):
+                enumFn = om2.MFnEnumAttribute(attr)
+                cases = [enumFn.fieldName(v) for v in range(enumFn.getMin(), enumFn.getMax()+1)]
+                spec.update(type="enum", value=plug.asShort(), cases=cases)
+            elif attr.hasFn(om2.MFn.kTypedAttribute):
+                if om2.MFnTypedAttribute(attr).attrType() != om2.MFnData.kString:
+                    continue
+                spec.update(type="string", value=plug.asString())
+            elif attr.hasFn(om2.MFn.kNumericAttribute):
+                numericFn = om2.MFnNumericAttribute(attr)
+                numericType = numericFn.numericType()
+                if numericType == om2.MFnNumericData.k3Double:
+                    spec.update(type="vector", value=[plug.child(j).asDouble() for j in range(3)])
+                elif numericType == om2.MFnNumericData.kBoolean:
+                    spec.update(type="bool", value=plug.asBool())
+                elif numericType in (om2.MFnNumericData.kInt, om2.MFnNumericData.kShort, om2.MFnNumericData.kByte):
+                    spec.update(type="int", value=plug.asInt())
+                else:
+                    spec.update(type="float", value=plug.asDouble())
+                if spec["type"] in ("int", "float"):
+                    if numericFn.hasMin():
+                        spec["min"] = numericFn.getMin()
+                    if numericFn.hasMax():
+                        spec["max"] = numericFn.getMax()
+            else:
+                continue
+            ret.append(spec)
+
+        return ret
+
+    def _dagPaths(self, nodes):
+        selection = om2.MSelectionList()
+        for node in nodes:
+            selection.add(node)
+
+        return [selection.getDagPath(i) for i in range(selection.length())]
+
+    def getMatrices(self, nodes, worldSpace=True):
+        """
+        Get the matrices of many transforms at once
+
+        Args:
+            nodes (list): transform names
+            worldSpace (bool, optional): world or local matrices. Defaults to True.
+
+        Returns:
+            list: one list of 16 floats per node
+        """
+        ret = []
+        for path in self._dagPaths(nodes):
+            if worldSpace:
+                matrix = path.inclusiveMatrix()
+            else:
+                matrix = om2.MFnTransform(path).transformation().asMatrix()
+            ret.append(list(matrix))
+
+        return ret
+
+    def setMatrices(self, nodes, matrices, worldSpace=True):
+        """
+        Set the matrices of many transforms at once, as a single undo step.
+        Nodes are set in order, parents should come before their children.
+
+        Args:
+            nodes (list): transform names
+            matrices (list): one list of 16 floats per node
+            worldSpace (bool, optional): world or local matrices. Defaults to True.
+        """
+        edit = _TransformEdit()
+        for path, values in zip(self._dagPaths(nodes), matrices):
+            matrix = om2.MMatrix(values)
+            if worldSpace:
+                matrix = matrix * path.exclusiveMatrixInverse()
+            edit.set(om2.MFnTransform(path), om2.MTransformationMatrix(matrix))
+        undo.record(edit)
+
+        return
+
+    '''                     '''
+    ''' HANDLES AND EVENTS '''
+    '''                     '''
+
+    def getHandle(self, node):
+        """
+        Get a persistent handle on given node, following renames and reparenting
+
+        Args:
+            node (str): node name
+
+        Returns:
+            om2.MObjectHandle: the handle
+        """
+        selection = om2.MSelectionList()
+        selection.add(node)
+
+        return om2.MObjectHandle(selection.getDependNode(0))
+
+    def resolveHandle(self, handle):
+        """
+        Get the current name of a node from its handle
+
+        Args:
+            handle (om2.MObjectHandle): the handle
+
+        Returns:
+            str: long name, None if the node doesn't exist anymore
+        """
+        if not handle.isValid():
+            return None
+        node = handle.object()
+        if node.hasFn(om2.MFn.kDagNode):
+            return om2.MFnDagNode(node).fullPathName()
+
+        return om2.MFnDependencyNode(node).name()
+
+    def addNodeCallback(self, node, callback):
+        """
+        Call given function when a node is renamed or deleted
+
+        Args:
+            node (str): node name
+            callback (function): called with ("renamed", newName, oldName) or ("deleted", name)
+
+        Returns:
+            list: callback ids
+        """
+        obj = self.getHandle(node).object()
+
+        def renamed(obj, oldName, *args):
+            callback("renamed", om2.MFnDependencyNode(obj).name(), oldName)
+
+        def deleted(obj, *args):
+            callback("deleted", om2.MFnDependencyNode(obj).name())
+
+        return [om2.MNodeMessage.addNameChangedCallback(obj, renamed),
+                om2.MNodeMessage.addNodeAboutToDeleteCallback(obj, deleted)]
+
+    def addChildCallback(self, node, callback):
+        """
+        Call given function when a child is parented under or removed from a node
+
+        Args:
+            node (str): parent node name
+            callback (function): called with ("childAdded", childName) or ("childRemoved", childName)
+
+        Returns:
+            list: callback ids
+        """
+        selection = om2.MSelectionList()
+        selection.add(node)
+        path = selection.getDagPath(0)
+
+        def added(child, parent, *args):
+            callback("childAdded", child.partialPathName().split("|")[-1])
+
+        def removed(child, parent, *args):
+            callback("childRemoved", child.partialPathName().split("|")[-1])
+
+        return [om2.MDagMessage.addChildAddedDagPathCallback(path, added),
+                om2.MDagMessage.addChildRemovedDagPathCallback(path, removed)]
+
+    def addAttributeCallback(self, node, callback):
+        """
+        Call given function when an attribute value of a node is set
+
+        Args:
+            node (str): node name
+            callback (function): called with ("attributeChanged", nodeName, attributeName)
+
+        Returns:
+            list: callback ids
+        """
+        obj = self.getHandle(node).object()
+
+        def changed(message, plug, otherPlug, *args):
+            if message & om2.MNodeMessage.kAttributeSet:
+                callback("attributeChanged", om2.MFnDependencyNode(plug.node()).name(), plug.partialName(useLongNames=True))
+
+        return [om2.MNodeMessage.addAttributeChangedCallback(obj, changed)]
+
+    def addSceneCallback(self, callback):
+        """
+        Call given function when a new scene is created or a scene is opened
+
+        Args:
+            callback (function): called with "new" or "opened"
+
+        Returns:
+            list: callback ids
+        """
+        return [om2.MSceneMessage.addCallback(om2.MSceneMessage.kAfterNew, lambda *args: callback("new")),
+                om2.MSceneMessage.addCallback(om2.MSceneMessage.kAfterOpen, lambda *args: callback("opened"))]
+
+    def removeCallbacks(self, ids):
+        """
+        Remove callbacks added with add*Callback
+
+        Args:
+            ids (list): callback ids
+        """
+        for id in ids:
+            om2.MMessage.removeCallback(id)
+
+        return
+
+
+'''              '''
+''' MEMORY SCENE '''
+'''              '''
+
+class _TransformEdit(object):
+    """
+    Undoable batch of transformation changes, applied as they are added
+    """
+
+    def __init__(self):
+        self._edits = []
+
+    def set(self, fn, transformation):
+        self._edits.append((fn, fn.transformation(), transformation))
+        fn.setTransformation(transformation)
+
+    def doIt(self):
+        for fn, old, new in self._edits:
+            fn.setTransformation(new)
+
+    def undoIt(self):
+        for fn, old, new in reversed(self._edits):
+            fn.setTransformation(old)
+
+
+class _Node(object):
+    __slots__ = ("name", "type", "parent", "children", "attrs", "matrix")
+
+    def __init__(self, name, type, parent=None):
+        self.name = name
+        self.type = type
+        self.parent = parent
+        self.children = []
+        self.attrs = {}
+        self.matrix = IDENTITY
+
+    def worldMatrix(self):
+        matrix = self.matrix
+        node = self.parent
+        while node:
+            matrix = multiplyMatrices(matrix, node.matrix)
+            node = node.parent
+
+        return matrix
+
+    def longName(self):
+        names = []
+        node = self
+        while node:
+            names.append(node.name)
+            node = node.parent
+
+        return "|" + "|".join(reversed(names))
+
+
+class MemoryScene(object):
+    """
+    Pure Python stand-in for a Maya scene: a DAG of named nodes holding dynamic attributes.
+    It implements the subset of maya.cmds the toolbox relies on, with the same flags and return values,
+    so that Geppetto can run and be measured without a Maya session.
+    """
+
+    _ATTR_TYPES = {"bool": "bool", "float": "double", "int": "long", "string": "string", "enum": "enum", "vector": "double3"}
+
+    def __init__(self):
+        self._nodes = {}
+        self._roots = []
+        self._callbacks = {}
+        self._listeners = {}
+        self._callbackIds = itertools.count(1)
+        self._selection = []
+        # CONNECTIONS BY SOURCE NODE: {node: {(destination node, attribute)}}
+        self._outputs = {}
+        self._sceneName = ""
+        self._state = {"undo": True, "chunks": 0, "autoKey": False, "suspend": False}
+
+    '''       '''
+    ''' NODES '''
+    '''       '''
+
+    def _findAll(self, name):
+        """
+        Get every node matching given short, partial or long name
+
+        Args:
+            name (str): node name
+
+        Returns:
+            list: matching nodes
+        """
+        path = name.strip("|").split("|")
+        nodes = self._nodes.get(path[-1], [])
+        if name.startswith("|"):
+            nodes = [node for node in nodes if node.longName() == name]
+        elif len(path) > 1:
+            suffix = "|" + name
+            nodes = [node for node in nodes if node.longName().endswith(suffix)]
+
+        return nodes
+
+    def _find(self, name):
+        """
+        Get the node matching given short, partial or long name
+
+        Args:
+            name (str): node name
+
+        Returns:
+            _Node: the node, None if it doesn't exist
+        """
+        nodes = self._findAll(name)
+        if len(nodes) > 1:
+            raise ValueError(f"More than one object matches name: {name}")
+
+        return nodes[0] if nodes else None
+
+    def _get(self, name):
+        """
+        Get the node matching given name or raise like maya.cmds does
+
+        Args:
+            name (str): node name
+
+        Returns:
+            _Node: the node
+        """
+        node = self._find(name)
+        if node is None:
+            raise ValueError(f"No object matches name: {name}")
+
+        return node
+
+    def _plug(self, plug):
+        """
+        Get node and attribute record of given plug
+
+        Args:
+            plug (str): "node.attribute"
+
+        Returns:
+            list: [_Node, dict]
+        """
+        name, attr = plug.rsplit(".", 1)
+        node = self._get(name)
+        if attr not in node.attrs:
+            raise ValueError(f"No object matches name: {plug}")
+
+        return node, node.attrs[attr]
+
+    def _uniqueName(self, name):
+        """
+        Get a name no other node uses, incrementing its trailing number if needed
+
+        Args:
+            name (str): wanted name
+
+        Returns:
+            str: free name
+        """
+        if name not in self._nodes:
+            return name
+
+        base = re.sub(r"\d+$", "", name)
+        i = 1
+        while f"{base}{i}" in self._nodes:
+            i += 1
+
+        return f"{base}{i}"
+
+    def _register(self, node):
+        self._nodes.setdefault(node.name, []).append(node)
+
+    def _unregister(self, node):
+        nodes = self._nodes[node.name]
+        nodes.remove(node)
+        if not nodes:
+            del self._nodes[node.name]
+
+    def _setParent(self, node, parent):
+        siblings = node.parent.children if node.parent else self._roots
+        siblings.remove(node)
+        if node.parent:
+            self._notify((node.parent, "child"), "childRemoved", node.name)
+        node.parent = parent
+        (parent.children if parent else self._roots).append(node)
+        if parent:
+            self._notify((parent, "child"), "childAdded", node.name)
+
+    def _iterNodes(self, nodes=None):
+        for node in (self._roots if nodes is None else nodes):
+            yield node
+            yield from self._iterNodes(node.children)
+
+    def _returnName(self, node, long):
+        return node.longName() if long else node.name
+
+    def createNode(self, type, n=None, name=None, p=None, parent=None, **kwargs):
+        parentNode = p or parent
+        parentNode = self._get(parentNode) if parentNode else None
+        node = _Node(self._uniqueName(n or name or f"{type}1"), type, parentNode)
+        (parentNode.children if parentNode else self._roots).append(node)
+        self._register(node)
+        if parentNode:
+            self._notify((parentNode, "child"), "childAdded", node.name)
+
+        return node.name
+
+    def createNodes(self, nodes):
+        """
+        Create many DAG nodes with their parenting, local matrices and attributes, mirroring MayaScene.createNodes
+
+        Args:
+            nodes (list): node descriptions {"type", "name", "parent", "matrix", "attributes", "connections"}
+
+        Returns:
+            list: full names of the created nodes, in the same order as nodes
+        """
+        created = []
+        specs = []
+        for node in nodes:
+            parent = node.get("parent")
+            parent = created[parent] if isinstance(parent, int) else self._get(parent) if parent else None
+            name = self.createNode(node["type"], n=node["name"], p=parent and parent.longName())
+            created.append(self._get(parent.longName() + "|" + name if parent else "|" + name))
+            if node.get("matrix"):
+                created[-1].matrix = tuple(node["matrix"])
+            specs += [dict(spec, obj=created[-1].longName()) for spec in node.get("attributes") or []]
+        self.addAttributes(specs)
+        for node, description in zip(created, nodes):
+            for attr, source in (description.get("connections") or {}).items():
+                self.connectAttr(source, f"{node.longName()}.{attr}")
+
+        return [node.longName() for node in created]
+
+    def group(self, *objs, **kwargs):
+        name = self.createNode("transform", n=_flag(kwargs, "n", "name", "group1"), p=_flag(kwargs, "p", "parent"))
+        if objs and not _flag(kwargs, "em", "empty", False):
+            self.parent(*objs, name)
+
+        return name
+
+    def parent(self, *objs, **kwargs):
+        nodes = [self._get(obj) for obj in objs]
+        if _flag(kwargs, "w", "world", False):
+            parent = None
+        else:
+            nodes, parent = nodes[:-1], nodes[-1]
+        for node in nodes:
+            if node.parent is not parent:
+                self._setParent(node, parent)
+
+        return [node.name for node in nodes]
+
+    def delete(self, *objs, **kwargs):
+        for obj in objs:
+            node = self._get(obj)
+            for child in list(self._iterNodes([node])):
+                self._notify((child, "node"), "deleted", child.name)
+                self._disconnectAll(child)
+                self._unregister(child)
+                if child in self._selection:
+                    self._selection.remove(child)
+            (node.parent.children if node.parent else self._roots).remove(node)
+            if node.parent:
+                self._notify((node.parent, "child"), "childRemoved", node.name)
+
+        return
+
+    def rename(self, obj, newName, **kwargs):
+        node = self._get(obj)
+        oldName = node.name
+        self._unregister(node)
+        node.name = self._uniqueName(newName)
+        self._register(node)
+        self._notify((node, "node"), "renamed", node.name, oldName)
+
+        return node.name
+
+    def file(self, *args, **kwargs):
+        """
+        New, rename, save, open and scene name query, with the maya.cmds.file flags.
+        Scenes are written as JSON whatever the type flag says, only a MemoryScene opens them back.
+        """
+        if _flag(kwargs, "q", "query", False):
+            if _flag(kwargs, "sn", "sceneName", False):
+                return self._sceneName
+            raise ValueError(f"Unsupported file query: {sorted(kwargs)}")
+
+        if _flag(kwargs, "new", "newFile", False):
+            self._clear()
+            self._sceneName = ""
+            self._notify((None, "scene"), "new")
+            return ""
+
+        if _flag(kwargs, "rn", "rename"):
+            self._sceneName = _flag(kwargs, "rn", "rename")
+            return self._sceneName
+
+        if _flag(kwargs, "s", "save", False):
+            if not self._sceneName:
+                raise RuntimeError("The scene has no name, rename it before saving.")
+            with open(self._sceneName, "w") as f:
+                json.dump(self._serialize(), f)
+            return self._sceneName
+
+        if _flag(kwargs, "o", "open", False):
+            with open(args[0]) as f:
+                data = json.load(f)
+            self._clear()
+            self._deserialize(data)
+            self._sceneName = args[0]
+            self._notify((None, "scene"), "opened")
+            return args[0]
+
+        raise ValueError(f"Unsupported file flags: {sorted(kwargs)}")
+
+    def _clear(self):
+        self._nodes.clear()
+        self._roots.clear()
+        self._selection.clear()
+        self._outputs.clear()
+
+    def _serialize(self):
+        """
+        Returns:
+            dict: {"nodes": [{"name", "type", "parent", "matrix", "attrs"}]}, parents before their children,
+                nodes referenced by their index
+        """
+        nodes = list(self._iterNodes())
+        index = {node: i for i, node in enumerate(nodes)}
+        ret = []
+        for node in nodes:
+            attrs = {attr: dict(record, source=[index[record["source"][0]], record["source"][1]] if record["source"] else None)
+                     for attr, record in node.attrs.items()}
+            ret.append({"name": node.name, "type": node.type, "parent": index[node.parent] if node.parent else None,
+                        "matrix": list(node.matrix), "attrs": attrs})
+
+        return {"nodes": ret}
+
+    def _deserialize(self, data):
+        nodes = []
+        for entry in data["nodes"]:
+            parent = nodes[entry["parent"]] if entry["parent"] is not None else None
+            node = _Node(entry["name"], entry["type"], parent)
+            node.matrix = tuple(entry["matrix"])
+            node.attrs = entry["attrs"]
+            (parent.children if parent else self._roots).append(node)
+            self._register(node)
+            nodes.append(node)
+        for node in nodes:
+            for attr, record in node.attrs.items():
+                if record["source"]:
+                    source = nodes[record["source"][0]]
+                    record["source"] = (source, record["source"][1])
+                    self._outputs.setdefault(source, set()).add((node, attr))
+
+    def objExists(self, name):
+        if "." in name:
+            name, attr = name.rsplit(".", 1)
+            return any(attr in node.attrs for node in self._findAll(name))
+
+        return bool(self._findAll(name))
+
+    def nodeType(self, obj, **kwargs):
+        return self._get(obj).type
+
+    def ls(self, *names, **kwargs):
+        long = _flag(kwargs, "l", "long", False)
+        type = _flag(kwargs, "type", "typ")
+        if _flag(kwargs, "sl", "selection", False):
+            nodes = list(self._selection)
+        elif not names:
+            nodes = list(self._iterNodes())
+        else:
+            nodes = []
+            for name in names:
+                if "*" in name or "?" in name:
+                    nodes += [node for node in self._iterNodes() if fnmatch.fnmatchcase(node.name, name)]
+                else:
+                    nodes += self._findAll(name)
+        if type:
+            nodes = [node for node in nodes if node.type == type]
+
+        return [self._returnName(node, long) for node in nodes]
+
+    def select(self, *objs, **kwargs):
+        if _flag(kwargs, "cl", "clear", False):
+            self._selection = []
+            return
+        nodes = [self._get(obj) for obj in objs]
+        if not _flag(kwargs, "add", "add", False):
+            self._selection = []
+        self._selection += [node for node in nodes if node not in self._selection]
+
+        return
+
+    def listRelatives(self, obj=None, **kwargs):
+        node = self._get(obj)
+        long = _flag(kwargs, "f", "fullPath", False)
+        type = _flag(kwargs, "type", "typ")
+        if _flag(kwargs, "p", "parent", False):
+            nodes = [node.parent] if node.parent else []
+        elif _flag(kwargs, "ad", "allDescendents", False):
+            nodes = list(self._iterNodes(node.children))[::-1]
+        else:
+            nodes = list(node.children)
+        if type:
+            nodes = [node for node in nodes if node.type == type]
+        if not nodes:
+            return None
+
+        return [self._returnName(node, long) for node in nodes]
+
+    '''            '''
+    ''' ATTRIBUTES '''
+    '''            '''
+
+    def _addAttribute(self, node, attr, type, value=None, min=None, max=None, cases=None, parent=None):
+        if attr in node.attrs:
+            raise RuntimeError(f"Found a matching attribute named {attr} on {node.name}")
+        if value is None:
+            value = "" if type == "string" else 0
+        node.attrs[attr] = {"type": type, "value": value, "min": min, "max": max, "cases": cases, "parent": parent,
+                            "children": [], "keyable": False, "locked": False, "channelbox": False, "source": None}
+        if parent:
+            node.attrs[parent]["children"].append(attr)
+
+        return node.attrs[attr]
+
+    def addAttr(self, obj, **kwargs):
+        if _flag(kwargs, "e", "edit", False):
+            node, record = self._plug(obj)
+            for short, long in [("min", "minValue"), ("max", "maxValue")]:
+                value = _flag(kwargs, short, long)
+                if value is not None:
+                    record[short] = value
+            return
+
+        node = self._get(obj)
+        type = _flag(kwargs, "at", "attributeType") or _flag(kwargs, "dt", "dataType")
+        record = self._addAttribute(node, _flag(kwargs, "ln", "longName"), type, value=_flag(kwargs, "dv", "defaultValue"),
+                                    min=_flag(kwargs, "min", "minValue"), max=_flag(kwargs, "max", "maxValue"),
+                                    cases=_flag(kwargs, "en", "enumName"), parent=_flag(kwargs, "p", "parent"))
+        record["keyable"] = _flag(kwargs, "k", "keyable", False)
+
+        return
+
+    def setAttr(self, plug, *values, **kwargs):
+        node, record = self._plug(plug)
+        if _flag(kwargs, "e", "edit", False):
+            for short, long, key in [("k", "keyable", "keyable"), ("l", "lock", "locked"), ("cb", "channelBox", "channelbox")]:
+                value = _flag(kwargs, short, long)
+                if value is not None:
+                    record[key] = bool(value)
+            return
+
+        lock = _flag(kwargs, "l", "lock")
+        if values:
+            if record["locked"] or record["source"]:
+                raise RuntimeError(f"The attribute '{plug}' is locked or connected and cannot be modified.")
+            if record["children"]:
+                for child, value in zip(record["children"], values):
+                    node.attrs[child]["value"] = value
+            else:
+                record["value"] = values[0]
+            self._notify((node, "attr"), "attributeChanged", node.name, plug.rsplit(".", 1)[1])
+        if lock is not None:
+            record["locked"] = bool(lock)
+
+        return
+
+    def getAttr(self, plug, **kwargs):
+        node, record = self._plug(plug)
+        if _flag(kwargs, "l", "lock", False):
+            return record["locked"]
+        if _flag(kwargs, "k", "keyable", False):
+            return record["keyable"]
+        if _flag(kwargs, "cb", "channelBox", False):
+            return record["channelbox"]
+        if record["source"]:
+            source, attr = record["source"]
+            return self.getAttr(f"{source.longName()}.{attr}")
+        if record["children"]:
+            # CHILDREN MAY BE CONNECTED ONE BY ONE
+            return [tuple(self.getAttr(f"{node.longName()}.{child}") for child in record["children"])]
+
+        return record["value"]
+
+    def connectAttr(self, source, destination, **kwargs):
+        sourceNode, record = self._plug(source)
+        name, attr = destination.rsplit(".", 1)
+        node = self._get(name)
+        # STATIC ATTRIBUTES, LIKE JOINT RADIUS, ARE ONLY MODELED ONCE CONNECTED
+        if attr not in node.attrs:
+            self._addAttribute(node, attr, "static")
+        previous = node.attrs[attr]["source"]
+        if previous:
+            self._outputs[previous[0]].discard((node, attr))
+        node.attrs[attr]["source"] = (sourceNode, source.rsplit(".", 1)[1])
+        self._outputs.setdefault(sourceNode, set()).add((node, attr))
+
+        return
+
+    def disconnectAttr(self, source, destination, **kwargs):
+        node, record = self._plug(destination)
+        if record["source"]:
+            self._outputs[record["source"][0]].discard((node, destination.rsplit(".", 1)[1]))
+            record["source"] = None
+
+        return
+
+    def _disconnectAll(self, node):
+        for attr, record in node.attrs.items():
+            if record["source"]:
+                self._outputs[record["source"][0]].discard((node, attr))
+        for destination, attr in self._outputs.pop(node, ()):
+            destination.attrs[attr]["source"] = None
+
+    def listConnections(self, obj, **kwargs):
+        name, attr = obj.rsplit(".", 1) if "." in obj else (obj, None)
+        node = self._get(name)
+        plugs = _flag(kwargs, "p", "plugs", False)
+        pairs = []
+        if _flag(kwargs, "s", "source", True):
+            pairs += [(own, source, sourceAttr) for own, record in node.attrs.items() if record["source"]
+                      for source, sourceAttr in [record["source"]]]
+        if _flag(kwargs, "d", "destination", True):
+            pairs += sorted(((own, destination, destinationAttr) for destination, destinationAttr in
+                             self._outputs.get(node, ()) for own in [destination.attrs[destinationAttr]["source"][1]]),
+                            key=lambda pair: (pair[0], pair[1].name, pair[2]))
+        ret = []
+        for own, other, otherAttr in pairs:
+            if attr and own != attr:
+                continue
+            if _flag(kwargs, "c", "connections", False):
+                ret.append(f"{node.name}.{own}")
+            ret.append(f"{other.name}.{otherAttr}" if plugs else other.name)
+
+        return ret or None
+
+    def getAttributes(self, obj):
+        node = self._get(obj)
+        kinds = {value: key for key, value in self._ATTR_TYPES.items()}
+        ret = []
+        for attr, record in node.attrs.items():
+            if record["parent"] or record["type"] not in kinds:
+                continue
+            spec = {"type": kinds[record["type"]], "attr": attr, "obj": obj, "value": record["value"],
+                    "keyable": record["keyable"], "locked": record["locked"], "channelbox": record["channelbox"]}
+            if record["children"]:
+                spec["value"] = [node.attrs[child]["value"] for child in record["children"]]
+            if record["cases"] is not None:
+                spec["cases"] = record["cases"].split(":")
+            for key in ["min", "max"]:
+                if record[key] is not None:
+                    spec[key] = record[key]
+            ret.append(spec)
+
+        return ret
+
+    def xform(self, obj, **kwargs):
+        node = self._get(obj)
+        worldSpace = _flag(kwargs, "ws", "worldSpace", False)
+        matrix = _flag(kwargs, "m", "matrix")
+        if _flag(kwargs, "q", "query", False):
+            return list(node.worldMatrix() if worldSpace else node.matrix)
+        if matrix is not None:
+            self.setMatrices([obj], [matrix], worldSpace)
+
+        return
+
+    def getMatrices(self, nodes, worldSpace=True):
+        return [list(node.worldMatrix() if worldSpace else node.matrix) for node in map(self._get, nodes)]
+
+    def setMatrices(self, nodes, matrices, worldSpace=True):
+        for node, matrix in zip(map(self._get, nodes), matrices):
+            if worldSpace and node.parent:
+                matrix = multiplyMatrices(matrix, inverseMatrix(node.parent.worldMatrix()))
+            node.matrix = tuple(matrix)
+
+        return
+
+    def listAttr(self, obj, **kwargs):
+        attrs = list(self._get(obj).attrs)
+
+        return attrs or None
+
+    def addAttributes(self, specs):
+        """
+        Add many attributes in one call, mirroring MayaScene.addAttributes
+
+        Args:
+            specs (list): attribute descriptions, see toolbox.attrSpec
+
+        Returns:
+            list: full attribute names, in the same order as specs
+        """
+        ret = []
+        for spec in specs:
+            obj = spec["obj"]
+            attr = spec["attr"].replace(' ','_')
+            ret.append(f"{obj}.{attr}")
+
+            # IF ATTRIBUTE ALREADY EXISTS, SKIP IT
+            node = self._get(obj)
+            if attr in node.attrs:
+                continue
+
+            kind = spec["type"]
+            cases = spec.get("cases")
+            if isinstance(cases, list):
+                cases = ":".join(cases)
+            records = [self._addAttribute(node, attr, self._ATTR_TYPES[kind], spec.get("value"),
+                                          spec.get("min"), spec.get("max"), cases)]
+            if kind == "vector":
+                values = spec.get("value") or [0, 0, 0]
+                records += [self._addAttribute(node, attr+ax, "double", value, parent=attr) for ax, value in zip("XYZ", values)]
+
+            # SETTINGS
+            for record in records:
+                record["keyable"] = spec.get("keyable", True)
+                record["locked"] = spec.get("locked", False)
+                record["channelbox"] = spec.get("channelbox", True)
+
+        return ret
+
+    '''                     '''
+    ''' HANDLES AND EVENTS '''
+    '''                     '''
+
+    def _notify(self, key, *event):
+        for callback in list(self._listeners.get(key, {}).values()):
+            callback(*event)
+
+    def _listen(self, key, callback):
+        id = next(self._callbackIds)
+        self._callbacks[id] = key
+        self._listeners.setdefault(key, {})[id] = callback
+
+        return [id]
+
+    def getHandle(self, node):
+        return self._get(node)
+
+    def resolveHandle(self, handle):
+        if handle not in self._nodes.get(handle.name, []):
+            return None
+
+        return handle.longName()
+
+    def addNodeCallback(self, node, callback):
+        return self._listen((self._get(node), "node"), callback)
+
+    def addChildCallback(self, node, callback):
+        return self._listen((self._get(node), "child"), callback)
+
+    def addAttributeCallback(self, node, callback):
+        return self._listen((self._get(node), "attr"), callback)
+
+    def addSceneCallback(self, callback):
+        return self._listen((None, "scene"), callback)
+
+    def removeCallbacks(self, ids):
+        for id in ids:
+            if id not in self._callbacks:
+                continue
+            key = self._callbacks.pop(id)
+            listeners = self._listeners[key]
+            del listeners[id]
+            if not listeners:
+                del self._listeners[key]
+
+        return
+
+    '''      '''
+    ''' MISC '''
+    '''      '''
+
+    def undoInfo(self, **kwargs):
+        if _flag(kwargs, "q", "query", False):
+            return self._state["undo"]
+        if _flag(kwargs, "ock", "openChunk", False):
+            self._state["chunks"] += 1
+        if _flag(kwargs, "cck", "closeChunk", False):
+            self._state["chunks"] -= 1
+        for short, long in [("st", "state"), ("swf", "stateWithoutFlush")]:
+            value = _flag(kwargs, short, long)
+            if value is not None:
+                self._state["undo"] = bool(value)
+
+        return
+
+    def autoKeyframe(self, **kwargs):
+        if _flag(kwargs, "q", "query", False):
+            return self._state["autoKey"]
+        value = _flag(kwargs, "st", "state")
+        if value is not None:
+            self._state["autoKey"] = bool(value)
+
+        return
+
+    def refresh(self, **kwargs):
+        value = _flag(kwargs, "su", "suspend")
+        if value is not None:
+            self._state["suspend"] = bool(value)
+
+        return
+
+    def echo(self, text):
+        """
+        Print given text on the standard output
+
+        Args:
+            text (str): the text to print
+        """
+        sys.stdout.write(f"{text}\n")
+
+        return
+
+    def error(self, text, **kwargs):
+        raise RuntimeError(text)
+
+    def warning(self, text, **kwargs):
+        sys.stderr.write(f"Warning: {text}\n")
+
+        return
@@ -0,0 +1,205 @@
+import hashlib, json, os, struct, zlib
+
+
+MAGIC = b"GPTO"
+VERSION = 1
+
+# MAGIC, VERSION, INDEX OFFSET, INDEX LENGTH
+_HEADER = struct.Struct(">4sHQQ")
+
+
+def _encode(payload):
+    """
+    Serialize a section payload
+
+    Args:
+        payload (any): JSON serializable data
+
+    Returns:
+        list: [compressed bytes, content hash]
+    """
+    raw = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+    return zlib.compress(raw), hashlib.sha1(raw).hexdigest()
+
+
+def isSessionFile(path):
+    """
+    Returns:
+        bool: True if given file starts with a Geppetto session header
+    """
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+class SessionFile(object):
+    """
+    Compact, versioned Geppetto session file.
+
+    The file starts with a fixed size header pointing to a JSON index stored after the sections.
+    The index holds session settings and, for each section, its offset, length, content hash and
+    a few metadata. Sections are zlib compressed JSON, one per module or blueprint, read on demand.
+
+    Saving appends changed sections and a new index, then rewrites the header, sections that didn't
+    change stay untouched on disk. The file is compacted when dead bytes outweigh live ones.
+
+    Args:
+        path (str): file path, doesn't need to exist yet
+        overwrite (bool, optional): ignore the file at path, the first save rewrites it. Defaults to False.
+    """
+
+    def __init__(self, path, overwrite=False):
+        self.path = path
+        self.settings = {}
+        self.sections = {}
+        self._cache = {}
+        self._size = 0
+        if os.path.exists(path) and not overwrite:
+            self._readIndex()
+
+    def _readIndex(self):
+        with open(self.path, "rb") as f:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size or not header.startswith(MAGIC):
+                raise IOError(f"{self.path} is not a Geppetto session")
+            magic, version, offset, length = _HEADER.unpack(header)
+            if version > VERSION:
+                raise IOError(f"{self.path} was saved by a newer Geppetto (format {version})")
+            f.seek(offset)
+            index = json.loads(zlib.decompress(f.read(length)).decode("utf-8"))
+            self._size = f.seek(0, os.SEEK_END)
+
+        self.settings = index["settings"]
+        self.sections = index["sections"]
+
+        return
+
+    def keys(self, kind):
+        """
+        Args:
+            kind (str): "module" or "blueprint"
+
+        Returns:
+            list: names of the sections of given kind, in saved order
+        """
+        prefix = f"{kind}/"
+
+        return [key[len(prefix):] for key in self.sections if key.startswith(prefix)]
+
+    def meta(self, kind, name):
+        """
+        Get the metadata stored in the index for a section
+
+        Returns:
+            dict: section metadata
+        """
+        return self.sections[f"{kind}/{name}"]["meta"]
+
+    def read(self, kind, name):
+        """
+        Read a section payload, only the first call touches the disk
+
+        Args:
+            kind (str): "module" or "blueprint"
+            name (str): section name
+
+        Returns:
+            any: section payload
+        """
+        key = f"{kind}/{name}"
+        if key not in self._cache:
+            section = self.sections[key]
+            with open(self.path, "rb") as f:
+                f.seek(section["offset"])
+                data = f.read(section["length"])
+            self._cache[key] = json.loads(zlib.decompress(data).decode("utf-8"))
+
+        return self._cache[key]
+
+    def save(self, settings, sections, path=None):
+        """
+        Save the session, writing only the sections that changed
+
+        Args:
+            settings (dict): session settings
+            sections (dict): {(kind, name): {"meta": dict, "payload": any, "previous": str}} in order.
+                A None payload keeps the section previously saved under the "previous" name, or under the same name.
+            path (str, optional): save to another file. Defaults to the current one.
+        """
+        path = path or self.path
+        entries = {}
+        blobs = {}
+        for (kind, name), section in sections.items():
+            key = f"{kind}/{name}"
+            meta = section.get("meta", {})
+            payload = section.get("payload")
+            old = self.sections.get(f"{kind}/{section.get('previous', name)}")
+            if payload is None:
+                if old is None:
+                    continue
+                entries[key] = dict(old, meta=meta)
+                continue
+
+            data, digest = _encode(payload)
+            self._cache[key] = payload
+            if old and old["hash"] == digest:
+                entries[key] = dict(old, meta=meta)
+            else:
+                entries[key] = {"offset": None, "length": len(data), "hash": digest, "meta": meta}
+                blobs[key] = data
+
+        # FULL REWRITE FOR NEW FILES OR WHEN HALF OF THE FILE IS DEAD
+        live = sum(entry["length"] for entry in entries.values())
+        dead = self._size + sum(len(data) for data in blobs.values()) - live
+        # ONLY APPEND TO A FILE WHOSE INDEX WAS READ OR WRITTEN HERE
+        incremental = path == self.path and self._size and os.path.exists(path) and dead < live
+        if incremental:
+            self._append(path, settings, entries, blobs)
+        else:
+            self._rewrite(path, settings, entries, blobs)
+
+        self.path = path
+        self.settings = settings
+        self.sections = entries
+        self._cache = {key: value for key, value in self._cache.items() if key in entries}
+
+        return
+
+    def _writeIndex(self, f, settings, entries):
+        index = zlib.compress(json.dumps({"settings": settings, "sections": entries},
+                                         separators=(",", ":")).encode("utf-8"))
+        offset = f.tell()
+        f.write(index)
+        self._size = f.tell()
+        f.seek(0)
+        f.write(_HEADER.pack(MAGIC, VERSION, offset, len(index)))
+
+    def _append(self, path, settings, entries, blobs):
+        with open(path, "r+b") as f:
+            f.seek(0, os.SEEK_END)
+            for key, data in blobs.items():
+                entries[key]["offset"] = f.tell()
+                f.write(data)
+            self._writeIndex(f, settings, entries)
+
+    def _rewrite(self, path, settings, entries, blobs):
+        temp = f"{path}.tmp"
+        source = open(self.path, "rb") if os.path.exists(self.path) else None
+        try:
+            with open(temp, "wb") as f:
+                f.write(b"\0" * _HEADER.size)
+                for key, entry in entries.items():
+                    data = blobs.get(key)
+                    if data is None:
+                        source.seek(entry["offset"])
+                        data = source.read(entry["length"])
+                    entry["offset"] = f.tell()
+                    f.write(data)
+                self._writeIndex(f, settings, entries)
+        finally:
+            if source:
+                source.close()
+        os.replace(temp, path)
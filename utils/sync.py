@@ -0,0 +1,192 @@
+from . import scene, toolbox as tb
+from .scene import cmds as mc
+
+
+# SESSION GROUPS WHOSE CHILDREN ARE WATCHED
+KINDS = ("modules", "blueprints")
+
+
+class SceneSync(object):
+    """
+    Collect scene events touching Geppetto nodes and deliver them in one batch per event loop cycle.
+
+    Children added to or removed from the modules and blueprints groups, renames and deletions of
+    modules and blueprints and attribute values set on them only mark what changed, so a script editing
+    thousands of nodes costs one cheap callback per event and listeners are called once, on flush.
+    Guides and other nodes below modules are not watched.
+
+    Args:
+        schedule (function): called with flush the first time something changes after a flush,
+            it must call flush later, typically once the event loop is idle
+    """
+
+    def __init__(self, schedule):
+        self._schedule = schedule
+        self._listeners = []
+        self._backend = None
+        self._callbacks = []
+        self._nodeCallbacks = {}
+        self._pending = None
+
+    '''          '''
+    ''' WATCHING '''
+    '''          '''
+
+    def start(self):
+        """
+        Watch the current session, dropping pending changes
+        """
+        self.stop()
+        self._backend = scene.getBackend()
+        self._callbacks = mc.addSceneCallback(lambda event: self._queue(None, "reset", None))
+        if not tb.geppettoExists():
+            return
+
+        root = tb.getGeppetto()
+        self._callbacks += mc.addNodeCallback(root, lambda *event: self._queue(None, "reset", None))
+        for kind in KINDS:
+            group = f"{root}|{kind}"
+            self._callbacks += mc.addNodeCallback(group, lambda *event: self._queue(None, "reset", None))
+            self._callbacks += mc.addChildCallback(group, lambda event, child, kind=kind: self._onChildChanged(kind, event, child))
+            for child in mc.listRelatives(group) or []:
+                self._watch(kind, child)
+
+        return
+
+    def stop(self):
+        """
+        Stop watching, pending changes are dropped
+        """
+        if self._backend is not None:
+            self._backend.removeCallbacks(self._callbacks)
+            for kind, name in self._nodeCallbacks:
+                self._backend.removeCallbacks(self._nodeCallbacks[(kind, name)])
+        self._backend = None
+        self._callbacks = []
+        self._nodeCallbacks = {}
+        self._pending = None
+
+        return
+
+    def _watch(self, kind, name):
+        if (kind, name) in self._nodeCallbacks:
+            return
+
+        self._nodeCallbacks[(kind, name)] = (
+            mc.addNodeCallback(name, lambda event, name, oldName=None: self._onNodeChanged(kind, event, name, oldName))
+            + mc.addAttributeCallback(name, lambda event, name, attr: self._queue(kind, "changed", name)))
+
+    def _unwatch(self, kind, name):
+        ids = self._nodeCallbacks.pop((kind, name), None)
+        if ids:
+            mc.removeCallbacks(ids)
+
+    def _onChildChanged(self, kind, event, child):
+        if event == "childAdded":
+            self._watch(kind, child)
+            self._queue(kind, "added", child)
+        else:
+            self._unwatch(kind, child)
+            self._queue(kind, "removed", child)
+
+    def _onNodeChanged(self, kind, event, name, oldName):
+        if event == "deleted":
+            self._unwatch(kind, name)
+            self._queue(kind, "removed", name)
+            return
+
+        self._nodeCallbacks[(kind, name)] = self._nodeCallbacks.pop((kind, oldName), [])
+        self._queue(kind, "renamed", name, oldName)
+
+    '''         '''
+    ''' BATCHES '''
+    '''         '''
+
+    def _queue(self, kind, event, name, oldName=None):
+        """
+        Record a change, scheduling a flush if it is the first one since the last flush
+        """
+        if self._pending is None:
+            self._pending = {"reset": False}
+            self._pending.update({key: {"dirty": False, "renamed": {}, "changed": set()} for key in KINDS})
+            self._schedule(self.flush)
+
+        if kind is None:
+            self._pending["reset"] = True
+            return
+
+        changes = self._pending[kind]
+        changes["dirty"] = True
+        if event == "renamed":
+            # FOLLOW CHAINS OF RENAMES BACK TO THE NAME LISTENERS KNOW
+            original = next((key for key, value in changes["renamed"].items() if value == oldName), oldName)
+            changes["renamed"][original] = name
+            if oldName in changes["changed"]:
+                changes["changed"].discard(oldName)
+                changes["changed"].add(name)
+        elif event == "changed":
+            changes["changed"].add(name)
+
+        return
+
+    def isPending(self):
+        return self._pending is not None
+
+    def flush(self):
+        """
+        Deliver the pending changes to every listener. Listeners get one dict:
+        {"reset": bool, "modules": changes or None, "blueprints": changes or None},
+        changes being {"names": current names in outliner order, "renamed": {old name: new name},
+        "changed": [names with attributes set]}. Added and removed children are found by comparing names,
+        a reset means the scene itself changed and everything must be reloaded.
+
+        Returns:
+            dict: delivered changes, None if nothing changed
+        """
+        pending, self._pending = self._pending, None
+        if pending is None:
+            return None
+
+        if pending["reset"] or self._backend is not scene.getBackend():
+            self.start()
+            pending["reset"] = True
+
+        ret = {"reset": pending["reset"]}
+        exists = tb.geppettoExists()
+        for kind in KINDS:
+            changes = pending[kind]
+            if not exists or not (ret["reset"] or changes["dirty"]):
+                ret[kind] = None
+                continue
+
+            names = tb.getModules() if kind == "modules" else tb.getBlueprints()
+            ret[kind] = {"names": names,
+                         "renamed": {} if ret["reset"] else dict(changes["renamed"]),
+                         "changed": [name for name in names if name in changes["changed"]]}
+
+        for callback in list(self._listeners):
+            callback(ret)
+
+        return ret
+
+    '''           '''
+    ''' LISTENERS '''
+    '''           '''
+
+    def addListener(self, callback):
+        """
+        Call given function with the changes of every flush
+
+        Args:
+            callback (function): called with the flushed changes
+        """
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+        return
+
+    def removeListener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+        return
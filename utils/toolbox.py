@@ -1,5 +1,12 @@
-import maya.cmds as mc
-import maya.mel as mm
+import contextlib, glob, hashlib, json, os
+
+from . import profiler, scene
+from .session import SessionFile, isSessionFile
+from .scene import cmds as mc
+
+
+# PART OF THE SESSION HASH, BUMP IT WHEN BUILDS CHANGE SO OLDER PUBLISHED RIGS ARE NOT REUSED
+VERSION = "0.1.0"
 
 
 def print(text):
@@ -9,7 +16,7 @@ def print(text):
     Args:
         text (str): the text to print
     """
-    mm.eval(f'print "{text}"')
+    mc.echo(text)
     
     return
 
@@ -18,6 +25,40 @@ def print(text):
 ''' CREATE ATTRIBUTES '''
 '''                   '''
 
+def attrSpec(kind, attr, obj, **settings):
+    """
+    Describe an attribute to create with addAttributes
+
+    Args:
+        kind (str): attribute type. One of "bool", "float", "int", "string", "enum" or "vector"
+        attr (str): attribute name
+        obj (str): object to add the attribute
+        **settings: any optional argument of the matching add* function (value, min, max, cases, keyable, locked, channelbox)
+
+    Returns:
+        dict: attribute description
+    """
+    spec = {"type": kind, "attr": attr, "obj": obj}
+    spec.update(settings)
+
+    return spec
+
+
+def addAttributes(specs):
+    """
+    Add many attributes, on one or many objects, in a single pass.
+    In Maya everything goes through one om2.MDGModifier and lands in the undo queue as a single step.
+    Attributes that already exist are skipped.
+
+    Args:
+        specs (list): attribute descriptions, see attrSpec
+
+    Returns:
+        list: full attribute names, in the same order as specs
+    """
+    return mc.addAttributes(specs)
+
+
 def addBool(attr, obj, value=False, keyable=True, locked=False, channelbox=True):
     """
     Add a boolean attribute to given object
@@ -33,24 +74,9 @@ def addBool(attr, obj, value=False, keyable=True, locked=False, channelbox=True)
     Returns:
         str: full attribute name
     """
+    spec = attrSpec("bool", attr, obj, value=value, keyable=keyable, locked=locked, channelbox=channelbox)
     
-    attr = attr.replace(' ','_')
-    ret = f"{obj}.{attr}"
-    
-    # IF ATTRIBUTE ALREADY EXISTS, RETURN FULL NAME
-    if mc.objExists(ret):
-        return ret
-    
-    # ADD ATTRIBUTE
-    mc.addAttr(obj, ln=attr, at='bool', dv=value)
-
-    # SETTINGS
-    mc.setAttr(ret, value)
-    mc.setAttr(ret , e=1, k=keyable)
-    mc.setAttr(ret , e=1, l=locked)
-    mc.setAttr(ret , e=1, cb=channelbox)    
-           
-    return ret
+    return addAttributes([spec])[0]
 
 
 def addFloat(attr, obj, value=0, min=None, max=None, keyable=True, locked=False, channelbox=True):
@@ -70,28 +96,9 @@ def addFloat(attr, obj, value=0, min=None, max=None, keyable=True, locked=False,
     Returns:
         str: full attribute name
     """
-        
-    attr = attr.replace(' ','_')
-    ret = f"{obj}.{attr}"
-    
-    # IF ATTRIBUTE ALREADY EXISTS, RETURN FULL NAME
-    if mc.objExists(ret):
-        return ret
+    spec = attrSpec("float", attr, obj, value=value, min=min, max=max, keyable=keyable, locked=locked, channelbox=channelbox)
     
-    # ADD ATTRIBUTE AND SET min AND max
-    mc.addAttr(obj, ln=attr, at='double', dv=value)
-    if min:
-        mc.addAttr(ret, e=True, min=min)
-    if max:
-        mc.addAttr(ret, e=True, max=max)
-
-    # SETTINGS
-    mc.setAttr(ret, value)
-    mc.setAttr(ret , e=1, k=keyable)
-    mc.setAttr(ret , e=1, l=locked)
-    mc.setAttr(ret , e=1, cb=channelbox)
-            
-    return ret
+    return addAttributes([spec])[0]
 
 
 def addInt(attr, obj, value=0, min=None, max=None, keyable=True, locked=False, channelbox=True):
@@ -111,28 +118,9 @@ def addInt(attr, obj, value=0, min=None, max=None, keyable=True, locked=False, c
     Returns:
         str: full attribute name
     """
+    spec = attrSpec("int", attr, obj, value=value, min=min, max=max, keyable=keyable, locked=locked, channelbox=channelbox)
     
-    attr = attr.replace(' ','_')
-    ret = f"{obj}.{attr}"
-    
-    # IF ATTRIBUTE ALREADY EXISTS, RETURN FULL NAME
-    if mc.objExists(ret):
-        return ret
-    
-    # ADD ATTRIBUTE AND SET min AND max
-    mc.addAttr(obj, ln=attr, at='long', dv=value)
-    if min:
-        mc.addAttr(ret, e=True, min=min)
-    if max:
-        mc.addAttr(ret, e=True, max=max)
-
-    # SETTINGS
-    mc.setAttr(ret, value)
-    mc.setAttr(ret , e=1, k=keyable)
-    mc.setAttr(ret , e=1, l=locked)
-    mc.setAttr(ret , e=1, cb=channelbox)
-    
-    return ret
+    return addAttributes([spec])[0]
 
 
 def addString(attr, obj, value='', keyable=True, locked=False, channelbox=True):
@@ -150,24 +138,9 @@ def addString(attr, obj, value='', keyable=True, locked=False, channelbox=True):
     Returns:
         str: full attribute name
     """
+    spec = attrSpec("string", attr, obj, value=value, keyable=keyable, locked=locked, channelbox=channelbox)
     
-    attr = attr.replace(' ','_')
-    ret = f"{obj}.{attr}"
-    
-    # IF ATTRIBUTE ALREADY EXISTS, RETURN FULL NAME
-    if mc.objExists(ret):
-        return ret
-    
-    # ADD ATTRIBUTE
-    mc.addAttr(obj, ln=attr, dt='string')
-
-    # SETTINGS
-    mc.setAttr(ret, value, type="string")
-    mc.setAttr(ret , e=1, k=keyable)
-    mc.setAttr(ret , e=1, l=locked)
-    mc.setAttr(ret , e=1, cb=channelbox)
-
-    return ret
+    return addAttributes([spec])[0]
 
 
 def addEnum(attr, obj, cases, value=0, keyable=True, locked=False, channelbox=True):
@@ -186,28 +159,9 @@ def addEnum(attr, obj, cases, value=0, keyable=True, locked=False, channelbox=Tr
     Returns:
         str: full attribute name
     """
+    spec = attrSpec("enum", attr, obj, cases=cases, value=value, keyable=keyable, locked=locked, channelbox=channelbox)
     
-    attr = attr.replace(' ','_')
-    ret = f"{obj}.{attr}"
-    
-    # IF ATTRIBUTE ALREADY EXISTS, RETURN FULL NAME
-    if mc.objExists(ret):
-        return ret
-    
-    # CONVERT CASES TO VALID STRING
-    if isinstance(cases, list):
-        cases = ":".join(cases)
-    
-    # ADD ATTRIBUTE
-    mc.addAttr(obj, ln=attr, at='enum', dv=value, en=cases)
-
-    # SETTING
-    mc.setAttr(ret, value)
-    mc.setAttr(ret , e=1, k=keyable)
-    mc.setAttr(ret , e=1, l=locked)
-    mc.setAttr(ret , e=1, cb=channelbox)
-        
-    return ret
+    return addAttributes([spec])[0]
 
 
 def addVector(attr, obj, keyable=True, locked=False, channelbox=True):
@@ -224,26 +178,23 @@ def addVector(attr, obj, keyable=True, locked=False, channelbox=True):
     Returns:
         str: full attribute name
     """
+    spec = attrSpec("vector", attr, obj, keyable=keyable, locked=locked, channelbox=channelbox)
     
-    attr = attr.replace(' ','_')
-    ret = f"{obj}.{attr}"
-    
-    # IF ATTRIBUTE ALREADY EXISTS, RETURN FULL NAME
-    if mc.objExists(ret):
-        return ret
-    
-    # ADD ATTRIBUTE
-    mc.addAttr(obj ,ln=attr, at='double3')
-    for ax in "XYZ" :
-        mc.addAttr(obj, ln=attr+ax, at='double', p=attr)
+    return addAttributes([spec])[0]
 
-    # SETTINGS
-    for ax in "_XYZ":
-        mc.setAttr(ret+ax.replace("_", ""), e=1, k=keyable)
-        mc.setAttr(ret+ax.replace("_", ""), e=1, l=locked)
-        mc.setAttr(ret+ax.replace("_", ""), e=1, cb=channelbox)
-    
-    return ret
+
+def dividerSpec(title, obj):
+    """
+    Describe a divider attribute to create with addAttributes
+
+    Args:
+        title (str): divider label
+        obj (str): object to add the divider to
+
+    Returns:
+        dict: attribute description
+    """
+    return attrSpec("enum", title, obj, cases='_________', keyable=False, locked=True, channelbox=True)
 
 
 def addDivider(title, obj):
@@ -254,9 +205,7 @@ def addDivider(title, obj):
         title (str): divider label
         obj (str): object to add the divider to
     """
-    
-    if not mc.objExists(f"{obj}.{title}"):
-        addEnum(title, obj, '_________', keyable=False, locked=True, channelbox=True)
+    addAttributes([dividerSpec(title, obj)])
 
     return
 
@@ -267,14 +216,65 @@ addSeparator = addDivider
 ''' SESSION MANAGEMENT '''
 '''                    '''
 
+# GEPPETTO ROOT, RESOLVED ONCE AND KEPT AS A HANDLE
+_root = {"backend": None, "handle": None, "callbacks": [], "sceneCallbacks": []}
+
+
+def _onRootChanged(*event):
+    """
+    Drop the cached root when it is renamed or deleted, or when the scene changes.
+    A new or opened scene also drops the session file.
+    """
+    _root["handle"] = None
+    if event and event[0] in ("new", "opened"):
+        resetSession()
+    
+    return
+
+
+def _resolveRoot():
+    """
+    Get Geppetto root group from the cache, looking it up only if needed
+
+    Returns:
+        str: root long name, None if there is no session
+    """
+    backend = scene.getBackend()
+    if _root["backend"] is backend and _root["handle"] is not None:
+        ret = mc.resolveHandle(_root["handle"])
+        if ret:
+            return ret
+    
+    # CLEAR STALE CACHE
+    if _root["backend"] is not None:
+        _root["backend"].removeCallbacks(_root["callbacks"])
+        if _root["backend"] is not backend:
+            _root["backend"].removeCallbacks(_root["sceneCallbacks"])
+            _root["sceneCallbacks"] = []
+    _root["handle"] = None
+    _root["callbacks"] = []
+    _root["backend"] = backend
+    if not _root["sceneCallbacks"]:
+        _root["sceneCallbacks"] = mc.addSceneCallback(_onRootChanged)
+    
+    # LOOK UP ROOT
+    ret = mc.ls("geppetto", l=True)
+    if not ret:
+        return None
+    _root["handle"] = mc.getHandle(ret[0])
+    _root["callbacks"] = mc.addNodeCallback(ret[0], _onRootChanged)
+    
+    return ret[0]
+
+
 def geppettoExists():
     """
     Check if a session exists in the database
 
     Returns:
-        bool: True if "rig" group exists, False if it doesn't
+        bool: True if "geppetto" group exists, False if it doesn't
     """
-    if mc.objExists("geppetto"):
+    if _resolveRoot():
         return True
     
     return False
@@ -282,8 +282,9 @@ def geppettoExists():
 
 def createBaseStructure():
     """
-    Create base groups structure to initialize Geppetto
+    Create base groups structure to initialize Geppetto, a new session without any session file
     """
+    resetSession()
     
     # CREATE AND PARENT GROUPS
     geppetto = mc.group(n="geppetto", em=True)
@@ -292,25 +293,897 @@ def createBaseStructure():
     mc.parent(modules, blueprints, geppetto)
     
     # CREATE MAIN ATTRIBUTES
-    addString("session_path", geppetto, keyable=False, channelbox=False)
-    addString("rig_name", geppetto, keyable=False, channelbox=False)
-    addString("publish_path", geppetto, keyable=False, channelbox=False)
+    addAttributes([attrSpec("string", attr, geppetto, keyable=False, channelbox=False)
+                   for attr in ["session_path", "rig_name", "publish_path"]]
+                  + [_jointDisplayScaleSpec(geppetto)])
 
     return
 
 
 def getGeppetto():
-    ret = mc.ls("geppetto", l=True)
+    """
+    Get Geppetto root group. It's looked up once and then cached as a handle that follows reparenting,
+    renaming or deleting it and opening or creating a scene clear the cache.
+
+    Returns:
+        str: root long name
+    """
+    ret = _resolveRoot()
     if ret:
-        return ret[0]
+        return ret
     
     mc.error("Couldn't find Geppetto. Maybe he's out for lunch.")
     return None
 
 
-def getModules():
+'''         '''
+''' DISPLAY '''
+'''         '''
+
+JOINT_DISPLAY_SCALE = "joint_display_scale"
+
+
+def _jointDisplayScaleSpec(obj):
+    return attrSpec("float", JOINT_DISPLAY_SCALE, obj, value=1, min=0.01, keyable=False)
+
+
+def _jointDisplayScalePlug():
+    """
+    Returns:
+        str: session joint display scale plug, added to sessions created before it existed
+    """
     root = getGeppetto()
-    ret = mc.listRelatives(f"{root}|modules")
-    if ret:
-        return ret
-    return []
\ No newline at end of file
+    if not mc.objExists(f"{root}.{JOINT_DISPLAY_SCALE}"):
+        addAttributes([_jointDisplayScaleSpec(root)])
+    
+    return f"{root}.{JOINT_DISPLAY_SCALE}"
+
+
+def guideConnections(nodeType):
+    """
+    Get the display connections of a guide, joint radius follows the session joint display scale
+
+    Args:
+        nodeType (str): guide node type
+
+    Returns:
+        dict: {attribute: source plug}, see scene.createNodes
+    """
+    if nodeType != "joint":
+        return {}
+
+    return {"radius": _jointDisplayScalePlug()}
+
+
+def getJointDisplayScale():
+    return mc.getAttr(_jointDisplayScalePlug())
+
+
+def setJointDisplayScale(value, preview=False):
+    """
+    Scale every guide joint at once through the session joint display scale
+
+    Args:
+        value (float): display scale
+        preview (bool, optional): don't record the change in the undo queue, for interactive updates.
+            Defaults to False.
+    """
+    plug = _jointDisplayScalePlug()
+    if not preview:
+        mc.setAttr(plug, value)
+        return
+
+    undoState = mc.undoInfo(q=True, state=True)
+    mc.undoInfo(stateWithoutFlush=False)
+    try:
+        mc.setAttr(plug, value)
+    finally:
+        mc.undoInfo(stateWithoutFlush=undoState)
+
+    return
+
+
+'''         '''
+''' MODULES '''
+'''         '''
+
+def moduleSide(name):
+    """
+    Get the side of a module from its name prefix
+
+    Args:
+        name (str): module name
+
+    Returns:
+        str: "L", "R" or "-" for center
+    """
+    if name[:2] in ("L_", "R_"):
+        return name[0]
+    
+    return "-"
+
+
+class ModuleIndex(object):
+    """
+    In-memory index of the session modules, built with a single scan and then kept up to date
+    by child added/removed callbacks on the modules group and rename/delete callbacks on each module.
+    Lookups by name, side and type don't touch the scene.
+    A full rescan happens when the scene changes, when the modules group is renamed or deleted,
+    or when a module handle doesn't resolve anymore, meaning some callbacks were missed.
+    """
+
+    def __init__(self):
+        self._backend = None
+        self._modules = {}
+        self._bySide = {}
+        self._byType = {}
+        self._callbacks = []
+        self._moduleCallbacks = {}
+        self.dirty = True
+
+    def _invalidate(self, *event):
+        self.dirty = True
+
+    def _clear(self):
+        if self._backend is not None:
+            self._backend.removeCallbacks(self._callbacks)
+            for ids in self._moduleCallbacks.values():
+                self._backend.removeCallbacks(ids)
+        self._modules = {}
+        self._bySide = {}
+        self._byType = {}
+        self._callbacks = []
+        self._moduleCallbacks = {}
+
+    def rescan(self):
+        """
+        Rebuild the index from the scene
+        """
+        self._clear()
+        self._backend = scene.getBackend()
+        self.dirty = False
+        self._callbacks = mc.addSceneCallback(self._invalidate)
+        if not geppettoExists():
+            return
+        
+        group = f"{getGeppetto()}|modules"
+        self._callbacks += mc.addNodeCallback(group, self._invalidate)
+        self._callbacks += mc.addChildCallback(group, self._onChildChanged)
+        for module in mc.listRelatives(group) or []:
+            self._add(module)
+        
+        return
+
+    def _check(self):
+        if self.dirty or self._backend is not scene.getBackend():
+            self.rescan()
+
+    def _add(self, name):
+        if name in self._modules:
+            return
+        
+        moduleType = ""
+        if mc.objExists(f"{name}.module_type"):
+            moduleType = mc.getAttr(f"{name}.module_type")
+        entry = {"name": name, "side": moduleSide(name), "type": moduleType, "handle": mc.getHandle(name)}
+        self._modules[name] = entry
+        self._bySide.setdefault(entry["side"], {})[name] = entry
+        self._byType.setdefault(moduleType, {})[name] = entry
+        self._moduleCallbacks[name] = mc.addNodeCallback(name, self._onModuleChanged)
+
+    def _remove(self, name):
+        entry = self._modules.pop(name, None)
+        if entry is None:
+            return
+        
+        del self._bySide[entry["side"]][name]
+        del self._byType[entry["type"]][name]
+        mc.removeCallbacks(self._moduleCallbacks.pop(name))
+
+    def _onChildChanged(self, event, child):
+        if event == "childAdded":
+            self._add(child)
+        else:
+            self._remove(child)
+
+    def _onModuleChanged(self, event, name, oldName=None):
+        if event == "deleted":
+            self._remove(name)
+            return
+        
+        # RENAMED, KEEP ORDER
+        entry = self._modules.get(oldName)
+        if entry is None:
+            return
+        del self._bySide[entry["side"]][oldName]
+        entry["name"] = name
+        entry["side"] = moduleSide(name)
+        self._modules = {name if key == oldName else key: value for key, value in self._modules.items()}
+        self._bySide[entry["side"]] = {key: value for key, value in self._modules.items() if value["side"] == entry["side"]}
+        self._byType[entry["type"]] = {key: value for key, value in self._modules.items() if value["type"] == entry["type"]}
+        self._moduleCallbacks[name] = self._moduleCallbacks.pop(oldName)
+
+    def names(self):
+        """
+        Returns:
+            list: module names, in outliner order
+        """
+        self._check()
+        
+        return list(self._modules)
+
+    def get(self, name):
+        """
+        Get a module entry by name
+
+        Args:
+            name (str): module name
+
+        Returns:
+            dict: {"name", "side", "type", "handle"}, None if there is no such module
+        """
+        self._check()
+        entry = self._modules.get(name)
+        if entry and not mc.resolveHandle(entry["handle"]):
+            # MISSED CALLBACK, START OVER
+            self.rescan()
+            entry = self._modules.get(name)
+        
+        return entry
+
+    def bySide(self, side):
+        """
+        Args:
+            side (str): "L", "R" or "-"
+
+        Returns:
+            list: names of the modules on given side
+        """
+        self._check()
+        
+        return list(self._bySide.get(side, {}))
+
+    def byType(self, moduleType):
+        """
+        Args:
+            moduleType (str): module type
+
+        Returns:
+            list: names of the modules of given type
+        """
+        self._check()
+        
+        return list(self._byType.get(moduleType, {}))
+
+_moduleIndex = ModuleIndex()
+
+
+def getModuleIndex():
+    """
+    Returns:
+        ModuleIndex: the session module index
+    """
+    return _moduleIndex
+
+
+def createModule(name, moduleType, side="-"):
+    """
+    Create a module group in the session
+
+    Args:
+        name (str): module name, without side prefix
+        moduleType (str): module type, like "leg" or "spine"
+        side (str, optional): "L", "R" or "-" for center. Defaults to "-".
+
+    Returns:
+        str: module name
+    """
+    prefix = "" if side == "-" else f"{side}_"
+    
+    # FILL THE MODULE BEFORE PARENTING SO THE INDEX SEES IT COMPLETE
+    module = mc.group(n=f"{prefix}{name}", em=True)
+    addString("module_type", module, value=moduleType, keyable=False, channelbox=False)
+    mc.parent(module, f"{getGeppetto()}|modules")
+    
+    return module
+
+
+def getModules(rescan=False):
+    """
+    Get session modules from the module index
+
+    Args:
+        rescan (bool, optional): rebuild the index from the scene first. Defaults to False.
+
+    Returns:
+        list: module names
+    """
+    index = getModuleIndex()
+    if rescan:
+        index.rescan()
+    
+    return index.names()
+
+
+'''            '''
+''' BLUEPRINTS '''
+'''            '''
+
+def createBlueprint(name):
+    """
+    Create a blueprint group in the session
+
+    Args:
+        name (str): blueprint name
+
+    Returns:
+        str: blueprint name
+    """
+    blueprint = mc.group(n=name, em=True)
+    addAttributes([attrSpec("string", "instructions", blueprint, value="[]", keyable=False, channelbox=False),
+                   attrSpec("string", "blueprint_hash", blueprint, value=blueprintHash([]), keyable=False, channelbox=False)])
+    mc.parent(blueprint, f"{getGeppetto()}|blueprints")
+    
+    return blueprint
+
+
+def getBlueprints():
+    """
+    Returns:
+        list: blueprint names
+    """
+    return mc.listRelatives(f"{getGeppetto()}|blueprints") or []
+
+
+def getInstructions(blueprint):
+    """
+    Get the ordered instructions of a blueprint
+
+    Args:
+        blueprint (str): blueprint name
+
+    Returns:
+        list: instructions, each one a dict with at least "name", "type" and "parameters"
+    """
+    loadBlueprint(blueprint)
+    
+    return json.loads(mc.getAttr(f"{blueprint}.instructions") or "[]")
+
+
+def setInstructions(blueprint, instructions):
+    """
+    Replace the instructions of a blueprint. Each instruction gets its content hash in "hash".
+
+    Args:
+        blueprint (str): blueprint name
+        instructions (list): instructions, see getInstructions
+    """
+    loadBlueprint(blueprint)
+    _writeInstructions(blueprint, instructions)
+    
+    return
+
+
+def _writeInstructions(blueprint, instructions):
+    for instruction in instructions:
+        instruction["hash"] = instructionHash(instruction)
+    mc.setAttr(f"{blueprint}.instructions", json.dumps(instructions), type="string")
+    mc.setAttr(f"{blueprint}.blueprint_hash", blueprintHash(instructions), type="string")
+    
+    return
+
+
+# WHAT MAKES AN INSTRUCTION, ANYTHING ELSE IS RUNTIME STATE
+INSTRUCTION_KEYS = ["name", "type", "parameters", "inputs", "enabled"]
+
+
+def instructionHash(instruction):
+    """
+    Get the content hash of an instruction
+
+    Args:
+        instruction (dict): instruction
+
+    Returns:
+        str: sha1 hex digest
+    """
+    content = {key: instruction.get(key) for key in INSTRUCTION_KEYS}
+    
+    return hashlib.sha1(json.dumps(content, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+def blueprintHash(instructions):
+    """
+    Get the content hash of a blueprint from its hashed instructions
+
+    Args:
+        instructions (list): instructions, each one with its "hash"
+
+    Returns:
+        str: sha1 hex digest
+    """
+    return hashlib.sha1(":".join(instruction["hash"] for instruction in instructions).encode("utf-8")).hexdigest()
+
+
+BLUEPRINT_EXTENSION = ".gpb"
+
+
+def _exportPath(directory, blueprint, digest):
+    return os.path.join(directory, f"{blueprint}.{digest}{BLUEPRINT_EXTENSION}")
+
+
+def _parseExportPath(path):
+    """
+    Returns:
+        list: [blueprint name, content hash] read from an export file name
+    """
+    name, digest = os.path.basename(path)[:-len(BLUEPRINT_EXTENSION)].rsplit(".", 1)
+    
+    return name, digest
+
+
+def exportBlueprint(blueprint, directory):
+    """
+    Export a blueprint to a file named after its content hash.
+    Nothing is written if the library already holds this exact blueprint, older exports of it are removed.
+
+    Args:
+        blueprint (str): blueprint name
+        directory (str): blueprint library directory
+
+    Returns:
+        str: export file path
+    """
+    instructions = getInstructions(blueprint)
+    digest = blueprintHash(instructions)
+    path = _exportPath(directory, blueprint, digest)
+    if os.path.exists(path):
+        return path
+    
+    data = {"version": 1, "name": blueprint, "hash": digest, "order": [instruction["hash"] for instruction in instructions],
+            "instructions": {instruction["hash"]: {key: instruction.get(key) for key in INSTRUCTION_KEYS}
+                             for instruction in instructions}}
+    os.makedirs(directory, exist_ok=True)
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(data, f, sort_keys=True, separators=(",", ":"))
+    os.replace(f"{path}.tmp", path)
+    
+    for old in glob.glob(_exportPath(glob.escape(directory), glob.escape(blueprint), "*")):
+        if old != path and _parseExportPath(old)[0] == blueprint:
+            os.remove(old)
+    
+    return path
+
+
+def importBlueprint(path):
+    """
+    Import a blueprint file. If the session already has a blueprint with the same name,
+    its instructions whose hash didn't change are reused as they are, with their runtime state.
+
+    Args:
+        path (str): export file path
+
+    Returns:
+        str: blueprint name
+    """
+    name, digest = _parseExportPath(path)
+    blueprints = getBlueprints()
+    if name in blueprints and mc.getAttr(f"{name}.blueprint_hash") == digest:
+        return name
+    
+    with open(path) as f:
+        data = json.load(f)
+    if name in blueprints:
+        current = {instruction["hash"]: instruction for instruction in getInstructions(name)}
+    else:
+        name = createBlueprint(name)
+        current = {}
+    
+    instructions = [current.get(h) or dict(data["instructions"][h]) for h in data["order"]]
+    setInstructions(name, instructions)
+    
+    return name
+
+
+def syncBlueprints(directory):
+    """
+    Update session blueprints from a blueprint library.
+    Hashes are compared from file names, only blueprints that changed are read and imported.
+
+    Args:
+        directory (str): blueprint library directory
+
+    Returns:
+        list: names of the updated blueprints
+    """
+    library = {}
+    for path in glob.glob(os.path.join(glob.escape(directory), f"*{BLUEPRINT_EXTENSION}")):
+        name, digest = _parseExportPath(path)
+        library[name] = [digest, path]
+    
+    ret = []
+    for blueprint in getBlueprints():
+        if blueprint not in library:
+            continue
+        digest, path = library[blueprint]
+        if mc.getAttr(f"{blueprint}.blueprint_hash") != digest:
+            importBlueprint(path)
+            ret.append(blueprint)
+    
+    return ret
+
+
+'''          '''
+''' SESSIONS '''
+'''          '''
+
+# OPENED SESSION FILE AND MODULES/BLUEPRINTS NOT LOADED FROM IT YET
+# pending: {(kind, current name): [section name, handle]}
+_session = {"file": None, "pending": {}}
+
+SESSION_SETTINGS = ["rig_name", "publish_path"]
+
+
+def _normalize(data):
+    # VALUES READ BACK FROM THE SCENE DRIFT IN THEIR LAST DIGITS
+    if isinstance(data, float):
+        return round(data, 5) + 0.0
+    if isinstance(data, dict):
+        return {key: _normalize(value) for key, value in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [_normalize(value) for value in data]
+    
+    return data
+
+
+def dataHash(data):
+    """
+    Hash module data, or any JSON serializable data, with floats rounded and keys sorted
+    so that data written to the scene and read back hashes the same
+
+    Args:
+        data (any): JSON serializable data
+
+    Returns:
+        str: sha1 hex digest
+    """
+    return hashlib.sha1(json.dumps(_normalize(data), sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+def _sectionHash(sessionFile, name):
+    """
+    Get the data hash of a module section, from the index when it was saved there
+    """
+    return sessionFile.meta("module", name).get("hash") or dataHash(sessionFile.read("module", name))
+
+
+def resetSession():
+    """
+    Forget the opened session file, the next save writes a new one
+    """
+    _session["file"] = None
+    _session["pending"] = {}
+    
+    return
+
+
+def getModuleData(module):
+    """
+    Get everything needed to recreate a module: attributes and guides hierarchy
+
+    Args:
+        module (str): module name
+
+    Returns:
+        dict: {"attributes": [attribute specs], "guides": [{"name", "parent", "type", "matrix", "attributes"}]}
+    """
+    loadModule(module)
+    
+    attributes = [spec for spec in mc.getAttributes(module) if spec["attr"] != "module_type"]
+    
+    # PARENTS FIRST
+    nodes = list(reversed(mc.listRelatives(module, ad=True, f=True) or []))
+    matrices = mc.getMatrices(nodes, worldSpace=False) if nodes else []
+    guides = []
+    for node, matrix in zip(nodes, matrices):
+        guides.append({"name": node.split("|")[-1], "parent": node.split("|")[-2], "type": mc.nodeType(node),
+                       "matrix": matrix, "attributes": mc.getAttributes(node)})
+    
+    for spec in attributes + [spec for guide in guides for spec in guide["attributes"]]:
+        del spec["obj"]
+    
+    return {"attributes": attributes, "guides": guides}
+
+
+def setModuleData(module, data):
+    """
+    Recreate module attributes and guides from getModuleData result
+
+    Args:
+        module (str): module name
+        data (dict): module data
+    """
+    moduleLong = f"{getGeppetto()}|modules|{module}"
+    indices = {}
+    nodes = []
+    for guide in data["guides"]:
+        nodes.append({"type": guide["type"], "name": guide["name"], "parent": indices.get(guide["parent"], moduleLong),
+                      "matrix": guide["matrix"], "attributes": guide["attributes"],
+                      "connections": guideConnections(guide["type"])})
+        indices[guide["name"]] = len(nodes) - 1
+    
+    addAttributes([dict(spec, obj=module) for spec in data["attributes"]])
+    if nodes:
+        mc.createNodes(nodes)
+    
+    return
+
+
+def _refreshPending():
+    """
+    Key modules and blueprints not loaded yet by their current name, forgetting deleted ones
+    """
+    resolved = {}
+    for (kind, name), (section, handle) in _session["pending"].items():
+        current = mc.resolveHandle(handle)
+        if current:
+            resolved[(kind, current.split("|")[-1])] = [section, handle]
+    _session["pending"] = resolved
+    
+    return
+
+
+def _popPending(kind, name):
+    """
+    Get the section a module or blueprint must be loaded from, and forget it
+
+    Returns:
+        str: section name, None if there is nothing to load
+    """
+    if not _session["pending"]:
+        return None
+    if (kind, name) not in _session["pending"]:
+        # MAYBE RENAMED SINCE OPENING
+        _refreshPending()
+    entry = _session["pending"].pop((kind, name), None)
+    
+    return entry[0] if entry else None
+
+
+def loadModule(module):
+    """
+    Load a module payload from the opened session file. Only the first call does something.
+
+    Args:
+        module (str): module name
+    """
+    section = _popPending("module", module)
+    if section:
+        setModuleData(module, _session["file"].read("module", section))
+    
+    return
+
+
+def loadBlueprint(blueprint):
+    """
+    Load a blueprint payload from the opened session file. Only the first call does something.
+
+    Args:
+        blueprint (str): blueprint name
+    """
+    section = _popPending("blueprint", blueprint)
+    if section:
+        data = _session["file"].read("blueprint", section)
+        _writeInstructions(blueprint, data["instructions"])
+    
+    return
+
+
+def saveSession(path=None, overwrite=False):
+    """
+    Save the session. Only modules and blueprints that changed are written,
+    the ones that were never loaded are kept as they are in the file.
+
+    Args:
+        path (str, optional): file to save to. Defaults to the session path.
+        overwrite (bool, optional): replace a file that is not a Geppetto session. Defaults to False.
+
+    Returns:
+        str: saved file path
+    """
+    root = getGeppetto()
+    path = path or mc.getAttr(f"{root}.session_path")
+    if not path:
+        mc.error("This session has never been saved, give it a path.")
+    
+    if os.path.exists(path) and not isSessionFile(path) and not overwrite:
+        mc.error(f"{path} is not a Geppetto session, it can only be overwritten.")
+    sessionFile = _session["file"] or SessionFile(path, overwrite=overwrite)
+    
+    # NOT LOADED YET, BY CURRENT NAME
+    _refreshPending()
+    pending = {key: section for key, (section, handle) in _session["pending"].items()}
+    
+    sections = {}
+    index = getModuleIndex()
+    for module in getModules():
+        entry = index.get(module)
+        section = {"meta": {"type": entry["type"], "side": entry["side"]}}
+        if ("module", module) in pending:
+            section["previous"] = pending[("module", module)]
+            section["meta"]["hash"] = _sectionHash(sessionFile, section["previous"])
+        else:
+            section["payload"] = getModuleData(module)
+            section["meta"]["hash"] = dataHash(section["payload"])
+        sections[("module", module)] = section
+    for blueprint in getBlueprints():
+        section = {"meta": {"hash": mc.getAttr(f"{blueprint}.blueprint_hash")}}
+        if ("blueprint", blueprint) in pending:
+            section["previous"] = pending[("blueprint", blueprint)]
+        else:
+            section["payload"] = {"instructions": getInstructions(blueprint)}
+        sections[("blueprint", blueprint)] = section
+    
+    settings = {attr: mc.getAttr(f"{root}.{attr}") for attr in SESSION_SETTINGS}
+    sessionFile.save(settings, sections, path)
+    
+    # PENDING SECTIONS ARE NOW SAVED UNDER CURRENT NAMES
+    _session["file"] = sessionFile
+    _session["pending"] = {key: [key[1], handle] for key, (section, handle) in _session["pending"].items()}
+    mc.setAttr(f"{root}.session_path", path, type="string")
+    
+    return path
+
+
+def openSession(path):
+    """
+    Open a session file, replacing the current session.
+    Only the file index is read, module and blueprint payloads are loaded on first access.
+
+    Args:
+        path (str): session file
+    """
+    sessionFile = SessionFile(path)
+    
+    if geppettoExists():
+        mc.delete(getGeppetto())
+    createBaseStructure()
+    root = getGeppetto()
+    for attr, value in sessionFile.settings.items():
+        mc.setAttr(f"{root}.{attr}", value or "", type="string")
+    mc.setAttr(f"{root}.session_path", path, type="string")
+    
+    pending = {}
+    for name in sessionFile.keys("module"):
+        meta = sessionFile.meta("module", name)
+        baseName = name[2:] if meta["side"] != "-" else name
+        module = createModule(baseName, meta["type"], meta["side"])
+        pending[("module", module)] = [name, mc.getHandle(module)]
+    for name in sessionFile.keys("blueprint"):
+        blueprint = createBlueprint(name)
+        mc.setAttr(f"{blueprint}.blueprint_hash", sessionFile.meta("blueprint", name).get("hash", ""), type="string")
+        pending[("blueprint", blueprint)] = [name, mc.getHandle(blueprint)]
+    
+    _session["file"] = sessionFile
+    _session["pending"] = pending
+    
+    return
+
+
+def sessionHash():
+    """
+    Get the content hash of everything a published rig is built from: Geppetto version, rig name,
+    modules with their settings and guides, and blueprints.
+    Modules not loaded yet are hashed from their session file section without loading them,
+    loaded ones from their data, both with dataHash so that they match as long as the module didn't change.
+
+    Returns:
+        str: sha1 hex digest
+    """
+    _refreshPending()
+    index = getModuleIndex()
+    modules = []
+    for module in getModules():
+        entry = index.get(module)
+        pending = _session["pending"].get(("module", module))
+        if pending:
+            digest = _sectionHash(_session["file"], pending[0])
+        else:
+            digest = dataHash(getModuleData(module))
+        modules.append([module, entry["type"], digest])
+    blueprints = [[blueprint, mc.getAttr(f"{blueprint}.blueprint_hash")] for blueprint in getBlueprints()]
+    content = {"version": VERSION, "rig": mc.getAttr(f"{getGeppetto()}.rig_name"), "modules": modules,
+               "blueprints": blueprints}
+    
+    return hashlib.sha1(json.dumps(content, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+def publishPath(directory=None):
+    """
+    Get the published rig path, {rig name}.mb in the publish directory.
+    The rig is named after the session file when it has no rig_name.
+
+    Args:
+        directory (str, optional): publish directory. Defaults to the session publish_path.
+
+    Returns:
+        str: published file path
+    """
+    root = getGeppetto()
+    directory = directory or mc.getAttr(f"{root}.publish_path")
+    if not directory:
+        mc.error("This session has no publish path.")
+    name = mc.getAttr(f"{root}.rig_name") or os.path.splitext(os.path.basename(mc.getAttr(f"{root}.session_path")))[0]
+    if not name:
+        mc.error("This session has no rig name, give it one or save it first.")
+    
+    return os.path.join(directory, f"{name}.mb")
+
+
+def publish(directory=None):
+    """
+    Save the scene as the published rig, see publishPath
+
+    Args:
+        directory (str, optional): publish directory. Defaults to the session publish_path.
+
+    Returns:
+        str: published file path
+    """
+    path = publishPath(directory)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    mc.file(rename=path)
+    mc.file(save=True, type="mayaBinary", force=True)
+    
+    return path
+
+
+'''       '''
+''' BUILD '''
+'''       '''
+
+_buildDepth = [0]
+
+
+@contextlib.contextmanager
+def buildContext(name="Geppetto build", fast=False):
+    """
+    Run a build as a single undo chunk.
+    In fast mode undo recording, auto keying and viewport refresh are suspended instead,
+    the build can't be undone but doesn't fill the undo queue.
+    Previous state is restored even if the build fails. Nested builds run in the outer context.
+
+    Args:
+        name (str, optional): undo chunk and profiler operation name. Defaults to "Geppetto build".
+        fast (bool, optional): suspend undo recording. Defaults to False.
+    """
+    if _buildDepth[0]:
+        _buildDepth[0] += 1
+        try:
+            yield
+        finally:
+            _buildDepth[0] -= 1
+        return
+    
+    with profiler.operation(name):
+        if fast:
+            undoState = mc.undoInfo(q=True, state=True)
+            autoKeyState = mc.autoKeyframe(q=True, state=True)
+            mc.undoInfo(stateWithoutFlush=False)
+            mc.autoKeyframe(state=False)
+            mc.refresh(suspend=True)
+        else:
+            mc.undoInfo(openChunk=True, chunkName=name)
+        _buildDepth[0] += 1
+        
+        try:
+            yield
+        finally:
+            _buildDepth[0] -= 1
+            if fast:
+                mc.refresh(suspend=False)
+                mc.autoKeyframe(state=autoKeyState)
+                mc.undoInfo(stateWithoutFlush=undoState)
+            else:
+                mc.undoInfo(closeChunk=True)
+
@@ -0,0 +1,82 @@
+import maya.cmds as mc
+import maya.api.OpenMaya as om2
+
+import sys, types
+
+
+COMMAND_NAME = "geppettoUndo"
+_SHARED_MODULE = "_geppettoUndoShared"
+
+
+def maya_useNewAPI():
+    """
+    Tell Maya this plugin uses the Python API 2.0
+    """
+    pass
+
+
+def _shared():
+    """
+    Get the storage shared between this module and its plugin instance.
+    Maya imports plugin files as a separate module, so the pending edit
+    is handed over through sys.modules.
+
+    Returns:
+        module: shared storage
+    """
+    shared = sys.modules.get(_SHARED_MODULE)
+    if shared is None:
+        shared = types.ModuleType(_SHARED_MODULE)
+        shared.pending = None
+        sys.modules[_SHARED_MODULE] = shared
+
+    return shared
+
+
+class GeppettoUndoCommand(om2.MPxCommand):
+    """
+    Undoable command wrapping an edit that has already been done.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._edit = None
+
+    def doIt(self, args):
+        shared = _shared()
+        self._edit = shared.pending
+        shared.pending = None
+
+    def redoIt(self):
+        self._edit.doIt()
+
+    def undoIt(self):
+        self._edit.undoIt()
+
+    def isUndoable(self):
+        return self._edit is not None
+
+
+def initializePlugin(plugin):
+    om2.MFnPlugin(plugin).registerCommand(COMMAND_NAME, GeppettoUndoCommand)
+
+
+def uninitializePlugin(plugin):
+    om2.MFnPlugin(plugin).deregisterCommand(COMMAND_NAME)
+
+
+def record(edit):
+    """
+    Put an already executed edit in Maya's undo queue as a single step
+
+    Args:
+        edit (object): anything with doIt and undoIt methods, like an om2.MDGModifier
+    """
+    path = __file__.replace(".pyc", ".py")
+    if not mc.pluginInfo(path, q=True, loaded=True):
+        mc.loadPlugin(path, quiet=True)
+
+    _shared().pending = edit
+    getattr(mc, COMMAND_NAME)()
+
+    return